@@ -1,3 +1,4 @@
+import multiprocessing
 import os
 import fitz  # PyMuPDF
 import tkinter as tk
@@ -507,6 +508,7 @@ class PDFMasterGUI:
 ######################################
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     root = tb.Window(themename="superhero")
     app = PDFMasterGUI(root)
     root.mainloop()
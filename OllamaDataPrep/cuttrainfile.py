@@ -14,6 +14,7 @@ Before running, ensure:
   - Ollama is installed locally and the desired model is available.
 """
 
+import multiprocessing
 import os
 import sys
 import subprocess
@@ -181,6 +182,7 @@ class PDFDatasetGeneratorApp:
             return None
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     root = tb.Window(themename="darkly")
     app = PDFDatasetGeneratorApp(root)
     root.mainloop()
@@ -1,5 +1,6 @@
 # ollamadataprep.py
 
+import multiprocessing
 import os
 import json
 import tkinter as tk
@@ -279,6 +280,7 @@ class OllamaDataPrep:
         return records
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     import ttkbootstrap as tb
     root = tb.Window(themename="darkly")
     app = OllamaDataPrep(root)
@@ -7,6 +7,7 @@ and converting the fine-tuned model for deployment with Ollama.
 This application uses ttkbootstrap for a modern Windows-style UI.
 """
 
+import multiprocessing
 import os
 import sys
 import json
@@ -309,6 +310,7 @@ class OllamaTrainerApp:
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     root = tb.Window(themename="darkly")
     app = OllamaTrainerApp(root)
     root.mainloop()
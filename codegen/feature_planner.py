@@ -1,4 +1,4 @@
-import requests
+from runtime.ollama_client import get_client, path_of
 
 OLLAMA_ENDPOINT = "http://localhost:11434/api/generate"
 MODEL_NAME = "your-model-name-here"
@@ -19,6 +19,6 @@ def request_feature_plan(prompt):
         "prompt": prompt,
         "stream": False
     }
-    response = requests.post(OLLAMA_ENDPOINT, json=payload)
+    response = get_client(OLLAMA_ENDPOINT).post(path_of(OLLAMA_ENDPOINT), json=payload)
     response.raise_for_status()
     return response.json()["response"]
@@ -33,3 +33,13 @@ def extract_first_json(raw: str):
         except json.JSONDecodeError:
             continue
     raise ValueError("Could not extract valid JSON from response")
+
+def contains_json(raw: str) -> bool:
+    """
+    True if extract_first_json finds a JSON object in `raw`.
+    """
+    try:
+        extract_first_json(raw)
+        return True
+    except Exception:
+        return False
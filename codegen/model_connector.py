@@ -1,4 +1,4 @@
-import requests
+from runtime.ollama_client import get_client
 
 OLLAMA_BASE_URL = "http://localhost:11434"
 
@@ -18,7 +18,7 @@ def send_prompt(prompt_text, model_name="codellama:latest"):
         "stream": False
     }
 
-    response = requests.post(f"{OLLAMA_BASE_URL}/api/chat", json=payload)
+    response = get_client(OLLAMA_BASE_URL).post("/api/chat", json=payload)
     response.raise_for_status()
 
     result = response.json()
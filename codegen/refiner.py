@@ -1,30 +1,20 @@
 # codegen/refiner.py
 # -*- coding: utf-8 -*-
-import requests
 import json
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_exponential,
-    retry_if_exception_type,
-)
 from config.loader import Config
+from runtime.ollama_client import path_of
+from runtime.response_cache import cache_from_config, post_cached, reply_text
 
 cfg = Config()
 
 OLLAMA_CHAT_URL = cfg.ollama_endpoint
 MODEL_NAME      = cfg.model_name
 
-@retry(
-    stop=stop_after_attempt(cfg.retry_count),
-    wait=wait_exponential(multiplier=1, min=1, max=10),
-    retry=retry_if_exception_type(requests.RequestException),
-    reraise=True
-)
-def _post(payload: dict) -> dict:
-    resp = requests.post(OLLAMA_CHAT_URL, json=payload, timeout=30)
-    resp.raise_for_status()
-    return resp.json()
+def _post(payload: dict, bypass_cache: bool = False) -> dict:
+    # Replies without file blocks are useless to phase 3, so they are never cached.
+    return post_cached(OLLAMA_CHAT_URL, path_of(OLLAMA_CHAT_URL), payload, timeout=30,
+                       cache=cache_from_config(cfg), bypass=bypass_cache,
+                       accept=lambda data: "### FILE:" in reply_text(data))
 
 def build_refinement_prompt(project_summary: str) -> str:
     """
@@ -52,10 +42,11 @@ def build_refinement_prompt(project_summary: str) -> str:
         f"Here is the project code to refine:\n\n{project_summary}"
     )
 
-def request_refinement(prompt: str) -> str:
+def request_refinement(prompt: str, bypass_cache: bool = False) -> str:
     """
     Send the given refinement prompt to the Ollama chat endpoint and return the assistant's reply.
-    Retries on transient network failures.
+    The shared Ollama client retries connection failures. With temperature 0 configured,
+    a prompt already answered is served from the response cache unless bypass_cache is set.
     """
     payload = {
         "model": MODEL_NAME,
@@ -63,9 +54,10 @@ def request_refinement(prompt: str) -> str:
             {"role": "system",  "content": "You are a code quality and style assistant."},
             {"role": "user",    "content": prompt}
         ],
-        "stream": False
+        "stream": False,
+        "options": cfg.generation_options()
     }
-    data = _post(payload)
+    data = _post(payload, bypass_cache)
     if isinstance(data, dict) and "message" in data and isinstance(data["message"], dict):
         return data["message"].get("content", "")
     return json.dumps(data)
@@ -1,10 +1,12 @@
 # codegen/spec_generator.py
 # -*- coding: utf-8 -*-
 
-import requests
 import json
 import logging
 from config.loader import Config
+from runtime.ollama_client import get_probe_client
+from runtime.response_cache import cache_from_config, post_cached, reply_text
+from codegen.json_extractor import contains_json
 
 # ——— Load your configured Ollama endpoint ——————————————————————————
 cfg = Config()
@@ -35,7 +37,7 @@ def list_available_models() -> list[str]:
     url = f"{base_url}/api/tags"
     logger.info(f"Listing models from {url}")
     try:
-        resp = requests.get(url, timeout=5)
+        resp = get_probe_client(base_url).get("/api/tags", timeout=5)
         resp.raise_for_status()
         data = resp.json()
         raw = data.get("models", [])
@@ -47,12 +49,14 @@ def list_available_models() -> list[str]:
         return []
 
 
-def send_prompt_for_spec(raw_tech: str, model_name: str) -> str:
+def send_prompt_for_spec(raw_tech: str, model_name: str, bypass_cache: bool = False) -> str:
     """
     Send the raw technical spec JSON to Ollama’s /api/chat endpoint to generate
     a task-spec. Instruct the model to output only JSON conforming to the
     TaskSpec schema (no markdown, code fences, or additional text).
-    Returns the model’s JSON response as a string.
+    Returns the model’s JSON response as a string. Deterministic requests are
+    answered from the response cache unless bypass_cache is set; replies without
+    extractable JSON are never cached.
     """
     url = f"{base_url}/api/chat"
     logger.info(f"Requesting task spec generation at {url} (model={model_name})")
@@ -72,12 +76,13 @@ def send_prompt_for_spec(raw_tech: str, model_name: str) -> str:
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
         ],
-        "stream": False
+        "stream": False,
+        "options": cfg.generation_options()
     }
 
-    resp = requests.post(url, json=payload, timeout=30)
-    resp.raise_for_status()
-    data = resp.json()
+    data = post_cached(base_url, "/api/chat", payload, timeout=30,
+                       cache=cache_from_config(cfg), bypass=bypass_cache,
+                       accept=lambda data: contains_json(reply_text(data)))
 
     # Ollama returns { "message": { "content": "..." } }
     if isinstance(data, dict) and "message" in data and "content" in data["message"]:
@@ -1,30 +1,21 @@
 # codegen/tech_spec_generator.py
 # -*- coding: utf-8 -*-
-import requests
 import json
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_exponential,
-    retry_if_exception_type,
-)
 from config.loader import Config
+from runtime.ollama_client import path_of
+from runtime.response_cache import cache_from_config, post_cached, reply_text
+from codegen.json_extractor import contains_json
 
 cfg = Config()
 
 OLLAMA_CHAT_URL = cfg.ollama_endpoint
 OLLAMA_MODEL    = cfg.model_name
 
-@retry(
-    stop=stop_after_attempt(cfg.retry_count),
-    wait=wait_exponential(multiplier=1, min=1, max=10),
-    retry=retry_if_exception_type(requests.RequestException),
-    reraise=True
-)
-def _post(payload: dict) -> dict:
-    resp = requests.post(OLLAMA_CHAT_URL, json=payload, timeout=30)
-    resp.raise_for_status()
-    return resp.json()
+def _post(payload: dict, bypass_cache: bool = False) -> dict:
+    # A reply with no extractable JSON is never cached, so re-running phase 2 asks again.
+    return post_cached(OLLAMA_CHAT_URL, path_of(OLLAMA_CHAT_URL), payload, timeout=30,
+                       cache=cache_from_config(cfg), bypass=bypass_cache,
+                       accept=lambda data: contains_json(reply_text(data)))
 
 def build_tech_spec_prompt(user_description: str) -> str:
     """
@@ -42,10 +33,11 @@ def build_tech_spec_prompt(user_description: str) -> str:
         f"User Description:\n{user_description}\n"
     )
 
-def request_tech_spec(prompt: str) -> str:
+def request_tech_spec(prompt: str, bypass_cache: bool = False) -> str:
     """
     Send the tech spec prompt to Ollama and return the raw JSON spec string.
-    Retries on transient network failures.
+    The shared Ollama client retries connection failures. With temperature 0 configured,
+    a prompt already answered is served from the response cache unless bypass_cache is set.
     """
     payload = {
         "model": OLLAMA_MODEL,
@@ -53,9 +45,10 @@ def request_tech_spec(prompt: str) -> str:
             {"role": "system", "content": "You are an expert technical spec generator."},
             {"role": "user",   "content": prompt}
         ],
-        "stream": False
+        "stream": False,
+        "options": cfg.generation_options()
     }
-    data = _post(payload)
+    data = _post(payload, bypass_cache)
     # Ollama returns { "message": { "content": "..." } }
     if isinstance(data, dict) and "message" in data and "content" in data["message"]:
         return data["message"]["content"]
@@ -15,8 +15,13 @@ class Config:
         # Top-level config values
         self.ollama_endpoint = data.get("ollama_endpoint", "http://localhost:11434")
         self.model_name = data.get("model_name", "codellama:latest")
-        self.retry_count = data.get("retry_count", 3)
-        self.retry_backoff_seconds = data.get("retry_backoff_seconds", 2)
+        self.temperature = data.get("temperature")  # None leaves the model's default
+
+        response_cache = data.get("response_cache") or {}
+        self.response_cache_enabled = response_cache.get("enabled", True)
+        # Relative to this directory, so every entry point shares one cache whatever its CWD.
+        self.response_cache_path = os.path.join(base_dir, response_cache.get("path", "response_cache.sqlite3"))
+        self.response_cache_max_mb = response_cache.get("max_mb", 256)
 
         # Nested config values
         self.paths = data.get("paths", {})
@@ -28,5 +33,11 @@ class Config:
 
         self.extra = data  # Optional catch-all
 
+    def generation_options(self):
+        """
+        Ollama request options for codegen generations.
+        """
+        return {} if self.temperature is None else {"temperature": self.temperature}
+
     def get(self, key, default=None):
         return self.extra.get(key, default)
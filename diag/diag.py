@@ -23,7 +23,8 @@ def generate_class_diagram(output_filename: str = 'class_diagram'):
         'ChatInterface': ['chat_display', 'entry'],
         'SessionPanel': [],
         'SettingsPanel': [],
-        'KBManager': ['KB_FOLDER: str', 'INDEX_FILE: str', 'METADATA_FILE: str'],
+        'KBManager': ['KB_FOLDER: str', 'BUNDLE_DIR: str (manifest.json + index files)',
+                      'EMBEDDING_CACHE_DIR: str', 'METADATA_FILE: str'],
         'LocalRetriever': []
     }
 
@@ -75,7 +76,7 @@ def generate_sequence_diagram(output_filename: str = 'sequence_diagram'):
         ('User', 'ChatInterface', 'enter KB query\nclick "Search KB"'),
         ('ChatInterface', 'CoreManager', 'search_kb(query, top_k)'),
         ('CoreManager', 'KBManager', 'load_existing_index()'),
-        ('KBManager', 'LocalRetriever', 'build_index_from_folder()'),
+        ('KBManager', 'LocalRetriever', 'file_hash() of changed files'),
         ('CoreManager', 'LocalRetriever', 'query_index()'),
         ('LocalRetriever', 'CoreManager', 'results'),
         ('CoreManager', 'ChatInterface', 'return KB results'),
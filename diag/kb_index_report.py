@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# kb_index_report.py
+
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ollama.kb.ann import INDEX_KINDS, STORAGE_KINDS, format_report
+from ollama.kb.kb_manager import index_report
+
+
+def main():
+    """
+    Prints recall@k, per-query latency and bytes per chunk of each ANN backend and
+    vector storage against exact flat search on the current KB bundle, to pick index
+    settings for large corpora.
+    """
+    parser = argparse.ArgumentParser(description="KB index recall vs latency report")
+    parser.add_argument("--kinds", nargs="+", default=list(INDEX_KINDS), choices=INDEX_KINDS)
+    parser.add_argument("--storage", nargs="+", default=["float32"], choices=STORAGE_KINDS,
+                        help="Vector storages to compare (recall deltas are against float32)")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--queries", type=int, default=200, help="Number of sampled queries")
+    args = parser.parse_args()
+
+    report = index_report(kinds=args.kinds, k=args.k, n_queries=args.queries, storages=args.storage)
+    if not report:
+        print("No KB bundle found; build the index first.")
+        return
+    print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# search_parse_bench.py
+
+import os
+import re
+import sys
+import html
+import time
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ollama.core.result_parser import RESULT_CLASSES, extract_results
+
+
+def regex_results(content, engine, max_results):
+    """
+    The regex scraping perform_web_search used before result_parser, kept for comparison.
+    """
+    results = []
+    if engine == "DuckDuckGo":
+        divs = re.findall(r'<div class="result__body">(.*?)</div>\s*</div>', content, re.DOTALL)
+        for div in divs[:max_results]:
+            title = re.search(r'<a class="result__a" href=".*?">(.*?)</a>', div, re.DOTALL)
+            snippet = re.search(r'<a class="result__snippet".*?>(.*?)</a>', div, re.DOTALL)
+            url = re.search(r'<a class="result__a" href="(.*?)"', div, re.DOTALL)
+            results.append({
+                "title": html.unescape(re.sub(r"<.*?>", "", title.group(1))) if title else None,
+                "snippet": html.unescape(re.sub(r"<.*?>", "", snippet.group(1))) if snippet else None,
+                "url": url.group(1) if url else None,
+            })
+    else:
+        divs = re.findall(r'<div class="g">(.*?)</div>\s*</div>\s*</div>', content, re.DOTALL)
+        for div in divs[:max_results]:
+            title = re.search(r'<h3 class=".*?">(.*?)</h3>', div, re.DOTALL)
+            snippet = re.search(r'<span class=".*?">(.*?)</span>', div, re.DOTALL)
+            url = re.search(r'<a href="(https?://.*?)"', div, re.DOTALL)
+            results.append({
+                "title": html.unescape(re.sub(r"<.*?>", "", title.group(1))) if title else None,
+                "snippet": html.unescape(re.sub(r"<.*?>", "", snippet.group(1))) if snippet else None,
+                "url": url.group(1) if url else None,
+            })
+    return results
+
+
+def synthetic_page(engine, n_results, padding=2000):
+    """
+    A results page shaped like the engine's markup, with filler between results.
+    """
+    filler = "<p>" + "lorem ipsum dolor sit amet " * (padding // 27) + "</p>"
+    parts = ["<html><body>", filler]
+    for i in range(n_results):
+        if engine == "DuckDuckGo":
+            parts.append(
+                '<div class="result results_links web-result"><div class="result__body">'
+                f'<h2 class="result__title"><a class="result__a" href="https://example.com/{i}">Result <b>{i}</b></a></h2>'
+                f'<a class="result__snippet" href="https://example.com/{i}">Snippet &amp; text {i}</a>'
+                "</div></div>"
+            )
+        else:
+            parts.append(
+                '<div class="g"><div class="tF2Cxc"><div class="yuRUbf">'
+                f'<a href="https://example.com/{i}"><h3 class="LC20lb">Result <b>{i}</b></h3></a>'
+                f'<span class="aCOpRe">Snippet &amp; text {i}</span>'
+                "</div></div></div>"
+            )
+        parts.append(filler)
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    """
+    Times the old regex scraping against the single-pass result parser on saved result
+    pages (or synthetic ones), and reports whether both extract the same titles.
+    """
+    parser = argparse.ArgumentParser(description="Web search result parsing benchmark")
+    parser.add_argument("pages", nargs="*", help="Saved result pages (HTML files)")
+    parser.add_argument("--engine", default="DuckDuckGo", choices=sorted(RESULT_CLASSES))
+    parser.add_argument("--max-results", type=int, default=3)
+    parser.add_argument("--synthetic", type=int, default=30,
+                        help="Results per synthetic page when no pages are given")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = []
+    for path in args.pages:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            pages.append((os.path.basename(path), f.read()))
+    if not pages:
+        pages.append((f"synthetic-{args.synthetic}", synthetic_page(args.engine, args.synthetic)))
+
+    print(f"{'page':<30} {'KiB':>8} {'regex ms':>10} {'parser ms':>10} {'speedup':>8}  titles match")
+    for name, content in pages:
+        regex_s, old = best_of(lambda: regex_results(content, args.engine, args.max_results), args.repeat)
+        parser_s, (new, _) = best_of(lambda: extract_results(content, args.engine, args.max_results), args.repeat)
+        same = [" ".join((r["title"] or "").split()) for r in old] == [r.get("title", "") for r in new]
+        print(f"{name[:30]:<30} {len(content) / 1024:>8.1f} {regex_s * 1000:>10.2f} {parser_s * 1000:>10.2f} "
+              f"{regex_s / parser_s if parser_s else 0:>7.1f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
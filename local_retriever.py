@@ -1,46 +1,57 @@
 # local_retriever.py
 
 import os
+import hashlib
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from ollama.kb.embedder import DEFAULT_MODEL, get_embedder
 
-def build_index_from_folder(kb_path, chunk_size=100, overlap=20, model_name="all-MiniLM-L6-v2"):
+def build_index_from_folder(kb_path, chunk_size=100, overlap=20, model_name=DEFAULT_MODEL, device=None,
+                            cache_dir=None, index_kind="flat", strategy="words"):
     """
-    Reads all .txt files in kb_path, chunks their text, creates embeddings,
-    and builds a FAISS index along with lists for chunks and metadata.
+    Streams all .txt files in kb_path through the chunker and embedder into a FAISS index,
+    a batch at a time, so memory stays bounded however large the folder is.
 
     :param kb_path: Folder containing text files.
     :param chunk_size: Number of words per chunk.
     :param overlap: Number of overlapping words between chunks.
     :param model_name: Name of the SentenceTransformer model.
-    :return: index (FAISS index), chunks (list of text chunks), metadata (list of dicts)
+    :param device: Torch device for the shared embedder, or None for the default.
+    :param cache_dir: Embedding cache directory; cached chunk vectors are reused instead of re-encoded.
+    :param index_kind: Index backend ("flat", "ivf_flat", "ivf_pq", "hnsw" or "auto").
+    :param strategy: Chunking strategy ("words", "sentence", "paragraph" or "tokens").
+    :return: index (ID-mapped FAISS index), chunks (ChunkStore indexed by chunk id 0..n-1),
+             metadata (ChunkMetadata indexed the same way)
     """
-    model = SentenceTransformer(model_name)
-    chunks = []
-    metadata = []
+    from ollama.kb.ingest import IndexWriter, ingest_files, estimate_chunk_count, total_size
+    from ollama.kb.kb_store import ChunkStore, ChunkMetadata
 
-    for filename in os.listdir(kb_path):
-        if filename.endswith(".txt"):
-            file_path = os.path.join(kb_path, filename)
-            with open(file_path, "r", encoding="utf-8") as f:
-                text = f.read()
-            words = text.split()
-            start = 0
-            while start < len(words):
-                chunk = " ".join(words[start: start + chunk_size])
-                chunks.append(chunk)
-                metadata.append({"source": filename})  # ✅ Store source filename
-                start += chunk_size - overlap
-
-    if not chunks:
+    files = [
+        (filename, os.path.join(kb_path, filename))
+        for filename in sorted(os.listdir(kb_path)) if filename.endswith(".txt")
+    ]
+    store = ChunkStore()
+    writer = IndexWriter(
+        kind=index_kind,
+        expected_count=estimate_chunk_count(total_size(p for _, p in files), chunk_size, overlap)
+    )
+    options = {"model_name": model_name} if strategy == "tokens" else {}
+    ingest_files(files, store, writer, model_name, cache_dir, chunk_size, overlap, device=device,
+                 strategy=strategy, chunker_options=options)
+    index, _, _ = writer.finish()
+    if index is None:
         return None, [], []
+    return index, store, ChunkMetadata(store)
 
-    embeddings = model.encode(chunks, convert_to_numpy=True)
-    dim = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dim)
-    index.add(embeddings)
-    return index, chunks, metadata
+def file_hash(file_path, block_size=1 << 20):
+    """
+    Returns the SHA-1 hex digest of a file's contents, read in blocks.
+    """
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
 def save_index(index, index_file_path):
     """
@@ -56,7 +67,7 @@ def load_index(index_file_path):
         return faiss.read_index(index_file_path)
     return None
 
-def search_index(query, index, chunks, metadata, top_k=3, model_name="all-MiniLM-L6-v2"):
+def search_index(query, index, chunks, metadata, top_k=3, model_name=DEFAULT_MODEL, device=None):
     """
     Searches the FAISS index for the most relevant chunks given a query.
 
@@ -66,9 +77,10 @@ def search_index(query, index, chunks, metadata, top_k=3, model_name="all-MiniLM
     :param metadata: List of metadata corresponding to each chunk.
     :param top_k: Number of top results to return.
     :param model_name: SentenceTransformer model name.
+    :param device: Torch device for the shared embedder, or None for the default.
     :return: List of tuples (chunk, distance, metadata)
     """
-    model = SentenceTransformer(model_name)
+    model = get_embedder(model_name, device)
     query_emb = model.encode([query], convert_to_numpy=True)
     distances, indices = index.search(query_emb, top_k)
     results = []
@@ -1,3 +1,4 @@
+import multiprocessing
 import sys
 import os
 import json
@@ -168,4 +169,5 @@ def main():
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
@@ -1,9 +1,12 @@
+import json
 import requests
 import datetime
 
+from runtime.ollama_client import get_client, get_probe_client
+
 def get_models(ollama_url):
     try:
-        response = requests.get(f"{ollama_url}/api/tags", timeout=5)
+        response = get_probe_client(ollama_url).get("/api/tags", timeout=5)
         if response.status_code == 200:
             models = response.json().get("models", [])
             return [m["name"] for m in models]
@@ -13,28 +16,88 @@ def get_models(ollama_url):
 
 def check_server_connection(ollama_url):
     try:
-        response = requests.get(f"{ollama_url}/api/tags", timeout=3)
+        response = get_probe_client(ollama_url).get("/api/tags", timeout=3)
         return response.status_code == 200
     except Exception:
         return False
 
-def generate_response(ollama_url, model, prompt, temperature=0.7, num_predict=2048):
+def _options(temperature, num_predict, num_ctx):
+    options = {"temperature": temperature, "num_predict": num_predict}
+    if num_ctx:
+        options["num_ctx"] = num_ctx
+    return options
+
+def _payload(model, prompt, stream, temperature, num_predict, num_ctx, context):
+    payload = {
+        "model": model,
+        "prompt": prompt,
+        "stream": stream,
+        "options": _options(temperature, num_predict, num_ctx),
+    }
+    if context:
+        payload["context"] = context
+    return payload
+
+def _final_fields(data):
+    """
+    The token context and prompt evaluation stats from the last response object.
+    """
+    return {
+        "context": data.get("context"),
+        "prompt_eval_count": data.get("prompt_eval_count"),
+        "prompt_eval_duration": (data.get("prompt_eval_duration") or 0) / 1e9,
+    }
+
+def generate_response(ollama_url, model, prompt, temperature=0.7, num_predict=2048, num_ctx=None, context=None):
+    """
+    :param context: Token context returned by the previous turn; the server then skips
+        re-evaluating the conversation so far and prompt holds only the new turn.
+    :return: {"success", "ai_response", "context", "prompt_eval_count", "prompt_eval_duration"}
+        or {"success": False, "error"}.
+    """
     try:
-        response = requests.post(
-            f"{ollama_url}/api/generate",
-            json={
-                "model": model,
-                "prompt": prompt,
-                "stream": False,
-                "options": {"temperature": temperature, "num_predict": num_predict},
-            },
+        response = get_client(ollama_url).post(
+            "/api/generate",
+            json=_payload(model, prompt, False, temperature, num_predict, num_ctx, context),
         )
         if response.status_code == 200:
-            ai_response = response.json().get("response", "")
-            return {"success": True, "ai_response": ai_response}
+            data = response.json()
+            return {"success": True, "ai_response": data.get("response", ""), **_final_fields(data)}
         else:
             return {"success": False, "error": f"Server error: {response.status_code}"}
     except requests.exceptions.ConnectionError:
         return {"success": False, "error": "Cannot connect to Ollama server. Is it running?"}
     except Exception as e:
         return {"success": False, "error": f"Error: {str(e)}"}
+
+def stream_response(ollama_url, model, prompt, temperature=0.7, num_predict=2048, num_ctx=None, context=None,
+                    result=None):
+    """
+    Yields the response text piece by piece as the model produces it.
+    Raises RuntimeError with the same messages generate_response reports as errors.
+    :param context: As for generate_response.
+    :param result: Optional dict that receives "context" and the prompt eval stats once done.
+    """
+    try:
+        response = get_client(ollama_url).post(
+            "/api/generate",
+            json=_payload(model, prompt, True, temperature, num_predict, num_ctx, context),
+            stream=True,
+        )
+    except requests.exceptions.ConnectionError:
+        raise RuntimeError("Cannot connect to Ollama server. Is it running?") from None
+    with response:
+        if response.status_code != 200:
+            raise RuntimeError(f"Server error: {response.status_code}")
+        for line in response.iter_lines():
+            if not line:
+                continue
+            data = json.loads(line)
+            if "error" in data:
+                raise RuntimeError(f"Error: {data['error']}")
+            if data.get("response"):
+                yield data["response"]
+            if data.get("done"):
+                if result is not None:
+                    result.update(_final_fields(data))
+                break
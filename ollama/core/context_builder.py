@@ -0,0 +1,100 @@
+# ollama/core/context_builder.py
+
+CHARS_PER_TOKEN = 4  # Rough estimate; Ollama models' tokenizers are not available locally
+CONTEXT_WINDOW = 4096  # Tokens; sent to Ollama as num_ctx so the budget matches the model's window
+RESPONSE_RESERVE = 1024  # Tokens left free for the reply
+SUMMARY_TOKENS = 384  # Target length of the rolling summary of older turns
+RECENT_FILL = 0.6  # After evicting, recent turns fill at most this share of the budget, so
+                   # summaries are recomputed every few turns rather than on every turn
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def format_turns(messages):
+    lines = []
+    for message in messages:
+        speaker = "User" if message.get("role") == "user" else "Assistant"
+        lines.append(f"{speaker}: {message.get('content', '')}")
+    return "\n\n".join(lines)
+
+
+class ContextBuilder:
+    """
+    Fits a session's history into a token budget: the latest turns go in verbatim, older
+    ones as a rolling summary. The summary is cached on the session as
+    {"text", "upto"} (covering messages[:upto]) and only extended when turns fall out of
+    the verbatim window, so most turns cost no extra model call.
+    """
+
+    def __init__(self, summarize, save_summary=None, window=CONTEXT_WINDOW, reserve=RESPONSE_RESERVE,
+                 summary_tokens=SUMMARY_TOKENS):
+        """
+        :param summarize: fn(previous_summary_text, messages) -> new summary text.
+        :param save_summary: Optional fn(session, summary) persisting a recomputed summary.
+        """
+        self.summarize = summarize
+        self.save_summary = save_summary
+        self.window = window
+        self.reserve = reserve
+        self.summary_tokens = summary_tokens
+
+    def build(self, session, prompt):
+        """
+        Returns (prompt with history, info). info has "recent" (verbatim messages),
+        "summarized" (messages covered by the summary) and "tokens" (estimated prompt size).
+        """
+        messages = session.get("messages", [])
+        # A session loaded with only its tail holds messages[offset:] of the full history.
+        offset = session.get("message_count", len(messages)) - len(messages)
+        summary = session.get("summary") or {"text": "", "upto": 0}
+        start = max(summary["upto"], offset)
+        budget = self.window - self.reserve - estimate_tokens(prompt) - self.summary_tokens
+
+        recent = messages[start - offset:]
+        if sum(estimate_tokens(m.get("content", "")) for m in recent) > budget:
+            keep = self._recent_count(recent, budget * RECENT_FILL)
+            evicted = recent[:len(recent) - keep]
+            text = self.summarize(summary["text"], evicted)
+            summary = {"text": text, "upto": start + len(evicted)}
+            session["summary"] = summary
+            if self.save_summary:
+                self.save_summary(session, summary)
+            recent = recent[len(recent) - keep:]
+
+        parts = []
+        if summary["text"]:
+            parts.append(f"Summary of the earlier conversation:\n{summary['text']}")
+        if recent:
+            parts.append(f"Recent conversation:\n{format_turns(recent)}")
+        if not parts:
+            return prompt, {"recent": 0, "summarized": 0, "tokens": estimate_tokens(prompt)}
+        parts.append(f"Current message:\n{prompt}")
+        full = "\n\n".join(parts)
+        return full, {"recent": len(recent), "summarized": summary["upto"], "tokens": estimate_tokens(full)}
+
+    @staticmethod
+    def _recent_count(messages, budget):
+        # Newest messages that fit in budget; always at least the last one.
+        used, count = 0, 0
+        for message in reversed(messages):
+            used += estimate_tokens(message.get("content", ""))
+            if count and used > budget:
+                break
+            count += 1
+        return count
+
+
+def summary_prompt(previous, messages, max_tokens=SUMMARY_TOKENS):
+    """
+    Prompt asking the model to fold messages into the running summary.
+    """
+    words = max_tokens * 3 // 4
+    return (
+        "You maintain a running summary of a conversation so it can continue after older turns are dropped.\n"
+        f"Keep every fact, name, decision and open question that later turns may need, in at most {words} words.\n"
+        "Reply with the updated summary only.\n\n"
+        f"Current summary:\n{previous or '(none yet)'}\n\n"
+        f"New turns to fold in:\n{format_turns(messages)}"
+    )
@@ -4,6 +4,7 @@ import sys
 import os
 import time
 import json
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 
 # Ensure project root is on sys.path
 sys.path.insert(
@@ -14,30 +15,47 @@ sys.path.insert(
 from . import api
 from . import search
 from . import session as session_manager
-from transformers import pipeline
 from PIL import Image, ImageEnhance, ImageFilter
 import pytesseract
 
-from ollama.core.kb_helper import KnowledgeBaseHelper
+from ollama.core.lazy import LazyComponent
+from ollama.core.search_cache import SearchCache
+from ollama.core.context_builder import (
+    CONTEXT_WINDOW, SUMMARY_TOKENS, CHARS_PER_TOKEN, ContextBuilder, estimate_tokens, format_turns, summary_prompt
+)
 
 CONFIG_PATH = os.path.join(os.getcwd(), "config.json")
 LOG_FILE_PATH = os.path.join(os.getcwd(), "log.txt")
+SEARCH_CACHE_PATH = os.path.join(os.getcwd(), "search_cache.sqlite3")
+CAPTION_MODEL = "nlpconnect/vit-gpt2-image-captioning"
+
+# Heavy components are built on first use; these are also built on background threads at startup.
+PREWARM_COMPONENTS = ("kb_helper",)
+
+# Web search and KB retrieval run side by side; each is dropped from the prompt if it misses its deadline.
+WEB_SEARCH_DEADLINE = 6.0  # Seconds
+KB_DEADLINE = 4.0  # Seconds; also covers loading the KB on first use
+CONTEXT_WORKERS = 4  # Room for searches still finishing after their deadline passed
 
 
 class CoreManager:
-    def __init__(self):
+    def __init__(self, prewarm=PREWARM_COMPONENTS):
         self.logging_enabled = True
         self.logging_level = 1
         self._log("Initializing CoreManager", 1)
 
         self.ollama_url = "http://localhost:11434"
-        self.current_model = None
+        self._current_model = None
 
         self.web_search_enabled = True
         self.search_engine = "DuckDuckGo"
         self.max_search_results = 3
         self.search_timeout = 10
         self.search_debug_info = ""
+        self.search_cache = SearchCache(path=SEARCH_CACHE_PATH)
+        self.web_search_deadline = WEB_SEARCH_DEADLINE
+        self.kb_deadline = KB_DEADLINE
+        self._context_pool = ThreadPoolExecutor(CONTEXT_WORKERS, thread_name_prefix="context")
 
         self.kb_debug_info = ""
         self.show_web_debug = False
@@ -45,24 +63,107 @@ class CoreManager:
         self.local_kb_enabled = True
 
         self.current_session = None
-        self.sessions = session_manager.load_sessions()
-        self._log(f"Loaded sessions: {list(self.sessions.keys())}", 2)
+        # Summaries from the session catalogue; messages are only read when a session is opened.
+        self.sessions = {summary["id"]: summary for summary in session_manager.list_sessions()}
+        self._log(f"Listed sessions: {list(self.sessions.keys())}", 2)
+
+        # Earlier turns of the current session are sent along, within the context window.
+        self.use_history = True
+        self.context_window = CONTEXT_WINDOW
+        self.context_builder = ContextBuilder(self._summarize, session_manager.store_session_summary)
+        # The token context Ollama returns is sent back on the next turn, so the server does not
+        # re-evaluate the conversation; it is kept on the session until the reply is stored.
+        self.reuse_context = True
+        self._pending_context = None
 
-        self.kb_helper = KnowledgeBaseHelper()
         self.kb_top_k = 3  # Default number of KB chunks to retrieve
         self.allowed_kb_files = None  # If set, restricts KB search to these files
 
-        self._log("Initialized KnowledgeBaseHelper", 1)
-
-        self._log("Initializing image captioning pipeline", 1)
-        self.image_captioner = pipeline(
-            "image-to-text",
-            model="nlpconnect/vit-gpt2-image-captioning",
-            use_fast=True
-        )
-        self.image_captioner.tokenizer.pad_token = self.image_captioner.tokenizer.eos_token
+        self.components = {
+            "kb_helper": LazyComponent("kb_helper", self._create_kb_helper, self._log),
+            "image_captioner": LazyComponent("image_captioner", self._create_image_captioner, self._log),
+            "ocr_config": LazyComponent("ocr_config", self._load_ocr_config, self._log),
+        }
+        self.prewarm(prewarm)
         self._log("CoreManager initialization complete", 1)
 
+    @property
+    def current_model(self):
+        return self._current_model
+
+    @current_model.setter
+    def current_model(self, model):
+        if model != self._current_model:
+            self.reset_context()  # Another model's tokens mean nothing to the new one.
+        self._current_model = model
+
+    @property
+    def kb_helper(self):
+        return self.components["kb_helper"].get()
+
+    @kb_helper.setter
+    def kb_helper(self, helper):
+        self.components["kb_helper"].set(helper)
+
+    @property
+    def image_captioner(self):
+        return self.components["image_captioner"].get()
+
+    @property
+    def ocr_config(self):
+        return self.components["ocr_config"].get()
+
+    def prewarm(self, names=None):
+        """
+        Starts building the named components (all of them by default) on background threads.
+        """
+        for name in (self.components if names is None else names):
+            self.components[name].prewarm()
+
+    def is_ready(self, name):
+        return self.components[name].ready
+
+    def component_status(self):
+        """
+        Returns {name: {"state": idle|loading|ready|failed, "seconds": ..., "error": ...}}.
+        """
+        return {name: component.status() for name, component in self.components.items()}
+
+    def when_ready(self, name, callback):
+        """
+        Calls callback(component) from the loading thread once the named component is built.
+        """
+        self.components[name].when_ready(callback)
+
+    def _create_kb_helper(self):
+        from ollama.core.kb_helper import KnowledgeBaseHelper
+        from ollama.kb import embedder as embedder_registry
+
+        helper = KnowledgeBaseHelper()
+        # Load the shared embedding model off the UI thread so the first query is fast.
+        embedder_registry.warm_up_async(helper.model_name, helper.device)
+        return helper
+
+    def _create_image_captioner(self):
+        from transformers import pipeline
+
+        captioner = pipeline("image-to-text", model=CAPTION_MODEL, use_fast=True)
+        captioner.tokenizer.pad_token = captioner.tokenizer.eos_token
+        return captioner
+
+    def _load_ocr_config(self):
+        """
+        Reads the Tesseract paths from config.json once and points pytesseract at them.
+        Returns None when config.json is missing.
+        """
+        if not os.path.exists(CONFIG_PATH):
+            return None
+        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+            cfg = json.load(f)
+        pytesseract.pytesseract.tesseract_cmd = cfg["tesseract_path"]
+        os.environ["TESSDATA_PREFIX"] = cfg["tessdata_prefix"]
+        return cfg
+
     def _log(self, message, level):
         if self.logging_enabled and level <= self.logging_level:
             ts = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
@@ -89,7 +190,8 @@ class CoreManager:
         Restrict KB search to only these files (filenames as list).
         """
         self.allowed_kb_files = filenames
-        self.kb_helper.set_file_filter(filenames)
+        # Applied now if the KB is loaded, otherwise as soon as it is, without blocking the caller.
+        self.when_ready("kb_helper", lambda kb: kb.ready and kb.get().set_file_filter(self.allowed_kb_files))
 
     def get_models(self):
         self._log("Fetching available models", 1)
@@ -103,38 +205,42 @@ class CoreManager:
         self._log(f"Server connection status: {ok}", 2)
         return ok
 
-    def generate_response(self, message, with_search=False, with_local_kb=True):
-        self._log(f"Generating response for message: {message}", 1)
+    def _build_prompt(self, message, with_search, with_local_kb):
+        """
+        Gathers web search and KB context for message concurrently. Each source only
+        contributes if it finishes within its own deadline (web_search_deadline, kb_deadline).
+        Turns of the current session are covered by the model's token context when it can
+        be reused, and otherwise by the context builder.
+        :return: (prompt, search_results, token context to send or None)
+        """
         start = time.time()
-
-        search_results = None
-        local_results = None
         self.kb_debug_info = ""
-
+        jobs = []
         if with_search and self.web_search_enabled:
-            try:
-                self._log("Performing web search", 1)
-                data = search.perform_web_search(
-                    message,
-                    self.search_engine,
-                    self.max_search_results,
-                    self.search_timeout
-                )
-                search_results = data.get("results")
-                self.search_debug_info = data.get("debug")
-                self._log("Web search complete", 2)
-            except Exception as e:
-                self._log(f"Web search error: {e}", 1)
+            self._log("Performing web search", 1)
+            jobs.append(("web", self._context_pool.submit(self._web_context, message), self.web_search_deadline))
+        if with_local_kb and self.local_kb_enabled:
+            jobs.append(("kb", self._context_pool.submit(self._kb_context, message), self.kb_deadline))
 
-        use_kb = with_local_kb and self.local_kb_enabled
-        if use_kb:
+        context = {}
+        for name, future, deadline in jobs:
             try:
-                selected_chunks, kb_debug_info = self.kb_helper.search_kb(message, top_k=self.kb_top_k)
-                local_results = "\n".join(selected_chunks)
-                self.kb_debug_info = kb_debug_info
-                self._log(self.kb_debug_info, 2)
+                context[name] = future.result(timeout=max(0.0, start + deadline - time.time()))
+            except FutureTimeout:
+                self._log(f"{name} context missed its {deadline:.1f}s deadline; answering without it", 1)
             except Exception as e:
-                self._log(f"KB retrieval error: {e}", 1)
+                self._log(f"{'Web search' if name == 'web' else 'KB retrieval'} error: {e}", 1)
+        self._log(f"Context gathered in {time.time() - start:.2f}s", 2)
+
+        search_results = local_results = None
+        if "web" in context:
+            search_results, self.search_debug_info = context["web"]
+            self._log("Web search complete", 2)
+        elif with_search and self.web_search_enabled:
+            self.search_debug_info = f"Web search skipped: no result within {self.web_search_deadline:.1f}s\n"
+        if "kb" in context:
+            local_results, self.kb_debug_info = context["kb"]
+            self._log(self.kb_debug_info, 2)
 
         prompt = message
         if search_results or local_results:
@@ -147,7 +253,91 @@ class CoreManager:
             self._log("Built prompt with context", 3)
             self._log(f"Prompt to AI (truncated):\n{prompt[:2000]}", 3)
 
-        resp = api.generate_response(self.ollama_url, self.current_model, prompt)
+        ctx_tokens = self._reusable_context(prompt) if self.use_history else None
+        if ctx_tokens is not None:
+            self._log(f"Reusing {len(ctx_tokens)} context tokens", 2)
+        elif self.use_history and self.current_session:
+            self.context_builder.window = self.context_window
+            prompt, info = self.context_builder.build(self.current_session, prompt)
+            self._log(
+                f"History: {info['recent']} recent messages, {info['summarized']} summarized, "
+                f"~{info['tokens']} prompt tokens", 2
+            )
+        return prompt, search_results, ctx_tokens
+
+    def _reusable_context(self, prompt):
+        """
+        The current session's token context, if it was made by the current model, no message
+        was stored around it since, and the new prompt still fits next to it.
+        """
+        state = self.current_session.get(session_manager.CONTEXT_KEY) if self.current_session else None
+        if not (self.reuse_context and state):
+            return None
+        if state["model"] != self.current_model or state["count"] != self.current_session.get("message_count"):
+            self.reset_context()
+            return None
+        if len(state["tokens"]) + estimate_tokens(prompt) + self.context_builder.reserve > self.context_window:
+            self._log("Token context would overflow the window; rebuilding from history", 2)
+            self.reset_context()
+            return None
+        return state["tokens"]
+
+    def _keep_context(self, resp):
+        # Attached to the session once the reply is stored; see store_message_in_session.
+        self._log(f"Prompt eval: {resp.get('prompt_eval_count')} tokens in "
+                  f"{resp.get('prompt_eval_duration') or 0:.2f}s", 2)
+        if self.reuse_context and self.current_session and resp.get("context"):
+            self._pending_context = (self.current_session, self.current_model, resp["context"])
+
+    def reset_context(self):
+        """
+        Forgets the token context, so the next turn sends the history as text again.
+        """
+        self._pending_context = None
+        if self.current_session:
+            self.current_session.pop(session_manager.CONTEXT_KEY, None)
+
+    def _summarize(self, previous, messages):
+        """
+        Folds messages into the rolling summary with the current model. If that fails, keeps
+        the end of a plain transcript instead, so evicted turns are not lost outright.
+        """
+        self._log(f"Summarizing {len(messages)} older messages", 1)
+        resp = api.generate_response(
+            self.ollama_url, self.current_model, summary_prompt(previous, messages),
+            temperature=0.2, num_predict=SUMMARY_TOKENS, num_ctx=self.context_window
+        )
+        if resp.get("success") and resp.get("ai_response", "").strip():
+            return resp["ai_response"].strip()
+        self._log(f"Summarization failed: {resp.get('error')}", 1)
+        fallback = f"{previous}\n\n{format_turns(messages)}".strip()
+        return fallback[-SUMMARY_TOKENS * CHARS_PER_TOKEN:]
+
+    def _web_context(self, message):
+        data = search.perform_web_search(
+            message,
+            self.search_engine,
+            self.max_search_results,
+            self.search_timeout,
+            cache=self.search_cache
+        )
+        stats = self.search_cache.stats()
+        self._log(f"Search cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%})", 2)
+        return data.get("results"), data.get("debug")
+
+    def _kb_context(self, message):
+        selected_chunks, kb_debug_info = self.kb_helper.search_kb(message, top_k=self.kb_top_k)
+        return "\n".join(selected_chunks), kb_debug_info
+
+    def generate_response(self, message, with_search=False, with_local_kb=True):
+        self._log(f"Generating response for message: {message}", 1)
+        start = time.time()
+        prompt, search_results, ctx_tokens = self._build_prompt(message, with_search, with_local_kb)
+        self._pending_context = None
+        resp = api.generate_response(self.ollama_url, self.current_model, prompt, num_ctx=self.context_window,
+                                     context=ctx_tokens)
+        if resp.get("success"):
+            self._keep_context(resp)
         elapsed = time.time() - start
         self._log(f"Response generated in {elapsed:.2f}s", 2)
 
@@ -157,24 +347,56 @@ class CoreManager:
             "kb_debug_info": self.kb_debug_info
         }
 
+    def stream_response(self, message, with_search=False, with_local_kb=True):
+        """
+        Like generate_response, but yields the reply text in pieces as the model produces them.
+        Raises RuntimeError if generation fails; debug info is left in search_debug_info and kb_debug_info.
+        """
+        self._log(f"Streaming response for message: {message}", 1)
+        start = time.time()
+        prompt, _, ctx_tokens = self._build_prompt(message, with_search, with_local_kb)
+        self._pending_context = None
+        result = {}
+        first = None
+        try:
+            for piece in api.stream_response(self.ollama_url, self.current_model, prompt,
+                                             num_ctx=self.context_window, context=ctx_tokens, result=result):
+                if first is None:
+                    first = time.time() - start
+                    self._log(f"First token after {first:.2f}s", 2)
+                yield piece
+        except Exception as e:
+            self._log(f"Streaming error: {e}", 1)
+            raise
+        self._log(f"Response streamed in {time.time() - start:.2f}s", 2)
+        self._keep_context(result)
+
     def new_session(self):
         self._log("Creating new session", 1)
         session_id, session_data = session_manager.new_session(self.current_model)
+        self._leave_session(session_id)
         self.current_session = session_data
-        self.sessions[session_id] = session_data
+        self.sessions[session_id] = session_manager.session_summary(session_data)
         self._log(f"New session {session_id} created", 2)
         return session_id
 
-    def load_session(self, session_id):
+    def load_session(self, session_id, tail=None):
         self._log(f"Loading session {session_id}", 1)
-        data = session_manager.load_session(session_id)
+        data = session_manager.load_session(session_id, tail=tail)
         if data:
+            self._leave_session(session_id)
             self.current_session = data
+            self.sessions[session_id] = session_manager.session_summary(data)
             self._log("Session loaded successfully", 2)
             return True
         self._log("Failed to load session", 2)
         return False
 
+    def _leave_session(self, next_id):
+        # Only the current session is written to, so the journal of the one being left is closed.
+        if self.current_session and self.current_session.get("id") != next_id:
+            session_manager.close_journal(self.current_session["id"])
+
     def delete_session(self, session_id):
         self._log(f"Deleting session {session_id}", 1)
         if session_manager.delete_session(session_id):
@@ -188,7 +410,7 @@ class CoreManager:
 
     def export_session(self, session_id, file_path):
         self._log(f"Exporting session {session_id} to {file_path}", 1)
-        session = self.sessions.get(session_id)
+        session = session_manager.load_session(session_id) if session_id in self.sessions else None
         if session:
             result = session_manager.export_session(session, file_path)
             self._log(f"Export result: {result}", 2)
@@ -196,11 +418,28 @@ class CoreManager:
         self._log("No such session to export", 2)
         return False
 
+    def search_history(self, query, limit=20, mode="text"):
+        """
+        Finds messages across all chat sessions; see session.search_sessions for modes.
+        """
+        self._log(f"Searching chat history ({mode}): {query}", 1)
+        start = time.time()
+        results = session_manager.search_sessions(query, limit, mode)
+        self._log(f"History search found {len(results)} messages in {time.time() - start:.3f}s", 2)
+        return results
+
     def store_message_in_session(self, role, message):
         if not self.current_session:
             return
         self._log(f"Storing message: role={role}", 3)
         session_manager.store_message_in_session(self.current_session, role, message)
+        self.sessions[self.current_session["id"]] = session_manager.session_summary(self.current_session)
+        pending = self._pending_context
+        if role == "assistant" and pending and pending[0] is self.current_session:
+            self.current_session[session_manager.CONTEXT_KEY] = {
+                "model": pending[1], "tokens": pending[2], "count": self.current_session["message_count"]
+            }
+            self._pending_context = None
 
     def generate_image_caption(self, image_path):
         self._log(f"Captioning image: {image_path}", 1)
@@ -219,11 +458,7 @@ class CoreManager:
     def generate_image_text(self, image_path):
         self._log(f"OCR image: {image_path}", 1)
         try:
-            if os.path.exists(CONFIG_PATH):
-                cfg = json.load(open(CONFIG_PATH, "r", encoding="utf-8"))
-                pytesseract.pytesseract.tesseract_cmd = cfg["tesseract_path"]
-                os.environ["TESSDATA_PREFIX"] = cfg["tessdata_prefix"]
-            else:
+            if self.ocr_config is None:
                 return "[Error: config.json not found]"
 
             img = Image.open(image_path).convert("L")
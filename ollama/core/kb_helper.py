@@ -1,16 +1,42 @@
 # ollama/core/kb_helper.py
 
-import os
-from sentence_transformers import SentenceTransformer
+import threading
+from collections import OrderedDict
+
 import faiss
+import numpy as np
+
+from ollama.kb.embedder import DEFAULT_MODEL, get_embedder
+from ollama.kb.embedding_cache import encode_texts
+from ollama.kb.ann import apply_search_params, search_parameters
+from ollama.kb.kb_manager import (
+    EMBEDDING_CACHE_DIR, load_existing_index, load_lexical_index, set_index_search_params
+)
+from ollama.kb.lexical import reciprocal_rank_fusion
 
-from ollama.kb.kb_manager import load_existing_index
+QUERY_CACHE_SIZE = 256  # Query vectors kept in the LRU cache
+SEARCH_MODES = ("vector", "lexical", "hybrid", "narrowed")
+HYBRID_CANDIDATES = 50  # Candidates taken from each ranker before fusion / re-ranking
 
 class KnowledgeBaseHelper:
-    def __init__(self):
-        self.kb_index, self.kb_chunks, self.kb_metadata = load_existing_index()
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
+    def __init__(self, model_name=DEFAULT_MODEL, device=None, query_cache_size=QUERY_CACHE_SIZE):
+        self.kb_index, self.kb_chunks, self.kb_metadata = load_existing_index(model_name)
+        self.kb_lexical = load_lexical_index() if self.kb_index is not None else None
+        self.model_name = model_name
+        self.device = device
         self.file_filter = None  # If None = search all, otherwise = list of filenames to allow
+        self._filter_selector = None
+
+        self.query_cache_size = query_cache_size
+        self._query_cache = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+        self.query_cache_hits = 0
+        self.query_cache_misses = 0
+
+    @property
+    def embedder(self):
+        # Shared, lazily loaded model from the process-wide registry.
+        return get_embedder(self.model_name, self.device)
 
     def set_file_filter(self, allowed_filenames):
         """
@@ -20,36 +46,158 @@ class KnowledgeBaseHelper:
             self.file_filter = set(allowed_filenames)
         else:
             self.file_filter = None
+        self._filter_selector = None
 
-    def search_kb(self, query, top_k=3):
-        if not self.kb_index or not self.kb_chunks:
-            return [], "Local KB not available."
+    def set_index_search_params(self, **params):
+        """
+        Tunes the ANN index at query time (nprobe for IVF, ef_search for HNSW)
+        and persists the setting in the KB bundle.
+        """
+        if self.kb_index is not None:
+            apply_search_params(self.kb_index, params)
+        set_index_search_params(**params)
+
+    def _get_filter_selector(self):
+        """
+        Returns (selector, allowed_ids) restricting search to the filtered files' chunk ids.
+        Built once per filter and reused, so filtered queries search the stored vectors.
+        """
+        key = (frozenset(self.file_filter), len(self.kb_chunks), self.kb_chunks.next_id)
+        cached = self._filter_selector
+        if cached is None or cached[0] != key:
+            ids = np.ascontiguousarray(self.kb_chunks.ids_for_sources(self.file_filter), dtype="int64")
+            cached = (key, faiss.IDSelectorBatch(ids), ids)
+            self._filter_selector = cached
+        return cached[1], cached[2]
 
+    def _encode_queries(self, queries):
+        """
+        Returns a float32 matrix with one vector per query. Vectors come from the LRU cache
+        when possible; all misses are encoded together in a single forward pass.
+        """
+        keys = [" ".join(q.split()) for q in queries]
+        vectors = [None] * len(keys)
+        missing = {}
+        with self._query_cache_lock:
+            for i, key in enumerate(keys):
+                vec = self._query_cache.get(key)
+                if vec is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    self._query_cache.move_to_end(key)
+                    vectors[i] = vec
+            self.query_cache_hits += len(keys) - sum(len(v) for v in missing.values())
+            self.query_cache_misses += sum(len(v) for v in missing.values())
+
+        if missing:
+            fresh = self.embedder.encode(list(missing), convert_to_numpy=True).astype("float32")
+            with self._query_cache_lock:
+                for (key, positions), vec in zip(missing.items(), fresh):
+                    for i in positions:
+                        vectors[i] = vec
+                    self._query_cache[key] = vec
+                    self._query_cache.move_to_end(key)
+                while len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+        return np.stack(vectors)
+
+    def query_cache_stats(self):
+        total = self.query_cache_hits + self.query_cache_misses
+        return {
+            "size": len(self._query_cache),
+            "capacity": self.query_cache_size,
+            "hits": self.query_cache_hits,
+            "misses": self.query_cache_misses,
+            "hit_rate": self.query_cache_hits / total if total else 0.0,
+        }
+
+    def clear_query_cache(self):
+        with self._query_cache_lock:
+            self._query_cache.clear()
+
+    def _search_vectors(self, query_vecs, top_k):
+        """
+        Runs one index search for a stacked query matrix, honouring the file filter.
+        Returns a list of chunk-id lists, or None when the filter matches nothing.
+        """
         if self.file_filter:
-            # Filter chunks by allowed filenames
-            filtered_indices = [
-                idx for idx, meta in enumerate(self.kb_metadata)
-                if os.path.basename(meta.get("source", "")) in self.file_filter
-            ]
-            if not filtered_indices:
-                return [], "No matching documents in KB filter."
-
-            filtered_chunks = [self.kb_chunks[i] for i in filtered_indices]
-            filtered_embeddings = self._encode_chunks(filtered_chunks)
-
-            # Build a temporary FAISS index over the filtered embeddings
-            dim = filtered_embeddings.shape[1]
-            temp_index = faiss.IndexFlatL2(dim)
-            temp_index.add(filtered_embeddings)
-            query_vec = self.embedder.encode([query])
-
-            D, I = temp_index.search(query_vec, min(top_k, len(filtered_chunks)))
-            selected_chunks = [filtered_chunks[i] for i in I[0]]
+            selector, allowed = self._get_filter_selector()
+            if not len(allowed):
+                return None
+            params = search_parameters(self.kb_index, selector)
+            D, I = self.kb_index.search(query_vecs, min(top_k, len(allowed)), params=params)
         else:
             # Search entire KB
-            query_vec = self.embedder.encode([query])
-            D, I = self.kb_index.search(query_vec, min(top_k, len(self.kb_chunks)))
-            selected_chunks = [self.kb_chunks[i] for i in I[0]]
+            D, I = self.kb_index.search(query_vecs, min(top_k, len(self.kb_chunks)))
+        return [[i for i in row if i >= 0] for row in I]
+
+    def _search_lexical(self, query, top_k):
+        """
+        BM25 ranking for one query as a list of chunk ids, or None when the filter matches nothing.
+        """
+        allowed = None
+        if self.file_filter:
+            _, allowed = self._get_filter_selector()
+            if not len(allowed):
+                return None
+        ids, _ = self.kb_lexical.search(query, top_k, allowed_ids=allowed)
+        return ids.tolist()
+
+    def _search_narrowed(self, query_vec, query, top_k):
+        """
+        Vector re-ranking restricted to the BM25 candidates of query; plain vector
+        search when no chunk shares a term with it.
+        """
+        candidates = self._search_lexical(query, HYBRID_CANDIDATES)
+        if candidates is None:
+            return None
+        if not candidates:
+            return self._search_vectors(query_vec[None], top_k)[0]
+        selector = faiss.IDSelectorBatch(np.asarray(candidates, dtype="int64"))
+        params = search_parameters(self.kb_index, selector)
+        D, I = self.kb_index.search(query_vec[None], min(top_k, len(candidates)), params=params)
+        return [i for i in I[0] if i >= 0]
+
+    def _rank(self, queries, top_k, mode):
+        """
+        Returns one list of chunk ids per query for the given search mode,
+        or None when the file filter matches nothing.
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown KB search mode: {mode}")
+        if mode != "vector" and self.kb_lexical is None:
+            mode = "vector"
+        if mode == "lexical":
+            ranked = [self._search_lexical(q, top_k) for q in queries]
+            return None if None in ranked else ranked
+
+        query_vecs = self._encode_queries(queries)
+        if mode == "vector":
+            return self._search_vectors(query_vecs, top_k)
+        if mode == "narrowed":
+            ranked = [self._search_narrowed(v, q, top_k) for v, q in zip(query_vecs, queries)]
+            return None if None in ranked else ranked
+
+        vector_hits = self._search_vectors(query_vecs, max(top_k, HYBRID_CANDIDATES))
+        if vector_hits is None:
+            return None
+        return [
+            reciprocal_rank_fusion([hits, self._search_lexical(q, max(top_k, HYBRID_CANDIDATES))], top_k)
+            for q, hits in zip(queries, vector_hits)
+        ]
+
+    def search_kb(self, query, top_k=3, mode="vector"):
+        """
+        mode: "vector" (MiniLM similarity), "lexical" (BM25), "hybrid" (reciprocal-rank
+        fusion of both) or "narrowed" (vector re-ranking of the BM25 candidates).
+        """
+        if not self.kb_index or not self.kb_chunks:
+            return [], "Local KB not available."
+
+        hits = self._rank([query], top_k, mode)
+        if hits is None:
+            return [], "No matching documents in KB filter."
+        selected_chunks = [self.kb_chunks[i] for i in hits[0]]
 
         preview = "\n".join([
             f"Chunk {i+1}: {chunk.strip()[:100]}..." for i, chunk in enumerate(selected_chunks)
@@ -57,6 +205,20 @@ class KnowledgeBaseHelper:
 
         return selected_chunks, f"Retrieved {len(selected_chunks)} KB chunks:\n{preview}"
 
+    def search_kb_batch(self, queries, top_k=3, mode="vector"):
+        """
+        Retrieves chunks for many queries with one encode call and one index search.
+        Returns a list with the selected chunks for each query, in input order.
+        """
+        if not queries:
+            return []
+        if not self.kb_index or not self.kb_chunks:
+            return [[] for _ in queries]
+        hits = self._rank(queries, top_k, mode)
+        if hits is None:
+            return [[] for _ in queries]
+        return [[self.kb_chunks[i] for i in row] for row in hits]
+
     def _encode_chunks(self, chunks):
-        vectors = self.embedder.encode(chunks, convert_to_numpy=True)
-        return vectors
+        # Chunk vectors are stable per (model, text), so go through the on-disk cache.
+        return encode_texts(chunks, self.model_name, self.device, cache_dir=EMBEDDING_CACHE_DIR)
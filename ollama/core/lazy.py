@@ -0,0 +1,115 @@
+# ollama/core/lazy.py
+
+import threading
+import time
+
+
+class LazyComponent:
+    """
+    A heavy object built on first use (or ahead of time on a background thread).
+    Concurrent callers share a single build; readiness can be polled without blocking.
+    """
+
+    IDLE = "idle"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self, name, factory, log=None):
+        self.name = name
+        self._factory = factory
+        self._log = log or (lambda message, level: None)
+        self._build_lock = threading.Lock()  # Held for a whole build, so callers share one
+        self._state_lock = threading.Lock()  # Guards state and callbacks only; never held while building
+        self._callbacks = []
+        self._value = None
+        self.state = self.IDLE
+        self.error = None
+        self.load_seconds = None
+
+    @property
+    def ready(self):
+        return self.state == self.READY
+
+    def get(self):
+        """
+        Returns the component, building it in the calling thread if nobody has yet.
+        Re-raises the build error if the last attempt failed.
+        """
+        if self.state == self.READY:
+            return self._value
+        callbacks = []
+        with self._build_lock:
+            if self.state != self.READY:
+                callbacks = self._build()
+        self._fire(callbacks)
+        if self.state == self.FAILED:
+            raise self.error
+        return self._value
+
+    def set(self, value):
+        with self._state_lock:
+            self._value = value
+            self.state = self.READY
+            self.error = None
+            callbacks, self._callbacks = self._callbacks, []
+        self._fire(callbacks)
+
+    def prewarm(self):
+        """
+        Starts building on a daemon thread unless already built or building.
+        :return: The thread, or None if there was nothing to do.
+        """
+        if self.state in (self.READY, self.LOADING):
+            return None
+        thread = threading.Thread(target=self._prewarm, name=f"prewarm-{self.name}", daemon=True)
+        thread.start()
+        return thread
+
+    def when_ready(self, callback):
+        """
+        Calls callback(component) once the build finishes (successfully or not); immediately if it already has.
+        The callback runs on whichever thread finished the build. Never waits for the build.
+        """
+        with self._state_lock:
+            if self.state in (self.IDLE, self.LOADING):
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def status(self):
+        return {"state": self.state, "seconds": self.load_seconds, "error": str(self.error) if self.error else None}
+
+    def _prewarm(self):
+        try:
+            self.get()
+        except Exception:
+            pass  # Recorded in self.error and reported through status().
+
+    def _build(self):
+        # Runs under _build_lock; _state_lock is only taken to publish the outcome.
+        with self._state_lock:
+            self.state = self.LOADING
+        self._log(f"Loading {self.name}", 1)
+        start = time.time()
+        value, error = None, None
+        try:
+            value = self._factory()
+        except Exception as e:
+            error = e
+            self._log(f"Loading {self.name} failed: {e}", 1)
+        self.load_seconds = time.time() - start
+        with self._state_lock:
+            self._value, self.error = value, error
+            self.state = self.FAILED if error else self.READY
+            callbacks, self._callbacks = self._callbacks, []
+        if not error:
+            self._log(f"{self.name} ready in {self.load_seconds:.2f}s", 1)
+        return callbacks
+
+    def _fire(self, callbacks):
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception:
+                pass
@@ -0,0 +1,129 @@
+# ollama/core/result_parser.py
+
+import re
+import html
+
+# Per engine: class of the div wrapping one result.
+RESULT_CLASSES = {"DuckDuckGo": "result__body", "Google": "g"}
+
+# Only the tags that delimit results and their parts are visited; everything between
+# them is skipped by the regex engine without backtracking.
+TAG_RE = re.compile(r"<(/?)(div|a|h3|span)\b([^>]*)>", re.IGNORECASE)
+ATTR_RE = re.compile(r"""([\w:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""")
+STRIP_TAGS_RE = re.compile(r"<[^>]*>")
+
+
+def _attrs(text):
+    return {m.group(1).lower(): html.unescape(m.group(2) or m.group(3) or m.group(4) or "")
+            for m in ATTR_RE.finditer(text)}
+
+
+def _text(fragment):
+    return " ".join(html.unescape(STRIP_TAGS_RE.sub("", fragment)).split())
+
+
+class ResultExtractor:
+    """
+    Extracts {"title", "snippet", "url"} dicts from a DuckDuckGo HTML or Google results
+    page in a single pass over its tags, stopping as soon as max_results results are
+    complete.
+    """
+
+    def __init__(self, engine, max_results=3):
+        self.engine = engine
+        self.max_results = max_results
+        self.results = []
+        self.containers = 0  # Result divs seen before parsing stopped
+        self._result_class = RESULT_CLASSES[engine]
+        self._current = None
+        self._div_depth = 0
+        self._field = None  # Field whose text is being collected
+        self._field_tag = None
+        self._field_depth = 0
+        self._field_start = 0
+
+    @property
+    def done(self):
+        return len(self.results) >= self.max_results
+
+    def parse(self, content):
+        for match in TAG_RE.finditer(content):
+            closing, tag, attr_text = match.group(1), match.group(2).lower(), match.group(3)
+            if closing:
+                self._end(tag, content, match.start())
+                if self.done:
+                    break
+            else:
+                self._start(tag, attr_text, match.end())
+        return self.results
+
+    def _start(self, tag, attr_text, pos):
+        if self._current is None:
+            # Cheap substring test first; most divs on the page are not results.
+            if tag == "div" and self._result_class in attr_text:
+                if self._result_class in _attrs(attr_text).get("class", "").split():
+                    self.containers += 1
+                    self._current = {}
+                    self._div_depth = 1
+            return
+        if tag == "div":
+            self._div_depth += 1
+        if self._field is not None:
+            if tag == self._field_tag:
+                self._field_depth += 1
+            return
+        if self.engine == "DuckDuckGo":
+            self._start_ddg(tag, attr_text, pos)
+        else:
+            self._start_google(tag, attr_text, pos)
+
+    def _start_ddg(self, tag, attr_text, pos):
+        if tag != "a":
+            return
+        attrs = _attrs(attr_text)
+        classes = attrs.get("class", "").split()
+        if "result__a" in classes:
+            self._current.setdefault("url", attrs.get("href", ""))
+            self._collect("title", tag, pos)
+        elif "result__snippet" in classes:
+            self._collect("snippet", tag, pos)
+
+    def _start_google(self, tag, attr_text, pos):
+        if tag == "h3":
+            self._collect("title", tag, pos)
+        elif tag == "span" and "class" in attr_text:
+            self._collect("snippet", tag, pos)
+        elif tag == "a" and "url" not in self._current:
+            href = _attrs(attr_text).get("href", "")
+            if href.startswith(("http://", "https://")):
+                self._current["url"] = href
+
+    def _collect(self, field, tag, pos):
+        if field in self._current:
+            return  # Only the first title / snippet of a result counts.
+        self._field, self._field_tag, self._field_depth, self._field_start = field, tag, 0, pos
+
+    def _end(self, tag, content, pos):
+        if self._current is None:
+            return
+        if self._field is not None and tag == self._field_tag:
+            if self._field_depth:
+                self._field_depth -= 1
+            else:
+                self._current[self._field] = _text(content[self._field_start:pos])
+                self._field = None
+        if tag == "div":
+            self._div_depth -= 1
+            if self._div_depth == 0:
+                if self._current:
+                    self.results.append(self._current)
+                self._current = None
+                self._field = None
+
+
+def extract_results(content, engine, max_results=3):
+    """
+    Parses a results page and returns (results, result_divs_seen).
+    """
+    extractor = ResultExtractor(engine, max_results)
+    return extractor.parse(content), extractor.containers
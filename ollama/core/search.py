@@ -1,8 +1,8 @@
-import re
-import html
 import datetime
 from urllib.parse import quote_plus
 
+from ollama.core.result_parser import extract_results
+
 try:
     from duckduckgo_search import DDGS
 
@@ -11,7 +11,23 @@ except ImportError:
     DDGS_AVAILABLE = False
 
 
-def perform_web_search(query, search_engine="DuckDuckGo", max_results=3, search_timeout=10):
+def perform_web_search(query, search_engine="DuckDuckGo", max_results=3, search_timeout=10, cache=None):
+    """
+    Searches the web and returns {"results": text for the prompt, "debug": text}.
+
+    :param cache: Optional SearchCache; successful searches are stored in it and served from it while fresh.
+    """
+    if cache is not None:
+        cached = cache.get(search_engine, query, max_results)
+        if cached is not None:
+            return {"results": cached["results"], "debug": f"Served from search cache\n{cached['debug']}"}
+    data = _search(query, search_engine, max_results, search_timeout)
+    if data.pop("cacheable", False) and cache is not None:
+        cache.put(search_engine, query, max_results, data)
+    return data
+
+
+def _search(query, search_engine, max_results, search_timeout):
     search_debug_info = f"Search query: \"{query}\"\n"
     search_debug_info += f"Search time: {datetime.datetime.now():%Y-%m-%d %H:%M:%S}\n"
     search_debug_info += f"Search engine: {search_engine}\n"
@@ -64,64 +80,16 @@ def perform_web_search(query, search_engine="DuckDuckGo", max_results=3, search_
 
             content = response.text
 
-            if search_engine == "DuckDuckGo":
-                result_divs = re.findall(
-                    r'<div class="result__body">(.*?)</div>\s*</div>', content, re.DOTALL
-                )
-                search_debug_info += f"Found {len(result_divs)} result divs in HTML\n\n"
-                for i, div in enumerate(result_divs[:max_results]):
-                    title_match = re.search(
-                        r'<a class="result__a" href=".*?">(.*?)</a>', div, re.DOTALL
-                    )
-                    title = (
-                        html.unescape(re.sub(r"<.*?>", "", title_match.group(1)))
-                        if title_match
-                        else "No title"
-                    )
-                    snippet_match = re.search(
-                        r'<a class="result__snippet".*?>(.*?)</a>', div, re.DOTALL
-                    )
-                    snippet = (
-                        html.unescape(re.sub(r"<.*?>", "", snippet_match.group(1)))
-                        if snippet_match
-                        else "No snippet"
-                    )
-                    url_match = re.search(
-                        r'<a class="result__a" href="(.*?)"', div, re.DOTALL
-                    )
-                    url = url_match.group(1) if url_match else "No URL"
-                    search_results.append(
-                        f"Result {i + 1}:\nTitle: {title}\nSnippet: {snippet}\nURL: {url}\n"
-                    )
-                    search_debug_info += f"Result {i + 1} - {title}\n"
-            elif search_engine == "Google":
-                result_divs = re.findall(
-                    r'<div class="g">(.*?)</div>\s*</div>\s*</div>', content, re.DOTALL
+            results, seen = extract_results(content, search_engine, max_results)
+            search_debug_info += f"Parsed {seen} result divs in HTML\n\n"
+            for i, result in enumerate(results):
+                title = result.get("title") or "No title"
+                snippet = result.get("snippet") or "No snippet"
+                url = result.get("url") or "No URL"
+                search_results.append(
+                    f"Result {i + 1}:\nTitle: {title}\nSnippet: {snippet}\nURL: {url}\n"
                 )
-                search_debug_info += f"Found {len(result_divs)} result divs in HTML\n\n"
-                for i, div in enumerate(result_divs[:max_results]):
-                    title_match = re.search(
-                        r'<h3 class=".*?">(.*?)</h3>', div, re.DOTALL
-                    )
-                    title = (
-                        html.unescape(re.sub(r"<.*?>", "", title_match.group(1)))
-                        if title_match
-                        else "No title"
-                    )
-                    snippet_match = re.search(
-                        r'<span class=".*?">(.*?)</span>', div, re.DOTALL
-                    )
-                    snippet = (
-                        html.unescape(re.sub(r"<.*?>", "", snippet_match.group(1)))
-                        if snippet_match
-                        else "No snippet"
-                    )
-                    url_match = re.search(r'<a href="(https?://.*?)"', div, re.DOTALL)
-                    url = url_match.group(1) if url_match else "No URL"
-                    search_results.append(
-                        f"Result {i + 1}:\nTitle: {title}\nSnippet: {snippet}\nURL: {url}\n"
-                    )
-                    search_debug_info += f"Result {i + 1} - {title}\n"
+                search_debug_info += f"Result {i + 1} - {title}\n"
 
         if not search_results:
             search_debug_info += "No search results found.\n"
@@ -129,7 +97,7 @@ def perform_web_search(query, search_engine="DuckDuckGo", max_results=3, search_
 
         search_debug_info += f"\nSearch completed successfully with {len(search_results)} results."
         formatted_results = f"Web search results for: {query}\n\n" + "\n".join(search_results)
-        return {"results": formatted_results, "debug": search_debug_info}
+        return {"results": formatted_results, "debug": search_debug_info, "cacheable": True}
     except Exception as e:
         error_msg = f"Error performing web search: {str(e)}"
         search_debug_info += f"\n{error_msg}"
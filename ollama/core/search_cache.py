@@ -0,0 +1,138 @@
+# ollama/core/search_cache.py
+
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+SEARCH_CACHE_TTL = 30 * 60  # Seconds a result page stays fresh
+SEARCH_CACHE_SIZE = 512  # Entries kept, least recently used dropped first
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+class SearchCache:
+    """
+    LRU cache of web search results keyed by (engine, normalised query, max_results),
+    with a time-to-live. With a path, entries are also kept in a SQLite file so they
+    survive restarts; the in-memory LRU is filled from it on startup.
+    """
+
+    def __init__(self, ttl=SEARCH_CACHE_TTL, max_entries=SEARCH_CACHE_SIZE, path=None):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._open(path)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(engine, query, max_results):
+        return engine, normalize_query(query), int(max_results)
+
+    def get(self, engine, query, max_results):
+        """
+        Returns the cached value, or None if absent or older than the TTL.
+        """
+        key = self.key(engine, query, max_results)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] > self.ttl:
+                self._drop(key)
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if self._db is not None:
+                self._execute(
+                    "UPDATE search_cache SET used_at = ? WHERE engine = ? AND query = ? AND max_results = ?",
+                    (time.time(), *key),
+                )
+            return entry[1]
+
+    def put(self, engine, query, max_results, value):
+        """
+        Stores value (a dict of strings) under the query.
+        """
+        key = self.key(engine, query, max_results)
+        now = time.time()
+        with self._lock:
+            self._entries[key] = (now, value)
+            self._entries.move_to_end(key)
+            if self._db is not None:
+                self._execute(
+                    "INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (*key, now, now, value.get("results"), value.get("debug")),
+                )
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._execute("DELETE FROM search_cache")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._execute("DELETE FROM search_cache WHERE engine = ? AND query = ? AND max_results = ?", key)
+
+    def _execute(self, sql, params=()):
+        try:
+            with self._db:
+                self._db.execute(sql, params)
+        except sqlite3.Error:
+            pass  # The on-disk copy is best effort; the in-memory cache stays correct.
+
+    def _open(self, path):
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            with self._db:
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS search_cache ("
+                    "engine TEXT, query TEXT, max_results INTEGER, stored_at REAL, used_at REAL, "
+                    "results TEXT, debug TEXT, PRIMARY KEY (engine, query, max_results))"
+                )
+                self._db.execute("DELETE FROM search_cache WHERE stored_at < ?", (time.time() - self.ttl,))
+            rows = self._db.execute(
+                "SELECT engine, query, max_results, stored_at, results, debug FROM search_cache "
+                "ORDER BY used_at DESC LIMIT ?", (self.max_entries,)
+            ).fetchall()
+        except sqlite3.Error:
+            self._db = None
+            return
+        for engine, query, max_results, stored_at, results, debug in reversed(rows):
+            self._entries[(engine, query, max_results)] = (stored_at, {"results": results, "debug": debug})
@@ -1,6 +1,32 @@
 import os
 import json
+import time
+import atexit
 import datetime
+import threading
+
+from .session_catalogue import SessionCatalogue, session_summary
+from .session_search import SessionSearchIndex
+
+# A session is a JSON snapshot ({id}.json) plus a journal ({id}.jsonl) of messages appended
+# since. Journal records carry their message index ("seq"), so replay is idempotent even if
+# a crash lands between writing a new snapshot and replacing the old journal. A fresh journal
+# starts with a "base" record (snapshot size and rolling summary) and copies of the newest
+# messages, so a session's tail can be read from the end of its journal alone.
+JOURNAL_SUFFIX = ".jsonl"
+COMPACT_EVERY = 200  # The session is folded back into its snapshot every this many messages
+JOURNAL_KEEP = 50  # Newest messages a fresh journal repeats, so load_session(tail<=this) skips the snapshot
+TAIL_BLOCK = 64 * 1024  # Bytes read per step when reading a journal from its end
+FSYNC_INTERVAL = 2.0  # Max seconds a flushed record waits for fsync (what a power loss could cost)
+CONTEXT_KEY = "ollama_context"  # Model token context of the last reply; only valid while the server runs
+TRANSIENT_KEYS = (CONTEXT_KEY,)  # Session fields never written to disk
+
+_journals = {}  # session_id -> [open file, time of last fsync]
+_journals_lock = threading.Lock()
+_sync_timer = None  # Pending sync_journals() for records flushed but not yet fsynced
+_catalogues = {}
+_search_indexes = {}
+_catalogues_lock = threading.Lock()
 
 def get_sessions_dir():
     base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -9,6 +35,47 @@ def get_sessions_dir():
         os.makedirs(sessions_dir)
     return sessions_dir
 
+def get_catalogue(sessions_dir=None):
+    sessions_dir = sessions_dir or get_sessions_dir()
+    with _catalogues_lock:
+        catalogue = _catalogues.get(sessions_dir)
+        if catalogue is None:
+            catalogue = _catalogues[sessions_dir] = SessionCatalogue(sessions_dir, (".json", JOURNAL_SUFFIX))
+    return catalogue
+
+def get_search_index(sessions_dir=None):
+    sessions_dir = sessions_dir or get_sessions_dir()
+    with _catalogues_lock:
+        index = _search_indexes.get(sessions_dir)
+        if index is None:
+            index = _search_indexes[sessions_dir] = SessionSearchIndex(sessions_dir)
+    return index
+
+def search_sessions(query, limit=20, mode="text"):
+    """
+    Searches the messages of all sessions.
+
+    :param mode: "text" (full-text, BM25), "semantic" (embeddings) or "hybrid" (both, fused).
+    :return: [{"session_id", "seq", "role", "snippet", "score"}], best first.
+    """
+    index = get_search_index()
+    index.sync(get_catalogue().list(), lambda session_id: _read_session(*_session_paths(session_id)))
+    if mode == "semantic":
+        return index.semantic_search(query, limit)
+    if mode == "hybrid":
+        return index.hybrid_search(query, limit)
+    return index.search(query, limit)
+
+def list_sessions(sync=True):
+    """
+    Summaries of all sessions (no messages) from the catalogue, most recent first.
+    With sync, sessions added or changed outside this module are (re)indexed first.
+    """
+    catalogue = get_catalogue()
+    if sync:
+        catalogue.sync(lambda session_id: _read_session(*_session_paths(session_id)))
+    return catalogue.list()
+
 def new_session(current_model):
     sessions_dir = get_sessions_dir()
     timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
@@ -20,19 +87,209 @@ def new_session(current_model):
         "messages": [],
         "created_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "updated_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "message_count": 0,
     }
-    session_file = os.path.join(sessions_dir, f"{session_id}.json")
-    with open(session_file, "w", encoding="utf-8") as f:
-        json.dump(session, f, indent=2)
+    session_file, journal_file = _session_paths(session_id, sessions_dir)
+    _write_snapshot(session, session_file)
+    _start_journal(session, journal_file)
+    get_catalogue(sessions_dir).put(session)
     return session_id, session
 
+def _now():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def _session_paths(session_id, sessions_dir=None):
+    base = os.path.join(sessions_dir or get_sessions_dir(), session_id)
+    return base + ".json", base + JOURNAL_SUFFIX
+
+def _write_snapshot(session, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({k: v for k, v in session.items() if k not in TRANSIENT_KEYS}, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _start_journal(session, path):
+    """
+    Replaces the journal of a session just written to its snapshot: a "base" record, then
+    copies of the newest JOURNAL_KEEP messages (replay skips them as already in the snapshot).
+    """
+    messages = session["messages"]
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        base = {"kind": "base", "messages": len(messages), "summary": session.get("summary")}
+        f.write(json.dumps(base, ensure_ascii=False) + "\n")
+        for seq in range(max(0, len(messages) - JOURNAL_KEEP), len(messages)):
+            record = {"seq": seq, "role": messages[seq]["role"], "content": messages[seq]["content"]}
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _read_session(snapshot_path, journal_path):
+    """
+    Loads a snapshot and replays its journal; torn lines (a crash mid-write) are skipped.
+    """
+    with open(snapshot_path, "r", encoding="utf-8") as f:
+        session = json.load(f)
+    messages = session.setdefault("messages", [])
+    if os.path.exists(journal_path):
+        with open(journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("kind") == "summary":
+                    session["summary"] = {"text": record["text"], "upto": record["upto"]}
+                    continue
+                if record.get("kind") == "base":
+                    continue
+                if record["seq"] < len(messages):
+                    continue  # Already folded into the snapshot.
+                messages.append({"role": record["role"], "content": record["content"]})
+                session["updated_at"] = record.get("at", session.get("updated_at"))
+    session["message_count"] = len(messages)
+    return session
+
+def _lines_backwards(path, block_size=TAIL_BLOCK):
+    """
+    Yields the non-empty lines of a file (as bytes) last first, reading it from the end.
+    """
+    with open(path, "rb") as f:
+        position = f.seek(0, os.SEEK_END)
+        rest = b""
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            lines = (f.read(step) + rest).split(b"\n")
+            rest = lines.pop(0)
+            for line in reversed(lines):
+                if line.strip():
+                    yield line
+        if rest.strip():
+            yield rest
+
+def _read_journal_tail(journal_path, tail):
+    """
+    Reads a journal from its end until it has the newest tail messages and the rolling
+    summary. Returns (messages, message_count, summary), or None if the journal does not
+    reach back far enough and the snapshot is needed.
+    """
+    if not os.path.exists(journal_path):
+        return None
+    messages = []  # Newest first
+    count = summary = None
+    summary_known = False
+    for line in _lines_backwards(journal_path):
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        kind = record.get("kind")
+        if kind == "summary":
+            if not summary_known:
+                summary, summary_known = {"text": record["text"], "upto": record["upto"]}, True
+        elif kind == "base":
+            count = record["messages"] if count is None else count
+            if not summary_known:
+                summary, summary_known = record.get("summary"), True
+            break
+        else:
+            count = record["seq"] + 1 if count is None else count
+            if len(messages) < tail:
+                if record["seq"] != count - 1 - len(messages):
+                    return None
+                messages.append({"role": record["role"], "content": record["content"]})
+        if summary_known and count is not None and len(messages) >= min(tail, count):
+            break
+    if not summary_known or count is None or len(messages) < min(tail, count):
+        return None
+    messages.reverse()
+    return messages, count, summary
+
+def _append_journal(session_id, record):
+    global _sync_timer
+    with _journals_lock:
+        entry = _journals.get(session_id)
+        if entry is None:
+            _, journal_path = _session_paths(session_id)
+            entry = _journals[session_id] = [open(journal_path, "a", encoding="utf-8"), time.monotonic()]
+            if entry[0].tell() and not _ends_with_newline(journal_path):
+                entry[0].write("\n")  # Leave a torn record from a crash on a line of its own.
+        f = entry[0]
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()  # In the OS's hands: survives the app crashing, if not the machine.
+        if time.monotonic() - entry[1] >= FSYNC_INTERVAL:
+            os.fsync(f.fileno())
+            entry[1] = time.monotonic()
+        elif _sync_timer is None:
+            # Synced when the interval is up even if no further record arrives.
+            _sync_timer = threading.Timer(FSYNC_INTERVAL, _timed_sync)
+            _sync_timer.daemon = True
+            _sync_timer.start()
+
+def _timed_sync():
+    global _sync_timer
+    with _journals_lock:
+        _sync_timer = None
+    sync_journals()
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+def close_journal(session_id):
+    """
+    fsyncs and closes the session's journal if it is open, e.g. when switching away from it.
+    """
+    with _journals_lock:
+        entry = _journals.pop(session_id, None)
+    if entry is not None:
+        os.fsync(entry[0].fileno())
+        entry[0].close()
+
+def sync_journals():
+    """
+    fsyncs every open session journal.
+    """
+    with _journals_lock:
+        for entry in _journals.values():
+            os.fsync(entry[0].fileno())
+            entry[1] = time.monotonic()
+
+def close_journals():
+    global _sync_timer
+    for session_id in list(_journals):
+        close_journal(session_id)
+    with _journals_lock:
+        if _sync_timer is not None:
+            _sync_timer.cancel()
+            _sync_timer = None
+
+atexit.register(close_journals)
+
 def save_session(session, sessions_dir=None):
-    if not sessions_dir:
-        sessions_dir = get_sessions_dir()
-    session["updated_at"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    session_file = os.path.join(sessions_dir, f"{session['id']}.json")
-    with open(session_file, "w", encoding="utf-8") as f:
-        json.dump(session, f, indent=2)
+    """
+    Compacts the session: rewrites its snapshot with every message and empties its journal.
+    """
+    session["updated_at"] = _now()
+    snapshot_path, journal_path = _session_paths(session["id"], sessions_dir)
+    close_journal(session["id"])
+    full = session
+    if len(session["messages"]) < session.get("message_count", 0):
+        # Only the tail was loaded; the rest still lives on disk.
+        full = _read_session(snapshot_path, journal_path)
+        full.update({k: v for k, v in session.items() if k != "messages"})
+        full["messages"] = full["messages"][:session["message_count"]]
+    full["message_count"] = len(full["messages"])
+    _write_snapshot(full, snapshot_path)
+    _start_journal(full, journal_path)
+    session["message_count"] = full["message_count"]
+    get_catalogue(sessions_dir).put(full)
 
 def load_sessions():
     sessions = {}
@@ -40,28 +297,52 @@ def load_sessions():
     session_files = [f for f in os.listdir(sessions_dir) if f.endswith(".json")]
     for file in session_files:
         try:
-            with open(os.path.join(sessions_dir, file), "r", encoding="utf-8") as f:
-                session_data = json.load(f)
-                sessions[session_data["id"]] = session_data
+            session_data = _read_session(
+                os.path.join(sessions_dir, file), os.path.join(sessions_dir, file[:-5] + JOURNAL_SUFFIX)
+            )
+            sessions[session_data["id"]] = session_data
         except Exception as e:
             print(f"Error loading session {file}: {str(e)}")
     return sessions
 
-def load_session(session_id):
-    sessions_dir = get_sessions_dir()
-    session_file = os.path.join(sessions_dir, f"{session_id}.json")
+def load_session(session_id, tail=None):
+    """
+    Loads a session with its journal replayed. With tail, only the last tail messages are
+    kept in "messages" ("message_count" still holds the total): they are read from the end
+    of the journal and the other fields from the catalogue, and the snapshot is parsed only
+    if the journal does not reach back far enough.
+    """
     try:
-        with open(session_file, "r", encoding="utf-8") as f:
-            session_data = json.load(f)
-            return session_data
+        snapshot_path, journal_path = _session_paths(session_id)
+        session_data = _load_tail(session_id, journal_path, tail) if tail is not None else None
+        if session_data is None:
+            session_data = _read_session(snapshot_path, journal_path)
+            if tail is not None:
+                session_data["messages"] = session_data["messages"][-tail:] if tail else []
+        return session_data
     except Exception as e:
         print(f"Error loading session {session_id}: {str(e)}")
         return None
 
+def _load_tail(session_id, journal_path, tail):
+    found = _read_journal_tail(journal_path, tail)
+    row = get_catalogue().get(session_id)
+    if found is None or row is None or row["message_count"] != found[1]:
+        return None  # Not enough journal, or a catalogue that has not caught up with it.
+    messages, count, summary = found
+    session = dict(row, messages=messages, message_count=count)
+    if summary:
+        session["summary"] = summary
+    return session
+
 def delete_session(session_id):
-    sessions_dir = get_sessions_dir()
-    session_file = os.path.join(sessions_dir, f"{session_id}.json")
+    session_file, journal_file = _session_paths(session_id)
     try:
+        close_journal(session_id)
+        if os.path.exists(journal_file):
+            os.remove(journal_file)
+        get_catalogue().remove(session_id)
+        get_search_index().remove_session(session_id)
         if os.path.exists(session_file):
             os.remove(session_file)
             return True
@@ -87,8 +368,30 @@ def export_session(session, file_path):
         return False
 
 def store_message_in_session(session, role, message):
+    """
+    Appends the message to the session and its journal; the snapshot is only rewritten
+    every COMPACT_EVERY messages.
+    """
+    seq = session.get("message_count", len(session["messages"]))
     session["messages"].append({"role": role, "content": message})
-    save_session(session)
+    session["message_count"] = seq + 1
+    session["updated_at"] = _now()
+    _append_journal(session["id"], {"seq": seq, "role": role, "content": message, "at": session["updated_at"]})
+    get_search_index().add(session["id"], seq, role, message)
+    # Compacting at multiples keeps the journal bounded without tracking how much of it a
+    # tail-loaded session has seen.
+    if session["message_count"] % COMPACT_EVERY == 0:
+        save_session(session)
+    else:
+        get_catalogue().put(session)
+
+def store_session_summary(session, summary):
+    """
+    Records the rolling summary ({"text", "upto"}) of the session's older messages.
+    """
+    session["summary"] = summary
+    _append_journal(session["id"], {"kind": "summary", "text": summary["text"], "upto": summary["upto"]})
+    get_catalogue().put(session)  # Records the journal's new mtime, so sync() need not re-read it.
 
 def get_session_messages(session):
     return session.get("messages", [])
@@ -0,0 +1,127 @@
+# ollama/core/session_catalogue.py
+
+import os
+import sqlite3
+import threading
+
+CATALOGUE_FILE = "catalogue.sqlite3"
+SUMMARY_FIELDS = ("id", "title", "model", "created_at", "updated_at", "message_count")
+
+
+def session_summary(session):
+    """
+    The catalogue row of a session dict: everything but the messages.
+    """
+    summary = {field: session.get(field) for field in SUMMARY_FIELDS}
+    if summary["message_count"] is None:
+        summary["message_count"] = len(session.get("messages", []))
+    return summary
+
+
+def files_mtime(sessions_dir, session_id, suffixes):
+    """
+    Latest modification time over a session's files, or None if it has none.
+    """
+    mtimes = []
+    for suffix in suffixes:
+        try:
+            mtimes.append(os.stat(os.path.join(sessions_dir, session_id + suffix)).st_mtime_ns)
+        except FileNotFoundError:
+            pass
+    return max(mtimes) if mtimes else None
+
+
+class SessionCatalogue:
+    """
+    SQLite index of session summaries (id, title, model, timestamps, message count) kept
+    next to the session files, so listing sessions never parses them. Each row records the
+    modification time of the files it was built from; sync() re-reads only sessions whose
+    files changed behind the catalogue's back.
+    """
+
+    def __init__(self, sessions_dir, suffixes=(".json", ".jsonl")):
+        self.sessions_dir = sessions_dir
+        self.suffixes = suffixes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(sessions_dir, CATALOGUE_FILE), check_same_thread=False)
+        # The catalogue can always be rebuilt from the session files, so commits need not wait for the disk.
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=OFF")
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, title TEXT, model TEXT, created_at TEXT, updated_at TEXT, "
+                "message_count INTEGER, mtime INTEGER)"
+            )
+
+    def put(self, session):
+        """
+        Records the session's summary; call after its files were written.
+        """
+        summary = session_summary(session)
+        mtime = files_mtime(self.sessions_dir, summary["id"], self.suffixes)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*(summary[f] for f in SUMMARY_FIELDS), mtime),
+            )
+
+    def remove(self, session_id):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def get(self, session_id):
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(SUMMARY_FIELDS)} FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+        return dict(zip(SUMMARY_FIELDS, row)) if row else None
+
+    def list(self):
+        """
+        Session summaries, most recently updated first.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(SUMMARY_FIELDS)} FROM sessions ORDER BY updated_at DESC, id DESC"
+            ).fetchall()
+        return [dict(zip(SUMMARY_FIELDS, row)) for row in rows]
+
+    def sync(self, read_session):
+        """
+        Brings the catalogue in line with the session files on disk, using only directory
+        metadata for sessions that have not changed.
+
+        :param read_session: fn(session_id) -> full session dict, for new or changed sessions.
+        :return: Number of sessions re-read.
+        """
+        on_disk = {}
+        with os.scandir(self.sessions_dir) as entries:
+            for entry in entries:
+                for suffix in self.suffixes:
+                    if entry.name.endswith(suffix) and entry.is_file():
+                        session_id = entry.name[:-len(suffix)]
+                        mtime = entry.stat().st_mtime_ns
+                        on_disk[session_id] = max(on_disk.get(session_id, 0), mtime)
+                        break
+        with self._lock:
+            known = dict(self._db.execute("SELECT id, mtime FROM sessions").fetchall())
+        for session_id in known.keys() - on_disk.keys():
+            self.remove(session_id)
+        reread = 0
+        for session_id, mtime in on_disk.items():
+            if known.get(session_id) == mtime:
+                continue
+            try:
+                session = read_session(session_id)
+            except Exception as e:
+                print(f"Error indexing session {session_id}: {str(e)}")
+                continue
+            if session is not None:
+                self.put(session)
+                reread += 1
+        return reread
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,222 @@
+# ollama/core/session_search.py
+
+import os
+import re
+import sqlite3
+import threading
+
+import numpy as np
+
+SEARCH_FILE = "search.sqlite3"
+EMBED_BATCH_SIZE = 64
+SNIPPET_TOKENS = 16  # Words of context shown around a match
+QUERY_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _fts_query(query):
+    """
+    Turns free text into an FTS5 query: every word must match, the last one as a prefix
+    (so results show up while typing). Words are quoted, so no input is a syntax error.
+    """
+    tokens = QUERY_TOKEN_RE.findall(query)
+    if not tokens:
+        return None
+    terms = [f'"{t}"' for t in tokens[:-1]] + [f'"{tokens[-1]}"*']
+    return " ".join(terms)
+
+
+class SessionSearchIndex:
+    """
+    Search over every message of every chat session: an SQLite FTS5 index ranked by BM25,
+    plus optional embedding vectors for semantic search. Messages are added as they are
+    stored; sync() catches up with sessions written elsewhere using the catalogue's
+    message counts, so unchanged sessions are never re-read.
+    """
+
+    def __init__(self, sessions_dir, model_name=None):
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(sessions_dir, SEARCH_FILE), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=OFF")  # Rebuildable from the session files.
+        with self._db:
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS messages USING fts5("
+                "content, session_id UNINDEXED, seq UNINDEXED, role UNINDEXED, tokenize='unicode61')"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS indexed (session_id TEXT PRIMARY KEY, count INTEGER)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS vectors (msg INTEGER PRIMARY KEY, model TEXT, vector BLOB)"
+            )
+        self._matrix = None  # (rowids, unit vectors) cache for semantic search
+        self._matrix_model = None
+
+    def add(self, session_id, seq, role, content):
+        """
+        Indexes one message; seq is its position in the session.
+        """
+        self.add_many(session_id, [(seq, role, content)])
+
+    def add_many(self, session_id, messages):
+        """
+        Indexes (seq, role, content) messages of a session in one transaction. Positions
+        already indexed are ignored, so replaying a session is harmless.
+        """
+        with self._lock, self._db:
+            row = self._db.execute("SELECT count FROM indexed WHERE session_id = ?", (session_id,)).fetchone()
+            count = row[0] if row else 0
+            fresh = [(content, session_id, seq, role) for seq, role, content in messages if seq >= count]
+            if not fresh:
+                return 0
+            self._db.executemany("INSERT INTO messages (content, session_id, seq, role) VALUES (?, ?, ?, ?)", fresh)
+            self._db.execute(
+                "INSERT OR REPLACE INTO indexed VALUES (?, ?)", (session_id, max(f[2] for f in fresh) + 1)
+            )
+        return len(fresh)
+
+    def remove_session(self, session_id):
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM vectors WHERE msg IN (SELECT rowid FROM messages WHERE session_id = ?)", (session_id,)
+            )
+            self._db.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._db.execute("DELETE FROM indexed WHERE session_id = ?", (session_id,))
+            self._matrix = None
+
+    def sync(self, summaries, read_session):
+        """
+        Indexes messages missing from the index and drops sessions that no longer exist.
+
+        :param summaries: Catalogue summaries ({"id", "message_count", ...}) of all sessions.
+        :param read_session: fn(session_id) -> full session dict.
+        :return: Number of messages added.
+        """
+        with self._lock:
+            indexed = dict(self._db.execute("SELECT session_id, count FROM indexed").fetchall())
+        wanted = {s["id"]: s.get("message_count") or 0 for s in summaries}
+        for session_id in indexed.keys() - wanted.keys():
+            self.remove_session(session_id)
+        added = 0
+        for session_id, count in wanted.items():
+            done = indexed.get(session_id, 0)
+            if count == done:
+                continue
+            if count < done:
+                self.remove_session(session_id)  # Rewritten elsewhere; index it afresh.
+                done = 0
+            session = read_session(session_id)
+            if session is None:
+                continue
+            added += self.add_many(session_id, [
+                (seq, message.get("role"), message.get("content", ""))
+                for seq, message in enumerate(session.get("messages", [])[done:], start=done)
+            ])
+        return added
+
+    def search(self, query, limit=20):
+        """
+        Ranked full-text search (BM25).
+        :return: [{"session_id", "seq", "role", "snippet", "score"}], best first.
+        """
+        fts_query = _fts_query(query)
+        if fts_query is None:
+            return []
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT session_id, seq, role, "
+                f"snippet(messages, 0, '[', ']', '...', {SNIPPET_TOKENS}), bm25(messages) "
+                "FROM messages WHERE messages MATCH ? ORDER BY bm25(messages) LIMIT ?",
+                (fts_query, limit),
+            ).fetchall()
+        return [
+            {"session_id": sid, "seq": seq, "role": role, "snippet": snippet, "score": -score}
+            for sid, seq, role, snippet, score in rows
+        ]
+
+    def embed_pending(self, model_name=None, batch_size=EMBED_BATCH_SIZE):
+        """
+        Computes embedding vectors for messages that have none for model_name yet.
+        :return: Number of messages embedded.
+        """
+        from ollama.kb.embedder import DEFAULT_MODEL, get_embedder
+        model_name = model_name or self.model_name or DEFAULT_MODEL
+        with self._lock:
+            pending = self._db.execute(
+                "SELECT rowid, content FROM messages WHERE rowid NOT IN "
+                "(SELECT msg FROM vectors WHERE model = ?)", (model_name,)
+            ).fetchall()
+        if not pending:
+            return 0
+        model = get_embedder(model_name)
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            vectors = np.asarray(
+                model.encode([content for _, content in batch], convert_to_numpy=True), dtype=np.float32
+            )
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            with self._lock, self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO vectors VALUES (?, ?, ?)",
+                    [(rowid, model_name, vector.tobytes()) for (rowid, _), vector in zip(batch, vectors)],
+                )
+        self._matrix = None
+        return len(pending)
+
+    def semantic_search(self, query, limit=20, model_name=None):
+        """
+        Messages closest in meaning to query (cosine similarity), embedding any new messages first.
+        :return: Same shape as search(), with "snippet" holding the start of the message.
+        """
+        from ollama.kb.embedder import DEFAULT_MODEL, get_embedder
+        model_name = model_name or self.model_name or DEFAULT_MODEL
+        self.embed_pending(model_name)
+        rowids, matrix = self._vectors(model_name)
+        if not len(rowids):
+            return []
+        q = np.asarray(get_embedder(model_name).encode([query], convert_to_numpy=True), dtype=np.float32)[0]
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+        scores = matrix @ q
+        top = min(limit, len(scores))
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best])]
+        with self._lock:
+            results = []
+            for i in best:
+                row = self._db.execute(
+                    "SELECT session_id, seq, role, substr(content, 1, 200) FROM messages WHERE rowid = ?",
+                    (int(rowids[i]),),
+                ).fetchone()
+                if row:
+                    results.append({"session_id": row[0], "seq": row[1], "role": row[2], "snippet": row[3],
+                                    "score": float(scores[i])})
+        return results
+
+    def hybrid_search(self, query, limit=20, model_name=None):
+        """
+        Reciprocal-rank fusion of full-text and semantic results.
+        """
+        from ollama.kb.lexical import reciprocal_rank_fusion
+        lexical = self.search(query, limit * 2)
+        semantic = self.semantic_search(query, limit * 2, model_name)
+        by_key = {}
+        for result in semantic + lexical:
+            by_key[(result["session_id"], result["seq"])] = result
+        fused = reciprocal_rank_fusion(
+            [[(r["session_id"], r["seq"]) for r in lexical], [(r["session_id"], r["seq"]) for r in semantic]],
+            limit,
+        )
+        return [by_key[key] for key in fused]
+
+    def _vectors(self, model_name):
+        if self._matrix is None or self._matrix_model != model_name:
+            with self._lock:
+                rows = self._db.execute("SELECT msg, vector FROM vectors WHERE model = ?", (model_name,)).fetchall()
+            rowids = np.array([r[0] for r in rows], dtype=np.int64)
+            matrix = (np.stack([np.frombuffer(r[1], dtype=np.float32) for r in rows])
+                      if rows else np.zeros((0, 0), dtype=np.float32))
+            self._matrix, self._matrix_model = (rowids, matrix), model_name
+        return self._matrix
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -1,5 +1,6 @@
 # chat_gui_main.py
 
+import multiprocessing
 import tkinter as tk
 import ttkbootstrap as tb
 from ttkbootstrap.constants import *
@@ -67,23 +68,30 @@ class OllamaApp:
     def process_message(self, user_input):
         self.chat_interface.start_progress_indicator("Generating response")
         def task():
-            response_data = self.core_manager.generate_response(
-                user_input,
-                with_search=True,
-                with_local_kb=self.core_manager.local_kb_enabled
-            )
-            if response_data.get("success"):
-                ai_resp = response_data.get("ai_response", "")
-                self.root.after(0, lambda: self.chat_interface.display_message("🤖 AI", ai_resp, tag="ai"))
+            stream = self.chat_interface.stream_message("🤖 AI", tag="ai")
+            try:
+                for piece in self.core_manager.stream_response(
+                    user_input,
+                    with_search=True,
+                    with_local_kb=self.core_manager.local_kb_enabled
+                ):
+                    stream.write(piece)
+                ai_resp = stream.close()
+                self.core_manager.store_message_in_session("user", user_input)
                 self.core_manager.store_message_in_session("assistant", ai_resp)
-            else:
-                err = response_data.get("error", "Unknown error")
+            except Exception as e:
+                partial = stream.close()
+                self.core_manager.store_message_in_session("user", user_input)
+                if partial:
+                    self.core_manager.store_message_in_session("assistant", partial)
+                err = str(e) or "Unknown error"
                 self.root.after(0, lambda: self.chat_interface.display_error(err))
 
             if self.core_manager.show_web_debug and self.core_manager.search_debug_info:
                 self.root.after(0, lambda: self.chat_interface.display_search_info(self.core_manager.search_debug_info))
-            if self.core_manager.show_kb_debug and response_data.get("kb_debug_info"):
-                self.root.after(0, lambda: self.chat_interface.display_search_info(response_data.get("kb_debug_info")))
+            kb_debug_info = self.core_manager.kb_debug_info
+            if self.core_manager.show_kb_debug and kb_debug_info:
+                self.root.after(0, lambda: self.chat_interface.display_search_info(kb_debug_info))
 
             self.root.after(0, self.chat_interface.stop_progress_indicator)
         threading.Thread(target=task, daemon=True).start()
@@ -134,6 +142,7 @@ class OllamaApp:
         return None
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     root = tb.Window(themename="darkly")
     app = OllamaApp(root)
     root.mainloop()
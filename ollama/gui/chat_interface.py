@@ -1,6 +1,8 @@
 import tkinter as tk
 from tkinter import scrolledtext, ttk, filedialog
 
+from ollama.gui.text_stream import TextStream
+
 class ChatInterface:
     def __init__(
         self,
@@ -209,6 +211,12 @@ class ChatInterface:
         self.chat_display.see(tk.END)
         self.chat_display.config(state=tk.DISABLED)
 
+    def stream_message(self, sender, tag=None):
+        """
+        Returns a TextStream that appends a message to the conversation as its text arrives.
+        """
+        return TextStream(self.chat_display, header=f"\n{sender}: ", tag=tag)
+
     def display_search_info(self, info):
         self.display_message("🔍", info, tag="search_info")
 
@@ -7,10 +7,20 @@ class SessionPanel:
         self.parent = parent
         self.core_manager = core_manager
         self.on_session_change = on_session_change
+        self.session_ids = []  # Listbox row -> session id
 
         self.frame = ttk.LabelFrame(self.parent, text="Chat Sessions")
         self.frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
+        search_frame = ttk.Frame(self.frame)
+        search_frame.pack(fill=tk.X, padx=5, pady=(0, 5))
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
+        self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.search_entry.bind("<Return>", lambda e: self.search_sessions())
+        self.search_btn = ttk.Button(search_frame, text="Search", command=self.search_sessions)
+        self.search_btn.pack(side=tk.LEFT, padx=(5, 0))
+
         self.listbox = tk.Listbox(self.frame, bg="#363636", fg="#ffffff", selectbackground="#4a6da7")
         self.listbox.pack(fill=tk.BOTH, expand=True)
         self.listbox.bind("<Double-1>", self.open_selected_session)
@@ -26,51 +36,65 @@ class SessionPanel:
         self.export_btn.pack(side=tk.RIGHT)
 
     def refresh_sessions(self):
+        # Listed from the session catalogue; messages are only loaded when a session is opened.
         self.listbox.delete(0, tk.END)
-        session_names = []
+        self.session_ids = []
         for session_id, session in self.core_manager.sessions.items():
-            name = session.get("title", f"Session {session_id}")
-            session_names.append(name)
-        for name in session_names:
-            self.listbox.insert(tk.END, name)
+            name = session.get("title") or f"Session {session_id}"
+            self.session_ids.append(session_id)
+            self.listbox.insert(tk.END, f"{name} ({session.get('message_count') or 0})")
 
-    def open_selected_session(self, event=None):
+    def search_sessions(self):
+        """
+        Lists only sessions with messages matching the search box, best match first,
+        with a snippet of the match. An empty search lists all sessions again.
+        """
+        query = self.search_var.get().strip()
+        if not query:
+            self.refresh_sessions()
+            return
+        self.listbox.delete(0, tk.END)
+        self.session_ids = []
+        for result in self.core_manager.search_history(query, limit=200):
+            session_id = result["session_id"]
+            if session_id in self.session_ids or session_id not in self.core_manager.sessions:
+                continue
+            name = self.core_manager.sessions[session_id].get("title") or f"Session {session_id}"
+            snippet = " ".join(result["snippet"].split())
+            self.session_ids.append(session_id)
+            self.listbox.insert(tk.END, f"{name}: {snippet}")
+
+    def selected_session_id(self):
         if not self.listbox.curselection():
+            return None
+        return self.session_ids[self.listbox.curselection()[0]]
+
+    def open_selected_session(self, event=None):
+        session_id = self.selected_session_id()
+        if session_id is None:
             return
-        index = self.listbox.curselection()[0]
-        session_name = self.listbox.get(index)
-        for session_id, session in self.core_manager.sessions.items():
-            if session.get("title") == session_name:
-                if self.core_manager.load_session(session_id):
-                    self.on_session_change(session)
-                break
+        if self.core_manager.load_session(session_id):
+            self.on_session_change(self.core_manager.current_session)
 
     def delete_selected_session(self):
-        if not self.listbox.curselection():
+        session_id = self.selected_session_id()
+        if session_id is None:
             return
-        index = self.listbox.curselection()[0]
-        session_name = self.listbox.get(index)
+        session_name = self.core_manager.sessions[session_id].get("title") or session_id
         confirm = messagebox.askyesno("Confirm Deletion", f"Delete session '{session_name}'?")
         if confirm:
-            for session_id, session in list(self.core_manager.sessions.items()):
-                if session.get("title") == session_name:
-                    self.core_manager.delete_session(session_id)
-                    self.refresh_sessions()
-                    break
+            self.core_manager.delete_session(session_id)
+            self.refresh_sessions()
 
     def export_selected_session(self):
-        if not self.listbox.curselection():
+        session_id = self.selected_session_id()
+        if session_id is None:
             return
-        index = self.listbox.curselection()[0]
-        session_name = self.listbox.get(index)
+        session_name = self.core_manager.sessions[session_id].get("title") or session_id
         file_path = filedialog.asksaveasfilename(defaultextension=".json",
                                                  filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
                                                  initialfile=f"OllamaChat_{session_name.replace(' ', '_')}.json")
         if file_path:
-            for session_id, session in self.core_manager.sessions.items():
-                if session.get("title") == session_name:
-                    success = self.core_manager.export_session(session_id, file_path)
-                    if success:
-                        messagebox.showinfo("Export Successful", f"Session exported to {file_path}")
-                    break
-# This file was created by the setup script
+            success = self.core_manager.export_session(session_id, file_path)
+            if success:
+                messagebox.showinfo("Export Successful", f"Session exported to {file_path}")
@@ -55,6 +55,10 @@ class SettingsPanel:
         self.kb_top_k_spinbox.set(3)
         self.kb_top_k_spinbox.pack(anchor=tk.W)
 
+        self.kb_status_label = ttk.Label(kb_frame, text="")
+        self.kb_status_label.pack(anchor=tk.W)
+        self._kb_refresh_pending = False
+
         ttk.Label(kb_frame, text="Allowed KB Files:").pack(anchor=tk.W)
         self.kb_file_checkbuttons = {}
         self.kb_check_vars = {}
@@ -111,14 +115,21 @@ class SettingsPanel:
         for widget in self.kb_file_check_frame.winfo_children():
             widget.destroy()
         files = set()
+        self.update_kb_status()
         try:
-            if not hasattr(self.core_manager, "kb_helper") or not self.core_manager.kb_helper.kb_metadata:
-                from ollama.core.kb_helper import KnowledgeBaseHelper
-                self.core_manager.kb_helper = KnowledgeBaseHelper()
-            for meta in self.core_manager.kb_helper.kb_metadata:
-                source = meta.get("source", "")
-                if source:
-                    files.add(os.path.basename(source))
+            if self.core_manager.is_ready("kb_helper"):
+                kb_metadata = self.core_manager.kb_helper.kb_metadata or []
+                # Bundled metadata exposes its distinct sources; plain lists need a full scan.
+                sources = getattr(kb_metadata, "sources", None)
+                if sources is None:
+                    sources = [meta.get("source", "") for meta in kb_metadata]
+                for source in sources:
+                    if source:
+                        files.add(os.path.basename(source))
+            elif not self._kb_refresh_pending:
+                # Never block the UI on the KB; list the known documents now and refresh once it has loaded.
+                self._kb_refresh_pending = True
+                self.core_manager.when_ready("kb_helper", lambda _: self.parent.after(0, self._on_kb_loaded))
             if not files:
                 metadata = load_document_metadata()
                 for record in metadata.values():
@@ -136,6 +147,22 @@ class SettingsPanel:
             self.kb_check_vars[file] = var
             self.kb_file_checkbuttons[file] = chk
 
+    def _on_kb_loaded(self):
+        self._kb_refresh_pending = False
+        self.refresh_kb_file_list()
+
+    def update_kb_status(self):
+        status = self.core_manager.component_status()["kb_helper"]
+        if status["state"] == "ready":
+            text = f"Knowledge base ready ({status['seconds']:.1f}s)" if status["seconds"] else "Knowledge base ready"
+        elif status["state"] == "failed":
+            text = f"Knowledge base failed to load: {status['error']}"
+        elif status["state"] == "loading":
+            text = "Knowledge base loading..."
+        else:
+            text = "Knowledge base not loaded"
+        self.kb_status_label.config(text=text)
+
     def apply_kb_file_filter(self):
         selected_files = [f for f, v in self.kb_check_vars.items() if v.get()]
         if selected_files:
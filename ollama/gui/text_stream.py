@@ -0,0 +1,78 @@
+# ollama/gui/text_stream.py
+
+import threading
+import tkinter as tk
+
+FLUSH_INTERVAL_MS = 50  # Streamed text is inserted at most this often, however fast tokens arrive
+
+
+class TextStream:
+    """
+    Feeds text produced on a worker thread into a Tk text widget. Pieces are buffered
+    and inserted in one go per flush, so the widget redraws a few times a second
+    rather than once per token.
+    """
+
+    def __init__(self, widget, header="", trailer="\n\n", tag=None, interval_ms=FLUSH_INTERVAL_MS):
+        """
+        :param widget: Text widget to append to; it may be kept DISABLED between flushes.
+        :param header: Inserted before the first piece (e.g. the sender label).
+        :param trailer: Inserted by close() if anything was written.
+        """
+        self.widget = widget
+        self.header = header
+        self.trailer = trailer
+        self.tag = tag
+        self.interval_ms = interval_ms
+        self._lock = threading.Lock()
+        self._pending = []
+        self._pieces = []
+        self._scheduled = False
+
+    @property
+    def started(self):
+        return bool(self._pieces)
+
+    @property
+    def text(self):
+        return "".join(self._pieces)
+
+    def write(self, piece):
+        """
+        Queues piece for display. Safe to call from any thread.
+        """
+        if not piece:
+            return
+        with self._lock:
+            if not self._pieces:
+                self._pending.append(self.header)
+            self._pending.append(piece)
+            self._pieces.append(piece)
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.widget.after(self.interval_ms, self._flush)
+
+    def close(self):
+        """
+        Flushes what is left and ends the message. Safe to call from any thread.
+        :return: The full streamed text.
+        """
+        with self._lock:
+            if self._pieces:
+                self._pending.append(self.trailer)
+        self.widget.after(0, self._flush)
+        return self.text
+
+    def _flush(self):
+        with self._lock:
+            text = "".join(self._pending)
+            self._pending.clear()
+            self._scheduled = False
+        if not text:
+            return
+        state = self.widget.cget("state")
+        self.widget.config(state=tk.NORMAL)
+        self.widget.insert(tk.END, text, self.tag)
+        self.widget.config(state=state)
+        self.widget.see(tk.END)
@@ -0,0 +1,291 @@
+# ollama/kb/ann.py
+import math
+import time
+
+import numpy as np
+import faiss
+
+INDEX_KINDS = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+# How vectors are stored inside flat, IVF-Flat and HNSW indexes (IVF-PQ is always PQ-coded).
+STORAGE_KINDS = ("float32", "float16", "sq8", "pq")
+_SQ_TYPES = {"float16": "QT_fp16", "sq8": "QT_8bit"}
+
+# Automatic selection thresholds (chunk counts).
+FLAT_MAX_CHUNKS = 20_000
+IVF_FLAT_MAX_CHUNKS = 500_000
+
+TRAIN_POINTS_PER_CENTROID = 64
+MAX_TRAIN_POINTS = 200_000
+SQ_TRAIN_POINTS = 20_000  # Enough to estimate per-dimension ranges for int8 scalar quantization
+
+
+def choose_index_kind(n_chunks):
+    """
+    Picks an index kind for a corpus size: exact search while brute force is cheap,
+    IVF-Flat for mid-sized corpora and IVF-PQ once raw vectors stop fitting comfortably in RAM.
+    """
+    if n_chunks <= FLAT_MAX_CHUNKS:
+        return "flat"
+    if n_chunks <= IVF_FLAT_MAX_CHUNKS:
+        return "ivf_flat"
+    return "ivf_pq"
+
+
+def default_params(kind, n_chunks, dim, storage="float32"):
+    """
+    Returns build and search parameters for kind and vector storage sized to n_chunks.
+    """
+    if storage not in STORAGE_KINDS:
+        raise ValueError(f"Unknown vector storage: {storage}")
+    params = {} if storage == "float32" else {"storage": storage}
+    if kind in ("ivf_flat", "ivf_pq"):
+        nlist = max(1, min(int(4 * math.sqrt(max(n_chunks, 1))), n_chunks // 39 or 1))
+        params.update(nlist=nlist, nprobe=min(nlist, max(8, nlist // 16), 64))
+    elif kind == "hnsw":
+        params.update(hnsw_m=32, ef_construction=80, ef_search=64)
+    if kind == "ivf_pq" or storage == "pq":
+        m = _pq_subquantizers(dim)
+        nbits = min(8, max(4, int(math.log2(max(n_chunks // 39, 16)))))
+        params.update(m=m, nbits=nbits)
+    return params
+
+
+def _pq_subquantizers(dim):
+    # Largest divisor of dim giving sub-vectors of at least 4 dimensions.
+    for m in range(dim // 4, 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def create_index(kind, dim, params):
+    """
+    Creates an empty ID-mapped index of the given kind and params["storage"].
+    Anything other than float32 flat/HNSW storage must be trained before adding.
+    """
+    storage = params.get("storage", "float32")
+    sq_type = getattr(faiss.ScalarQuantizer, _SQ_TYPES[storage]) if storage in _SQ_TYPES else None
+    if kind == "flat":
+        if sq_type is not None:
+            inner = faiss.IndexScalarQuantizer(dim, sq_type, faiss.METRIC_L2)
+        elif storage == "pq":
+            inner = faiss.IndexPQ(dim, params["m"], params["nbits"])
+        else:
+            inner = faiss.IndexFlatL2(dim)
+    elif kind == "ivf_flat" and storage != "pq":
+        quantizer = faiss.IndexFlatL2(dim)
+        if sq_type is not None:
+            inner = faiss.IndexIVFScalarQuantizer(quantizer, dim, params["nlist"], sq_type, faiss.METRIC_L2)
+        else:
+            inner = faiss.IndexIVFFlat(quantizer, dim, params["nlist"], faiss.METRIC_L2)
+    elif kind in ("ivf_flat", "ivf_pq"):
+        inner = faiss.IndexIVFPQ(faiss.IndexFlatL2(dim), dim, params["nlist"], params["m"], params["nbits"])
+    elif kind == "hnsw":
+        if sq_type is not None:
+            inner = faiss.IndexHNSWSQ(dim, sq_type, params["hnsw_m"])
+        elif storage == "pq":
+            inner = faiss.IndexHNSWPQ(dim, params["m"], params["hnsw_m"], params["nbits"])
+        else:
+            inner = faiss.IndexHNSWFlat(dim, params["hnsw_m"])
+        inner.hnsw.efConstruction = params["ef_construction"]
+    else:
+        raise ValueError(f"Unknown index kind: {kind}")
+    index = faiss.IndexIDMap2(inner)
+    apply_search_params(index, params)
+    return index
+
+
+def supports_remove(kind):
+    # HNSW graphs cannot drop nodes; removals there mean rebuilding from stored vectors.
+    return kind != "hnsw"
+
+
+def training_size(params):
+    """
+    Number of training vectors wanted for the index described by params.
+    """
+    needed = params.get("nlist", 1) * TRAIN_POINTS_PER_CENTROID
+    if "nbits" in params:
+        needed = max(needed, (1 << params["nbits"]) * TRAIN_POINTS_PER_CENTROID)
+    if params.get("storage") in _SQ_TYPES:
+        needed = max(needed, SQ_TRAIN_POINTS)
+    return min(needed, MAX_TRAIN_POINTS)
+
+
+def min_training_points(params):
+    """
+    Fewest training vectors k-means accepts for params (one per IVF list / PQ centroid).
+    """
+    needed = params.get("nlist", 1)
+    if "nbits" in params:
+        needed = max(needed, 1 << params["nbits"])
+    return needed
+
+
+def training_sample(vectors, params, seed=1234):
+    """
+    Returns a random subset of vectors large enough to train the index described by params.
+    """
+    needed = training_size(params)
+    if len(vectors) <= needed:
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+    rows = np.random.default_rng(seed).choice(len(vectors), needed, replace=False)
+    rows.sort()
+    return np.ascontiguousarray(vectors[rows], dtype=np.float32)
+
+
+def train_index(index, vectors, params):
+    if not index.is_trained:
+        index.train(training_sample(vectors, params))
+
+
+def apply_search_params(index, params):
+    """
+    Applies the query-time knobs (nprobe for IVF, efSearch for HNSW) stored in params.
+    """
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap2) else index
+    if "nprobe" in params and hasattr(inner, "nprobe"):
+        inner.nprobe = int(params["nprobe"])
+    if "ef_search" in params and isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = int(params["ef_search"])
+
+
+def search_parameters(index, selector):
+    """
+    Parameters restricting a search of index to selector. IVF and HNSW indexes need their
+    own parameter types (IVF rejects the generic one), which also carry the nprobe /
+    efSearch currently set on the index, since passed parameters override them.
+    """
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap2) else index
+    if isinstance(inner, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=inner.nprobe)
+    if isinstance(inner, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=inner.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+
+def read_index(path, mmap=False):
+    """
+    Reads an index written by faiss.write_index. With mmap, vector codes and inverted
+    lists stay in the page cache, shared by every process that maps the same file,
+    instead of being copied into each process. A mapped index is read-only: adding or
+    removing vectors aborts the process, so writers must load without mmap.
+    """
+    if mmap:
+        # IO_FLAG_MMAP_IFC (faiss >= 1.10) maps flat, SQ and PQ codes as well as IVF lists;
+        # older builds only honour IO_FLAG_MMAP, which maps IVF lists.
+        for flag_name in ("IO_FLAG_MMAP_IFC", "IO_FLAG_MMAP"):
+            flag = getattr(faiss, flag_name, None)
+            if flag is None:
+                continue
+            try:
+                return faiss.read_index(path, flag)
+            except RuntimeError:
+                continue
+    return faiss.read_index(path)
+
+
+def index_nbytes(index):
+    """
+    Serialized size of index in bytes, i.e. what it occupies on disk or when mapped.
+    """
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def build_index(vectors, ids, kind="auto", params=None):
+    """
+    Builds, trains and fills an index for vectors/ids.
+
+    :return: (index, kind, params) with the resolved kind and parameters.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    params = dict(params or {})
+    if kind == "auto":
+        kind = choose_index_kind(n)
+    params = {**default_params(kind, n, dim, params.get("storage", "float32")), **params}
+    index = create_index(kind, dim, params)
+    train_index(index, vectors, params)
+    index.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+    return index, kind, params
+
+
+def _sweep_values(kind, params):
+    if kind in ("ivf_flat", "ivf_pq"):
+        nlist = params["nlist"]
+        return "nprobe", sorted({v for v in (1, 4, 16, 64, 256) if v <= nlist} | {params["nprobe"]})
+    if kind == "hnsw":
+        return "ef_search", [16, 32, 64, 128, 256]
+    return None, [None]
+
+
+def recall_latency_report(vectors, kinds=INDEX_KINDS, k=10, n_queries=200, seed=1234, storages=("float32",)):
+    """
+    Measures recall@k, per-query latency and bytes per chunk of each index kind and vector
+    storage against exact flat search. Queries are sampled from the corpus vectors. IVF and
+    HNSW are swept over nprobe / efSearch so a setting can be picked for the corpus size.
+    recall_delta compares each storage with float32 storage of the same kind and setting.
+
+    :return: List of dicts, one per (kind, storage, setting).
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    ids = np.arange(n, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.choice(n, min(n_queries, n), replace=False)]
+    k = min(k, n)
+
+    exact = faiss.IndexFlatL2(dim)
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    report = []
+    baseline = {}
+    storages = sorted(set(storages) | {"float32"}, key=STORAGE_KINDS.index)
+    for kind in kinds:
+        for storage in storages:
+            if kind == "ivf_pq" and storage != "float32":
+                continue  # Always PQ-coded; the float32 row already covers it.
+            start = time.perf_counter()
+            index, kind, params = build_index(vectors, ids, kind, {"storage": storage})
+            build_s = time.perf_counter() - start
+            bytes_per_chunk = index_nbytes(index) / float(n)
+            knob, values = _sweep_values(kind, params)
+            for value in values:
+                setting = dict(params)
+                if knob:
+                    setting[knob] = value
+                apply_search_params(index, setting)
+                start = time.perf_counter()
+                _, found = index.search(queries, k)
+                elapsed = time.perf_counter() - start
+                hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+                label = f"{knob}={value}" if knob else ""
+                recall = hits / float(truth.size)
+                baseline.setdefault((kind, label), recall)
+                report.append({
+                    "kind": kind,
+                    "storage": "pq" if kind == "ivf_pq" else storage,
+                    "setting": label,
+                    "recall": recall,
+                    "recall_delta": recall - baseline[(kind, label)],
+                    "ms_per_query": 1000.0 * elapsed / len(queries),
+                    "bytes_per_chunk": bytes_per_chunk,
+                    "build_s": build_s,
+                })
+            apply_search_params(index, params)
+    return report
+
+
+def format_report(report):
+    lines = [
+        f"{'kind':<10} {'storage':<8} {'setting':<14} {'recall':>8} {'delta':>7} "
+        f"{'ms/query':>10} {'B/chunk':>9} {'build s':>9}"
+    ]
+    for row in report:
+        lines.append(
+            f"{row['kind']:<10} {row['storage']:<8} {row['setting']:<14} {row['recall']:>8.3f} "
+            f"{row['recall_delta']:>+7.3f} {row['ms_per_query']:>10.3f} {row['bytes_per_chunk']:>9.1f} "
+            f"{row['build_s']:>9.2f}"
+        )
+    return "\n".join(lines)
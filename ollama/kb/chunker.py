@@ -0,0 +1,197 @@
+# ollama/kb/chunker.py
+import os
+import re
+import mmap
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Chunkers work on the raw UTF-8 bytes of a source (usually a read-only mmap) and yield
+# (byte_start, byte_end) spans; text is only materialised when a span is sliced.
+
+WORD_RE = re.compile(rb"\S+")
+SENTENCE_RE = re.compile(rb"\S.*?(?:[.!?][\"')\]]*(?=\s)|(?=\n[ \t\r]*\n)|\Z)", re.DOTALL)
+PARAGRAPH_RE = re.compile(rb"\S.*?(?=\n[ \t\r]*\n|\Z)", re.DOTALL)
+TOKENIZE_BLOCK_SIZE = 1 << 20  # Bytes of text handed to the tokenizer at a time
+
+STRATEGIES = {}
+
+
+def register(name):
+    """
+    Decorator adding a chunking strategy. A strategy is called as
+    fn(buffer, chunk_size, overlap, **options) and yields (byte_start, byte_end) spans.
+    """
+    def decorator(fn):
+        STRATEGIES[name] = fn
+        return fn
+    return decorator
+
+
+def iter_spans(buffer, strategy="words", chunk_size=100, overlap=20, **options):
+    """
+    Yields (byte_start, byte_end) chunk spans over buffer (bytes or mmap) using strategy.
+    """
+    try:
+        fn = STRATEGIES[strategy]
+    except KeyError:
+        raise ValueError(f"Unknown chunking strategy: {strategy}") from None
+    if overlap >= chunk_size:
+        raise ValueError("overlap must be smaller than chunk_size")
+    return fn(buffer, chunk_size, overlap, **options)
+
+
+@contextmanager
+def open_source(path):
+    """
+    Maps a source file read-only; yields b"" for empty files, which cannot be mapped.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield buffer
+        finally:
+            buffer.close()
+
+
+def slice_text(buffer, start, end):
+    return bytes(buffer[start:end]).decode("utf-8")
+
+
+def _windows(units, size, overlap):
+    """
+    Slides a window of size units (each a (start, end) span) with overlap units shared
+    between neighbours, yielding the byte span each window covers.
+    """
+    step = size - overlap
+    window = deque()
+    for unit in units:
+        window.append(unit)
+        if len(window) == size:
+            yield window[0][0], window[-1][1]
+            for _ in range(step):
+                window.popleft()
+    # Shorter tail chunks while the window still starts inside the text.
+    while window:
+        yield window[0][0], window[min(size, len(window)) - 1][1]
+        for _ in range(min(step, len(window))):
+            window.popleft()
+
+
+def _match_spans(pattern, buffer, start=0, end=None):
+    end = len(buffer) if end is None else end
+    for match in pattern.finditer(buffer, start, end):
+        yield match.span()
+
+
+def _pack(buffer, units, chunk_size, overlap):
+    """
+    Packs whole units (sentences, paragraphs) into chunks of at most chunk_size words,
+    repeating trailing units of up to overlap words at the start of the next chunk.
+    Units longer than chunk_size are split into word windows.
+    """
+    chunk = []  # (start, end, words)
+    words = 0
+    for start, end in units:
+        count = sum(1 for _ in WORD_RE.finditer(buffer, start, end))
+        if count > chunk_size:
+            if chunk:
+                yield chunk[0][0], chunk[-1][1]
+                chunk, words = [], 0
+            yield from _windows(_match_spans(WORD_RE, buffer, start, end), chunk_size, overlap)
+            continue
+        if chunk and words + count > chunk_size:
+            yield chunk[0][0], chunk[-1][1]
+            carried = []
+            carried_words = 0
+            for unit in reversed(chunk[1:]):
+                if carried_words + unit[2] > overlap or carried_words + unit[2] + count > chunk_size:
+                    break
+                carried.insert(0, unit)
+                carried_words += unit[2]
+            chunk, words = carried, carried_words
+        chunk.append((start, end, count))
+        words += count
+    if chunk:
+        yield chunk[0][0], chunk[-1][1]
+
+
+@register("words")
+def word_spans(buffer, chunk_size=100, overlap=20):
+    """
+    chunk_size-word windows overlapping by overlap words, keeping the original whitespace
+    between words.
+    """
+    return _windows(_match_spans(WORD_RE, buffer), chunk_size, overlap)
+
+
+@register("sentence")
+def sentence_spans(buffer, chunk_size=100, overlap=20):
+    """
+    Whole sentences packed up to chunk_size words; a sentence also ends at a blank line.
+    """
+    return _pack(buffer, _match_spans(SENTENCE_RE, buffer), chunk_size, overlap)
+
+
+@register("paragraph")
+def paragraph_spans(buffer, chunk_size=100, overlap=20):
+    """
+    Whole paragraphs (separated by blank lines) packed up to chunk_size words.
+    """
+    return _pack(buffer, _match_spans(PARAGRAPH_RE, buffer), chunk_size, overlap)
+
+
+@register("tokens")
+def token_spans(buffer, chunk_size=100, overlap=20, tokenizer=None, model_name=None):
+    """
+    chunk_size-token windows of the embedding model's own tokenizer, overlapping by
+    overlap tokens, so chunks never exceed what the model actually reads.
+
+    :param tokenizer: A Hugging Face fast tokenizer; defaults to the shared embedder's.
+    :param model_name: Embedder whose tokenizer to use when tokenizer is not given.
+    """
+    if tokenizer is None:
+        from ollama.kb.embedder import DEFAULT_MODEL, get_embedder
+        tokenizer = get_embedder(model_name or DEFAULT_MODEL).tokenizer
+    return _windows(_token_units(buffer, tokenizer), chunk_size, overlap)
+
+
+def _token_units(buffer, tokenizer, block_size=TOKENIZE_BLOCK_SIZE):
+    for block_start, block_end in _text_blocks(buffer, block_size):
+        text = bytes(buffer[block_start:block_end]).decode("utf-8")
+        encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+        byte_offsets = _char_to_byte_offsets(text)
+        for char_start, char_end in encoding["offset_mapping"]:
+            if char_end > char_start:
+                yield block_start + int(byte_offsets[char_start]), block_start + int(byte_offsets[char_end])
+
+
+def _text_blocks(buffer, block_size):
+    # Cuts at the last newline in each block so no token (or UTF-8 sequence) straddles two blocks.
+    start, size = 0, len(buffer)
+    while start < size:
+        end = min(start + block_size, size)
+        if end < size:
+            cut = buffer.rfind(b"\n", start, end)
+            if cut > start:
+                end = cut + 1
+            else:
+                while end > start and buffer[end] & 0xC0 == 0x80:
+                    end -= 1
+        yield start, end
+        start = end
+
+
+def _char_to_byte_offsets(text):
+    """
+    Array mapping each character offset in text (and len(text)) to its UTF-8 byte offset.
+    """
+    codepoints = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    widths = 1 + (codepoints >= 0x80) + (codepoints >= 0x800) + (codepoints >= 0x10000)
+    offsets = np.zeros(len(codepoints) + 1, dtype=np.int64)
+    np.cumsum(widths, out=offsets[1:])
+    return offsets
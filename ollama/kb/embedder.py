@@ -0,0 +1,100 @@
+# ollama/kb/embedder.py
+import threading
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+# Process-wide registry of loaded SentenceTransformer models, keyed by (model_name, device).
+_models = {}
+_registry_lock = threading.Lock()
+_load_locks = {}
+
+
+def _key(model_name, device):
+    return (model_name or DEFAULT_MODEL, device)
+
+
+def get_embedder(model_name=DEFAULT_MODEL, device=None):
+    """
+    Returns the shared SentenceTransformer for (model_name, device), loading it on first use.
+    Concurrent callers asking for the same model wait for a single load.
+
+    :param model_name: Name of the SentenceTransformer model.
+    :param device: Torch device string (e.g. "cpu", "cuda"), or None for the library default.
+    :return: SentenceTransformer instance.
+    """
+    key = _key(model_name, device)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _registry_lock:
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+
+    with load_lock:
+        model = _models.get(key)
+        if model is None:
+            # Imported here: pulling in torch/transformers costs seconds and most importers never encode.
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(key[0], device=device)
+            _models[key] = model
+    return model
+
+
+def warm_up(model_name=DEFAULT_MODEL, device=None):
+    """
+    Loads the model (if needed) and runs one tiny encode so the first real query
+    does not pay for lazy weight/kernel initialisation.
+    """
+    model = get_embedder(model_name, device)
+    model.encode(["warm up"], convert_to_numpy=True)
+    return model
+
+
+def warm_up_async(model_name=DEFAULT_MODEL, device=None):
+    """
+    Starts warm_up() on a daemon thread and returns the thread.
+    """
+    thread = threading.Thread(target=warm_up, args=(model_name, device), daemon=True)
+    thread.start()
+    return thread
+
+
+def is_loaded(model_name=DEFAULT_MODEL, device=None):
+    return _key(model_name, device) in _models
+
+
+def loaded_models():
+    """
+    Returns a list of (model_name, device) keys currently held in the registry.
+    """
+    return list(_models.keys())
+
+
+def unload(model_name=None, device=None):
+    """
+    Drops models from the registry so their memory can be reclaimed.
+    With no model_name every model is unloaded; otherwise only the matching key.
+
+    :return: Number of models removed.
+    """
+    with _registry_lock:
+        if model_name is None:
+            keys = list(_models.keys())
+        else:
+            keys = [_key(model_name, device)]
+        removed = 0
+        for key in keys:
+            if _models.pop(key, None) is not None:
+                removed += 1
+            _load_locks.pop(key, None)
+
+    if removed:
+        try:
+            import gc
+            import torch
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except Exception:
+            pass
+    return removed
@@ -0,0 +1,258 @@
+# ollama/kb/embedding_cache.py
+import os
+import re
+import json
+import hashlib
+import threading
+import contextlib
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from ollama.kb.embedder import DEFAULT_MODEL, get_embedder
+
+DIGEST_SIZE = 16
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def text_digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=DIGEST_SIZE).digest()
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """
+    Holds an exclusive lock on path (created if missing) across processes for the with block.
+    """
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after ~10s; keep waiting like flock does.
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class EmbeddingCache:
+    """
+    Append-only on-disk cache of chunk vectors for one model, keyed by a hash of the chunk text.
+    Vectors live in a raw float32 matrix read through np.memmap; a parallel file holds one
+    digest per row. Rows are only counted once both files contain them, so a crash
+    mid-append loses at most the rows being written.
+
+    Several processes may share a cache directory: appends (and torn-tail repair) hold an
+    exclusive lock file, first picking up rows other processes appended, and row numbers
+    come from the files' sizes rather than from this instance's view of them.
+    """
+
+    def __init__(self, cache_dir, model_name=DEFAULT_MODEL):
+        os.makedirs(cache_dir, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.model_name = model_name
+        self.vectors_path = os.path.join(cache_dir, f"{slug}.f32")
+        self.keys_path = os.path.join(cache_dir, f"{slug}.keys")
+        self.info_path = os.path.join(cache_dir, f"{slug}.json")
+        self.lock_path = os.path.join(cache_dir, f"{slug}.lock")
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._rows = {}
+        self._count = 0  # Rows of the files read so far
+        self.dim = None
+        with file_lock(self.lock_path):
+            self._load()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _read_info(self):
+        """
+        Sets self.dim from the info file. Returns False if the cache belongs to another model or is unreadable.
+        """
+        try:
+            with open(self.info_path, "r", encoding="utf-8") as f:
+                info = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return False
+        self.dim = info.get("dim")
+        return bool(self.dim) and info.get("model_name") == self.model_name
+
+    def _load(self):
+        # Called with the file lock held.
+        if not os.path.exists(self.info_path):
+            return
+        if not self._read_info():
+            self._clear_files()
+            return
+        self._sync_rows(repair=True)
+
+    def _sync_rows(self, repair=False):
+        """
+        Picks up rows appended since the last call, by this or another process. Writers append
+        a row's vector before its key, so every complete key has its vector on disk. With repair
+        (only under the file lock, when no append can be in progress) a torn tail left by an
+        interrupted append is truncated away.
+        """
+        if self.dim is None and not (os.path.exists(self.info_path) and self._read_info()):
+            return
+        key_bytes = os.path.getsize(self.keys_path) if os.path.exists(self.keys_path) else 0
+        vec_bytes = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        count = min(key_bytes // DIGEST_SIZE, vec_bytes // (4 * self.dim))
+        if repair:
+            if key_bytes != count * DIGEST_SIZE:
+                with open(self.keys_path, "r+b") as f:
+                    f.truncate(count * DIGEST_SIZE)
+            if vec_bytes != count * 4 * self.dim:
+                with open(self.vectors_path, "r+b") as f:
+                    f.truncate(count * 4 * self.dim)
+        if count <= self._count:
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(self._count * DIGEST_SIZE)
+            keys = f.read((count - self._count) * DIGEST_SIZE)
+        for row, i in enumerate(range(0, len(keys), DIGEST_SIZE), start=self._count):
+            self._rows.setdefault(keys[i:i + DIGEST_SIZE], row)
+        self._count = count
+        self._matrix = None
+
+    def _matrix_view(self):
+        if self._matrix is None and self._count:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self._count, self.dim))
+        return self._matrix
+
+    def lookup(self, digests):
+        """
+        :return: (rows, missing) where rows maps position -> cached vector for the hits
+                 and missing lists the positions that still need encoding.
+        """
+        hit_pos, hit_rows, missing = [], [], []
+        with self._lock:
+            if any(d not in self._rows for d in digests):
+                self._sync_rows()  # Another process may have encoded them already.
+            for pos, digest in enumerate(digests):
+                row = self._rows.get(digest)
+                if row is None:
+                    missing.append(pos)
+                else:
+                    hit_pos.append(pos)
+                    hit_rows.append(row)
+            # One fancy-indexed read copies every hit out of the mapping.
+            vectors = self._matrix_view()[np.asarray(hit_rows)] if hit_rows else ()
+            self.hits += len(hit_pos)
+            self.misses += len(missing)
+        return dict(zip(hit_pos, vectors)), missing
+
+    def add(self, digests, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock, file_lock(self.lock_path):
+            self._sync_rows(repair=True)
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                with open(self.info_path, "w", encoding="utf-8") as f:
+                    json.dump({"model_name": self.model_name, "dim": self.dim}, f)
+            fresh = []
+            seen = set()
+            for digest, vector in zip(digests, vectors):
+                if digest not in self._rows and digest not in seen:
+                    seen.add(digest)
+                    fresh.append((digest, vector))
+            if not fresh:
+                return
+            # Release the read mapping before growing the file underneath it.
+            self._matrix = None
+            # Rows are numbered by the vector file's size: earlier rows may come from other processes.
+            with open(self.vectors_path, "ab") as f:
+                f.seek(0, os.SEEK_END)
+                start = f.tell() // (4 * self.dim)
+                f.write(np.stack([v for _, v in fresh]).tobytes())
+            with open(self.keys_path, "ab") as f:
+                f.write(b"".join(d for d, _ in fresh))
+            for row, (digest, _) in enumerate(fresh, start=start):
+                self._rows[digest] = row
+            self._count = start + len(fresh)
+
+    def encode(self, texts, encode_fn):
+        """
+        Returns float32 vectors for texts, calling encode_fn(list_of_texts) only for cache misses.
+        """
+        if not texts:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        digests = [text_digest(t) for t in texts]
+        found, missing = self.lookup(digests)
+        if missing:
+            fresh = np.asarray(encode_fn([texts[i] for i in missing]), dtype=np.float32)
+            self.add([digests[i] for i in missing], fresh)
+            for pos, vector in zip(missing, fresh):
+                found[pos] = vector
+        return np.stack([found[i] for i in range(len(texts))])
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._rows),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def clear(self):
+        with self._lock, file_lock(self.lock_path):
+            self._clear_files()
+
+    def _clear_files(self):
+        self._matrix = None
+        self._rows = {}
+        self._count = 0
+        self.dim = None
+        for path in (self.vectors_path, self.keys_path, self.info_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def get_cache(cache_dir, model_name=DEFAULT_MODEL):
+    """
+    Returns the process-wide EmbeddingCache for (cache_dir, model_name).
+    """
+    key = (os.path.abspath(cache_dir), model_name)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = EmbeddingCache(cache_dir, model_name)
+            _caches[key] = cache
+    return cache
+
+
+def encode_texts(texts, model_name=DEFAULT_MODEL, device=None, cache_dir=None, batch_size=32):
+    """
+    Encodes texts with the shared embedder, consulting the on-disk cache first when
+    cache_dir is given. The model is not even loaded if every text is cached.
+
+    :return: float32 array of shape (len(texts), dim).
+    """
+    def encode_fn(batch):
+        model = get_embedder(model_name, device)
+        return model.encode(batch, convert_to_numpy=True, batch_size=batch_size)
+
+    if cache_dir is None:
+        return np.asarray(encode_fn(list(texts)), dtype=np.float32)
+    return get_cache(cache_dir, model_name).encode(list(texts), encode_fn)
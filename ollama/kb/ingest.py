@@ -0,0 +1,182 @@
+# ollama/kb/ingest.py
+import os
+import tempfile
+from itertools import islice
+
+import numpy as np
+
+from ollama.kb import ann
+from ollama.kb.chunker import iter_spans, open_source, slice_text
+from ollama.kb.embedder import DEFAULT_MODEL
+from ollama.kb.embedding_cache import encode_texts
+
+INGEST_BATCH_SIZE = 256  # Chunks per encode + index.add round
+ENCODE_BATCH_SIZE = 32  # Forward-pass batch size inside the embedder
+AVG_BYTES_PER_WORD = 6  # Used to estimate chunk counts before ingesting
+
+
+def iter_file_chunks(path, chunk_size=100, overlap=20, strategy="words", **options):
+    """
+    Yields (text, (byte_start, byte_end)) for each chunk of the file at path, slicing
+    the text from a memory map of the file as each span is produced.
+    """
+    with open_source(path) as buffer:
+        for start, end in iter_spans(buffer, strategy, chunk_size, overlap, **options):
+            yield slice_text(buffer, start, end), (start, end)
+
+
+def estimate_chunk_count(total_bytes, chunk_size=100, overlap=20):
+    words = total_bytes / AVG_BYTES_PER_WORD
+    return max(1, int(words / max(1, chunk_size - overlap)))
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class IndexWriter:
+    """
+    Adds vectors to an index as batches arrive. Flat and HNSW indexes, and indexes that
+    are already trained, are filled immediately. A new IVF index is trained on a sample
+    drawn uniformly from the whole stream (reservoir sampling), so its centroids reflect
+    the corpus rather than its first files; meanwhile the vectors wait in a temporary
+    file and are added in a second pass once the stream ends.
+    """
+
+    def __init__(self, index=None, kind="auto", params=None, expected_count=0, seed=1234):
+        self.index = index
+        self.kind = kind
+        self.params = dict(params or {})
+        self.expected_count = expected_count
+        self._rng = np.random.default_rng(seed)
+        self._sample = None  # Reservoir of training vectors
+        self._seen = 0
+        self._spool = None  # (vectors file, ids file) of everything added before training
+
+    def add(self, vectors, ids):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return
+        if self.index is None:
+            self._create(vectors.shape[1])
+        if self.index.is_trained:
+            self.index.add_with_ids(vectors, ids)
+            return
+        if self._spool is None:
+            self._sample = np.empty((ann.training_size(self.params), vectors.shape[1]), dtype=np.float32)
+            self._spool = (tempfile.TemporaryFile(), tempfile.TemporaryFile())
+        self._sample_vectors(vectors)
+        self._spool[0].write(vectors.tobytes())
+        self._spool[1].write(ids.tobytes())
+
+    def finish(self):
+        """
+        Trains a new IVF index on the sample, then adds the spooled vectors.
+
+        :return: (index, kind, params); index is None if nothing was added.
+        """
+        if self.index is not None and not self.index.is_trained:
+            self._train_and_flush()
+        return self.index, self.kind, self.params
+
+    def _create(self, dim):
+        expected = max(self.expected_count, 1)
+        if self.kind == "auto":
+            self.kind = ann.choose_index_kind(expected)
+        storage = self.params.get("storage", "float32")
+        self.params = {**ann.default_params(self.kind, expected, dim, storage), **self.params}
+        self.index = ann.create_index(self.kind, dim, self.params)
+
+    def _sample_vectors(self, vectors):
+        # Algorithm R, a batch at a time: after n vectors, each is in the sample with equal odds.
+        size = len(self._sample)
+        fill = min(max(size - self._seen, 0), len(vectors))
+        self._sample[self._seen:self._seen + fill] = vectors[:fill]
+        if fill < len(vectors):
+            positions = np.arange(self._seen + fill, self._seen + len(vectors)) + 1
+            slots = self._rng.integers(0, positions)
+            keep = slots < size
+            self._sample[slots[keep]] = vectors[fill:][keep]
+        self._seen += len(vectors)
+
+    def _train_and_flush(self):
+        dim = self._sample.shape[1]
+        sample = self._sample[:min(self._seen, len(self._sample))]
+        if self._seen < ann.min_training_points(self.params):
+            # Far fewer chunks than estimated: shrink the coarse quantizer / PQ codebooks to fit.
+            storage = self.params.get("storage", "float32")
+            self.params = {**self.params, **ann.default_params(self.kind, self._seen, dim, storage)}
+            self.index = ann.create_index(self.kind, dim, self.params)
+        ann.train_index(self.index, sample, self.params)
+        vectors_file, ids_file = self._spool
+        self._sample, self._spool = None, None
+        vectors_file.seek(0)
+        ids_file.seek(0)
+        with vectors_file, ids_file:
+            for _ in range(0, self._seen, INGEST_BATCH_SIZE):
+                ids = np.frombuffer(ids_file.read(8 * INGEST_BATCH_SIZE), dtype=np.int64)
+                vectors = np.frombuffer(vectors_file.read(4 * dim * len(ids)), dtype=np.float32)
+                self.index.add_with_ids(vectors.reshape(len(ids), dim), ids)
+        self._seen = 0
+
+
+def ingest_files(files, store, writer, model_name=DEFAULT_MODEL, cache_dir=None, chunk_size=100, overlap=20,
+                 batch_size=INGEST_BATCH_SIZE, encode_batch_size=ENCODE_BATCH_SIZE, device=None,
+                 strategy="words", chunker_options=None):
+    """
+    Streams files through reader -> chunker -> batched encoder -> incremental index add.
+    Peak memory is bounded by batch_size chunks (plus an IVF training sample), not by corpus size.
+
+    :param files: Iterable of (source_name, file_path).
+    :param store: ChunkStore receiving the chunk texts; ids follow store.next_id.
+    :param writer: IndexWriter receiving the vectors.
+    :param strategy: Chunking strategy name from ollama.kb.chunker.STRATEGIES.
+    :param chunker_options: Extra keyword arguments for the strategy.
+    :return: Dict source_name -> {"start_id": ..., "count": ...}.
+    """
+    records = {}
+    in_flight = [0]  # Chunks yielded by the stream but not yet added to the store.
+
+    def chunk_stream():
+        for name, path in files:
+            records[name] = {"start_id": store.next_id + in_flight[0], "count": 0}
+            for text, span in iter_file_chunks(path, chunk_size, overlap, strategy, **(chunker_options or {})):
+                records[name]["count"] += 1
+                in_flight[0] += 1
+                yield name, text, span
+
+    for batch in batched(chunk_stream(), batch_size):
+        texts = [text for _, text, _ in batch]
+        spans = [span for _, _, span in batch]
+        vectors = encode_texts(texts, model_name, device, cache_dir=cache_dir, batch_size=encode_batch_size)
+        ids = []
+        start = 0
+        for end in range(1, len(batch) + 1):
+            if end == len(batch) or batch[end][0] != batch[start][0]:
+                ids.append(store.add_chunks(batch[start][0], texts[start:end], spans[start:end]))
+                start = end
+        in_flight[0] -= len(batch)
+        writer.add(vectors, np.concatenate(ids))
+    return records
+
+
+def reindex_store(store, writer, model_name=DEFAULT_MODEL, cache_dir=None, batch_size=INGEST_BATCH_SIZE,
+                  encode_batch_size=ENCODE_BATCH_SIZE, device=None):
+    """
+    Feeds every chunk already in store to writer in batches, normally straight from the embedding cache.
+    """
+    ids = store.ids.copy()
+    for start in range(0, len(ids), batch_size):
+        batch_ids = ids[start:start + batch_size]
+        texts = [store[i] for i in batch_ids]
+        writer.add(encode_texts(texts, model_name, device, cache_dir=cache_dir, batch_size=encode_batch_size), batch_ids)
+
+
+def total_size(paths):
+    return sum(os.path.getsize(p) for p in paths)
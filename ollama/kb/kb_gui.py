@@ -1,8 +1,9 @@
 # kb_gui.py
+import multiprocessing
 import os
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from kb_manager import load_document_metadata, add_file, remove_file, rebuild_index, scan_and_update_kb
+from kb_manager import load_document_metadata, add_file, remove_file, update_index, scan_and_update_kb
 
 class KBGUI:
     def __init__(self, parent, on_index_updated_callback=None):
@@ -52,7 +53,7 @@ class KBGUI:
             return
         for file_path in file_paths:
             add_file(file_path)
-        rebuild_index()
+        update_index()
         self.refresh_list()
         messagebox.showinfo("KB Update", "Selected files have been added and indexed.")
         if self.on_index_updated_callback:
@@ -71,7 +72,7 @@ class KBGUI:
             return
 
         if remove_file(file_path):
-            rebuild_index()
+            update_index()
             self.refresh_list()
             messagebox.showinfo("KB Update", f"Removed file: {os.path.basename(file_path)}")
             if self.on_index_updated_callback:
@@ -82,7 +83,7 @@ class KBGUI:
     def scan_for_new_files(self):
         updated = scan_and_update_kb()
         if updated:
-            rebuild_index()
+            update_index()
             self.refresh_list()
             messagebox.showinfo("KB Scan", "New files found and indexed.")
             if self.on_index_updated_callback:
@@ -92,6 +93,7 @@ class KBGUI:
             messagebox.showinfo("KB Scan", "No new files found.")
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     import ttkbootstrap as tb
     root = tb.Window(themename="darkly")
     root.title("Local KB Manager")
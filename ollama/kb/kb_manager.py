@@ -3,14 +3,57 @@ import os
 import json
 import shutil
 import datetime
-from local_retriever import build_index_from_folder, save_index, load_index
+import functools
+import faiss
+from local_retriever import file_hash
+from ollama.kb import ann
+from ollama.kb.ingest import (
+    IndexWriter, ingest_files, reindex_store, estimate_chunk_count, total_size,
+    INGEST_BATCH_SIZE, ENCODE_BATCH_SIZE
+)
+from ollama.kb.parallel import ingest_files_parallel, TORCH_THREADS_PER_WORKER
+from ollama.kb.embedder import DEFAULT_MODEL
+from ollama.kb.embedding_cache import encode_texts
+from ollama.kb.kb_store import (
+    ChunkStore, ChunkMetadata, save_bundle, load_bundle, load_lexical, read_manifest, remove_bundle,
+    update_manifest
+)
+from ollama.kb.lexical import BM25Index
 
 # Define paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 KB_FOLDER = os.path.abspath(os.path.join(BASE_DIR, "../../local_kb"))
-INDEX_FILE = os.path.abspath(os.path.join(BASE_DIR, "../faiss_index.index"))
+BUNDLE_DIR = os.path.abspath(os.path.join(BASE_DIR, "../kb_bundle"))
+EMBEDDING_CACHE_DIR = os.path.abspath(os.path.join(BASE_DIR, "../kb_embeddings"))
 METADATA_FILE = os.path.abspath(os.path.join(BASE_DIR, "../kb_documents.json"))
 
+# Chunking parameters recorded in the bundle manifest; a mismatch forces a rebuild.
+CHUNK_SIZE = 100
+CHUNK_OVERLAP = 20
+# "words", "sentence", "paragraph" or "tokens" (see ollama.kb.chunker); sizes are in words, or tokens for "tokens".
+CHUNK_STRATEGY = "words"
+
+# Index backend: "auto" (by chunk count), "flat", "ivf_flat", "ivf_pq" or "hnsw". The backend and
+# storage are recorded in the bundle manifest; changing either forces a rebuild.
+INDEX_KIND = "auto"
+INDEX_PARAMS = {}  # Overrides for ann.default_params (nlist, nprobe, m, nbits, hnsw_m, ef_search, ...)
+# Vector storage inside the index: "float32", "float16", "sq8" (int8 scalar) or "pq".
+INDEX_STORAGE = "float32"
+# Readers map the saved index instead of loading it, so processes share one copy in the page cache.
+MMAP_INDEX = True
+
+# Streaming ingestion: chunks per encode/add round, and the embedder's forward-pass batch.
+INGEST_CHUNK_BATCH = INGEST_BATCH_SIZE
+ENCODE_CHUNK_BATCH = ENCODE_BATCH_SIZE
+
+# Process pool for reading, chunking and embedding. Off unless OLLAMA_KB_WORKERS sets a
+# worker count: every worker loads its own model copy. Below PARALLEL_MIN_BYTES of new text
+# the workers' start-up and model loads cost more than they save, so ingestion stays in-process.
+WORKERS_ENV = "OLLAMA_KB_WORKERS"
+INGEST_WORKERS = max(1, int(os.environ.get(WORKERS_ENV) or 1))
+TORCH_THREADS = TORCH_THREADS_PER_WORKER
+PARALLEL_MIN_BYTES = 32 << 20
+
 def ensure_kb_folder():
     if not os.path.exists(KB_FOLDER):
         os.makedirs(KB_FOLDER)
@@ -48,12 +91,173 @@ def remove_file(file_path):
         return True
     return False
 
-def rebuild_index():
+def rebuild_index(model_name=DEFAULT_MODEL, index_kind=None):
+    """
+    Re-chunks every document into a fresh bundle (FAISS and BM25). Vectors already in the embedding
+    cache are reused; the index backend is re-selected for the current corpus size.
+    """
     ensure_kb_folder()
-    index, chunks, meta = build_index_from_folder(KB_FOLDER)
-    if index is not None:
-        save_index(index, INDEX_FILE)
-    return index, chunks, meta
+    params = {**INDEX_PARAMS, "storage": INDEX_STORAGE} if INDEX_STORAGE != "float32" else dict(INDEX_PARAMS)
+    index_info = {"kind": index_kind or INDEX_KIND, "storage": INDEX_STORAGE, "params": params}
+    return _sync_index(None, ChunkStore(), BM25Index(), {}, index_info, model_name, force_save=True)
+
+def update_index(model_name=DEFAULT_MODEL, mmap=False):
+    """
+    Brings the saved bundle in line with KB_FOLDER, embedding only added or changed
+    documents and dropping the vectors of removed ones.
+    With mmap the returned index is memory-mapped (read-only); it is only loaded
+    writable when documents actually changed.
+    """
+    ensure_kb_folder()
+    if mmap:
+        return _update_mapped(model_name)
+
+    bundle = load_bundle(BUNDLE_DIR)
+    if bundle is None:
+        return rebuild_index(model_name)
+    index, store, _, manifest = bundle
+    if not _bundle_matches(manifest, model_name):
+        store.close()
+        return rebuild_index(model_name)
+    index_info = manifest.get("index_config", {"kind": "flat", "params": {}})
+    lexical = load_lexical(BUNDLE_DIR, manifest)
+    force_save = lexical is None
+    if lexical is None:
+        # Bundle saved before the BM25 index existed: build it from the stored chunks once.
+        lexical = BM25Index.from_store(store)
+    return _sync_index(index, store, lexical, manifest.get("documents", {}), index_info, model_name, force_save)
+
+def _update_mapped(model_name):
+    # A writable load is only needed when documents changed; otherwise map the saved bundle directly.
+    manifest = read_manifest(BUNDLE_DIR)
+    if not (manifest and _bundle_matches(manifest, model_name) and "lexical" in manifest.get("files", {})
+            and not _documents_changed(manifest.get("documents", {}))):
+        index, store, _ = update_index(model_name)
+        if index is None:
+            return None, [], []
+        store.close()
+    bundle = load_bundle(BUNDLE_DIR, mmap=True)
+    return bundle[:3] if bundle is not None else update_index(model_name)
+
+def load_lexical_index():
+    """
+    Returns the BM25 index saved with the current bundle, or None.
+    """
+    return load_lexical(BUNDLE_DIR)
+
+def set_index_search_params(**params):
+    """
+    Persists query-time index settings (nprobe, ef_search) in the bundle manifest.
+    Returns the updated params, or None when there is no bundle.
+    """
+    manifest = read_manifest(BUNDLE_DIR)
+    if manifest is None:
+        return None
+    index_info = manifest.get("index_config", {"kind": "flat", "params": {}})
+    index_info["params"].update(params)
+    update_manifest(BUNDLE_DIR, index_config=index_info)
+    return index_info["params"]
+
+def index_report(model_name=DEFAULT_MODEL, kinds=ann.INDEX_KINDS, k=10, n_queries=200, storages=("float32",)):
+    """
+    Recall, latency and memory-per-chunk comparison of the ANN backends and vector
+    storages on the current KB's vectors. Vectors come from the embedding cache,
+    so this normally runs without the embedder.
+    """
+    bundle = load_bundle(BUNDLE_DIR)
+    if bundle is None:
+        return []
+    _, store, _, _ = bundle
+    vectors = encode_texts(list(store), model_name, cache_dir=EMBEDDING_CACHE_DIR)
+    store.close()
+    if not len(vectors):
+        return []
+    return ann.recall_latency_report(vectors, kinds, k=k, n_queries=n_queries, storages=storages)
+
+def _scan_documents():
+    documents = {}
+    for fname in sorted(os.listdir(KB_FOLDER)):
+        fpath = os.path.join(KB_FOLDER, fname)
+        if fname.endswith(".txt") and os.path.isfile(fpath):
+            stat = os.stat(fpath)
+            documents[fname] = (fpath, stat.st_size, stat.st_mtime)
+    return documents
+
+def _sync_index(index, store, lexical, documents, index_info, model_name, force_save=False):
+    current = _scan_documents()
+    removed = [documents.pop(name) for name in list(documents) if name not in current]
+    added = []
+
+    for fname, (fpath, size, mtime) in current.items():
+        record = documents.get(fname)
+        if record and record["size"] == size and record["mtime"] == mtime:
+            continue
+        digest = file_hash(fpath)
+        if record and record["hash"] == digest:
+            # Touched but identical: refresh the stat fields only.
+            record.update(size=size, mtime=mtime)
+            force_save = True
+            continue
+        if record:
+            removed.append(documents.pop(fname))
+        added.append((fname, fpath, digest, size, mtime))
+
+    for record in removed:
+        start, end = record["start_id"], record["start_id"] + record["count"]
+        store.remove_range(start, end)
+        lexical.remove_range(start, end)
+        if index is not None and ann.supports_remove(index_info["kind"]):
+            index.remove_ids(faiss.IDSelectorRange(start, end))
+    if removed and not ann.supports_remove(index_info["kind"]):
+        index = None  # Rebuilt below from the cached vectors of the surviving chunks.
+
+    ingest_options = dict(
+        model_name=model_name, cache_dir=EMBEDDING_CACHE_DIR, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP,
+        batch_size=INGEST_CHUNK_BATCH, encode_batch_size=ENCODE_CHUNK_BATCH,
+        strategy=CHUNK_STRATEGY, chunker_options=_chunker_options(model_name),
+    )
+    added_bytes = total_size(fpath for _, fpath, _, _, _ in added)
+    ingest = ingest_files
+    if INGEST_WORKERS > 1 and added_bytes >= PARALLEL_MIN_BYTES:
+        ingest = functools.partial(ingest_files_parallel, workers=INGEST_WORKERS, torch_threads=TORCH_THREADS)
+    if index is None:
+        kind = index_info.get("requested_kind", index_info["kind"])
+        expected = len(store) + estimate_chunk_count(added_bytes, CHUNK_SIZE, CHUNK_OVERLAP)
+        writer = IndexWriter(kind=kind, params=index_info["params"], expected_count=expected)
+        reindex_store(
+            store, writer, model_name, EMBEDDING_CACHE_DIR, INGEST_CHUNK_BATCH, ENCODE_CHUNK_BATCH
+        )
+    else:
+        kind = None
+        writer = IndexWriter(index=index)
+
+    records = ingest([(fname, fpath) for fname, fpath, _, _, _ in added], store, writer, **ingest_options)
+    for fname, fpath, digest, size, mtime in added:
+        documents[fname] = {"hash": digest, "size": size, "mtime": mtime, **records[fname]}
+        start, count = records[fname]["start_id"], records[fname]["count"]
+        for batch_start in range(start, start + count, INGEST_CHUNK_BATCH):
+            batch_ids = range(batch_start, min(batch_start + INGEST_CHUNK_BATCH, start + count))
+            lexical.add(batch_ids, [store[i] for i in batch_ids])
+
+    index, resolved, params = writer.finish()
+    if index is None:
+        # Nothing left to index (kinds that cannot remove rebuild from the empty store).
+        if removed:
+            remove_bundle(BUNDLE_DIR)
+        return None, [], []
+    if kind is not None:
+        index_info = {
+            "kind": resolved, "requested_kind": kind, "storage": index_info.get("storage", "float32"),
+            "params": params,
+        }
+
+    if force_save or removed or added:
+        save_bundle(
+            BUNDLE_DIR, index, store, lexical,
+            model_name=model_name, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP, chunker=CHUNK_STRATEGY,
+            documents=documents, index_config=index_info
+        )
+    return index, store, ChunkMetadata(store)
 
 def scan_and_update_kb():
     ensure_kb_folder()
@@ -69,14 +273,36 @@ def scan_and_update_kb():
         save_document_metadata(metadata)
     return updated
 
-def load_existing_index():
+def _documents_changed(documents):
+    current = _scan_documents()
+    if set(current) != set(documents):
+        return True
+    return any(
+        documents[name].get("size") != size or documents[name].get("mtime") != mtime
+        for name, (_, size, mtime) in current.items()
+    )
+
+def _bundle_matches(manifest, model_name):
+    index_config = manifest.get("index_config", {})
+    return (
+        manifest.get("model_name") == model_name
+        and manifest.get("chunk_size") == CHUNK_SIZE
+        and manifest.get("overlap") == CHUNK_OVERLAP
+        and manifest.get("chunker") == CHUNK_STRATEGY
+        and index_config.get("requested_kind", index_config.get("kind")) == INDEX_KIND
+        and index_config.get("storage", "float32") == INDEX_STORAGE
+    )
+
+def _chunker_options(model_name):
+    # The token chunker must count with the tokenizer of the model doing the embedding.
+    return {"model_name": model_name} if CHUNK_STRATEGY == "tokens" else {}
+
+def load_existing_index(model_name=DEFAULT_MODEL, mmap=MMAP_INDEX):
+    """
+    Loads the saved bundle, first folding in any added, changed or removed documents.
+    Unchanged documents are only stat()ed, never read or re-embedded.
+    The index is memory-mapped (and read-only) when mmap is set.
+    """
     ensure_kb_folder()
-    updated = scan_and_update_kb()
-    if updated:
-        return rebuild_index()
-    if os.path.exists(INDEX_FILE):
-        index = load_index(INDEX_FILE)
-        _, chunks, meta = build_index_from_folder(KB_FOLDER)
-        return index, chunks, meta
-    else:
-        return rebuild_index()
+    scan_and_update_kb()
+    return update_index(model_name, mmap)
@@ -0,0 +1,413 @@
+# ollama/kb/kb_store.py
+import os
+import json
+import mmap
+import datetime
+import tempfile
+import threading
+
+import numpy as np
+import faiss
+
+from utils.file_utils import atomic_write
+from ollama.kb.ann import apply_search_params, read_index
+from ollama.kb.lexical import BM25Index
+
+# Bump whenever the on-disk layout changes; older bundles are rebuilt instead of loaded.
+BUNDLE_FORMAT_VERSION = 3
+MANIFEST_FILE = "manifest.json"
+TAIL_SPOOL_BYTES = 64 << 20  # Newly added chunk text kept in RAM before spilling to a temp file
+
+
+class ChunkStore:
+    """
+    Chunk texts and their source, addressed by chunk id (the id stored in the FAISS ID map).
+    Texts loaded from a bundle stay in a memory-mapped UTF-8 blob and are decoded on access;
+    texts added afterwards go to a tail that spills to a temp file past TAIL_SPOOL_BYTES,
+    so building a large KB does not hold the corpus in RAM. Iteration yields texts in id order.
+    Each chunk also records the byte span it was cut from in its source file (-1 if unknown).
+    """
+
+    def __init__(self, blob=b"", ids=(), starts=(), ends=(), source_ids=(), sources=(), next_id=0, blob_file=None,
+                 spans=None):
+        self._blob = blob
+        self._blob_file = blob_file
+        self._tail = tempfile.SpooledTemporaryFile(max_size=TAIL_SPOOL_BYTES)
+        self._tail_size = 0
+        self._tail_lock = threading.Lock()
+        self._appended = []  # Column batches from add_chunks, concatenated lazily
+        self._ids = np.asarray(ids, dtype=np.int64)
+        self._starts = np.asarray(starts, dtype=np.int64)
+        self._ends = np.asarray(ends, dtype=np.int64)
+        self._source_ids = np.asarray(source_ids, dtype=np.int32)
+        self._spans = _span_array(spans, len(self._ids))
+        self._sources = list(sources)
+        self._source_lookup = {s: i for i, s in enumerate(self._sources)}
+        last_id = int(self._ids[-1]) + 1 if len(self._ids) else 0
+        self.next_id = max(int(next_id), last_id)
+
+    @classmethod
+    def open(cls, blob_path, ids, offsets, source_ids, sources, next_id=0, spans=None):
+        blob, blob_file = _map_blob(blob_path)
+        return cls(blob, ids, offsets[:-1], offsets[1:], source_ids, sources, next_id, blob_file, spans)
+
+    def _consolidate(self):
+        if self._appended:
+            ids, starts, ends, source_ids, spans = zip(*self._appended)
+            self._appended = []
+            self._ids = np.concatenate([self._ids, *ids])
+            self._starts = np.concatenate([self._starts, *starts])
+            self._ends = np.concatenate([self._ends, *ends])
+            self._source_ids = np.concatenate([self._source_ids, *source_ids])
+            self._spans = np.concatenate([self._spans, *spans])
+
+    @property
+    def ids(self):
+        self._consolidate()
+        return self._ids
+
+    @property
+    def sources(self):
+        """Distinct source names that still have chunks, in first-seen order."""
+        self._consolidate()
+        used = np.unique(self._source_ids)
+        return [self._sources[i] for i in used]
+
+    def __len__(self):
+        self._consolidate()
+        return len(self._ids)
+
+    def __contains__(self, chunk_id):
+        return self._row(chunk_id) is not None
+
+    def __getitem__(self, chunk_id):
+        row = self._row(chunk_id)
+        if row is None:
+            raise KeyError(chunk_id)
+        return self._text(row)
+
+    def __iter__(self):
+        self._consolidate()
+        for row in range(len(self._ids)):
+            yield self._text(row)
+
+    def source_of(self, chunk_id):
+        row = self._row(chunk_id)
+        if row is None:
+            raise KeyError(chunk_id)
+        return self._sources[self._source_ids[row]]
+
+    def span_of(self, chunk_id):
+        """
+        :return: (source, byte_start, byte_end) of the chunk within its source file.
+        """
+        row = self._row(chunk_id)
+        if row is None:
+            raise KeyError(chunk_id)
+        start, end = self._spans[row]
+        return self._sources[self._source_ids[row]], int(start), int(end)
+
+    def ids_for_sources(self, names):
+        """
+        Returns the ids of chunks whose source basename is in names.
+        """
+        self._consolidate()
+        wanted = [i for i, s in enumerate(self._sources) if os.path.basename(s) in names]
+        return self._ids[np.isin(self._source_ids, wanted)]
+
+    def add_chunks(self, source, texts, spans=None):
+        """
+        Appends texts for one source under fresh, contiguous chunk ids.
+        spans optionally gives each text's (byte_start, byte_end) in the source file.
+
+        :return: np.int64 array of the assigned ids.
+        """
+        if source not in self._source_lookup:
+            self._source_lookup[source] = len(self._sources)
+            self._sources.append(source)
+        base = len(self._blob)
+        starts, ends = [], []
+        with self._tail_lock:
+            self._tail.seek(0, os.SEEK_END)
+            for text in texts:
+                data = text.encode("utf-8")
+                starts.append(base + self._tail_size)
+                self._tail.write(data)
+                self._tail_size += len(data)
+                ends.append(base + self._tail_size)
+        ids = np.arange(self.next_id, self.next_id + len(starts), dtype=np.int64)
+        self.next_id += len(starts)
+        self._appended.append((
+            ids,
+            np.asarray(starts, dtype=np.int64),
+            np.asarray(ends, dtype=np.int64),
+            np.full(len(ids), self._source_lookup[source], dtype=np.int32),
+            _span_array(spans, len(ids)),
+        ))
+        return ids
+
+    def remove_range(self, start_id, end_id):
+        """
+        Drops chunks with start_id <= id < end_id. Their bytes are reclaimed on the next save.
+        """
+        self._consolidate()
+        keep = (self._ids < start_id) | (self._ids >= end_id)
+        self._ids = self._ids[keep]
+        self._starts = self._starts[keep]
+        self._ends = self._ends[keep]
+        self._source_ids = self._source_ids[keep]
+        self._spans = self._spans[keep]
+
+    def write_blob(self, path):
+        """
+        Writes live texts back to back to path.
+
+        :return: (ids, offsets, source_ids, sources, spans) columns describing the written blob.
+        """
+        self._consolidate()
+        used, source_ids = np.unique(self._source_ids, return_inverse=True)
+        offsets = np.zeros(len(self._ids) + 1, dtype=np.int64)
+        with open(path, "wb") as f:
+            for row in range(len(self._ids)):
+                data = self._bytes(row)
+                f.write(data)
+                offsets[row + 1] = offsets[row] + len(data)
+        sources = [self._sources[i] for i in used]
+        return self._ids.copy(), offsets, source_ids.astype(np.int32), sources, self._spans.copy()
+
+    def rebase(self, blob_path, ids, offsets, source_ids, sources, spans):
+        """
+        Points the store at a freshly written blob and releases the previous one.
+        """
+        old_blob, old_file = self._blob, self._blob_file
+        self._blob, self._blob_file = _map_blob(blob_path)
+        self._tail.close()
+        self._tail = tempfile.SpooledTemporaryFile(max_size=TAIL_SPOOL_BYTES)
+        self._tail_size = 0
+        self._ids = np.asarray(ids, dtype=np.int64)
+        self._starts = np.asarray(offsets[:-1], dtype=np.int64)
+        self._ends = np.asarray(offsets[1:], dtype=np.int64)
+        self._source_ids = np.asarray(source_ids, dtype=np.int32)
+        self._spans = _span_array(spans, len(self._ids))
+        self._sources = list(sources)
+        self._source_lookup = {s: i for i, s in enumerate(self._sources)}
+        _unmap_blob(old_blob, old_file)
+
+    def close(self):
+        _unmap_blob(self._blob, self._blob_file)
+        self._blob, self._blob_file = b"", None
+        self._tail.close()
+
+    def _row(self, chunk_id):
+        self._consolidate()
+        chunk_id = int(chunk_id)
+        row = int(np.searchsorted(self._ids, chunk_id))
+        if row < len(self._ids) and self._ids[row] == chunk_id:
+            return row
+        return None
+
+    def _bytes(self, row):
+        start, end = int(self._starts[row]), int(self._ends[row])
+        base = len(self._blob)
+        if start >= base:
+            with self._tail_lock:
+                self._tail.seek(start - base)
+                return self._tail.read(end - start)
+        return bytes(self._blob[start:end])
+
+    def _text(self, row):
+        return self._bytes(row).decode("utf-8")
+
+
+class ChunkMetadata:
+    """
+    Per-chunk metadata dicts derived on access from a ChunkStore's source column.
+    Indexed by chunk id; iteration follows the store's id order.
+    """
+
+    def __init__(self, store):
+        self._store = store
+
+    @property
+    def sources(self):
+        return self._store.sources
+
+    def __len__(self):
+        return len(self._store)
+
+    def __getitem__(self, chunk_id):
+        return {"source": self._store.source_of(chunk_id)}
+
+    def __iter__(self):
+        self._store._consolidate()
+        sources = self._store._sources
+        for source_id in self._store._source_ids:
+            yield {"source": sources[source_id]}
+
+
+def read_manifest(bundle_dir):
+    path = os.path.join(bundle_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def save_bundle(bundle_dir, index, store, lexical=None, **info):
+    """
+    Writes the FAISS index and chunk store as a new bundle generation and rebases the
+    store onto the written blob. The manifest is replaced last, so a crash mid-save
+    leaves the previous bundle intact.
+
+    :param bundle_dir: Directory holding the bundle.
+    :param index: ID-mapped FAISS index whose ids match the store.
+    :param store: ChunkStore with the chunk texts and sources.
+    :param lexical: Optional BM25Index over the same chunk ids.
+    :param info: Extra manifest fields (model name, chunking parameters, documents, ...).
+    :return: The written manifest dict.
+    """
+    os.makedirs(bundle_dir, exist_ok=True)
+    previous = read_manifest(bundle_dir) or {}
+    generation = previous.get("generation", 0) + 1
+    files = {
+        "index": f"index-{generation}.faiss",
+        "chunks": f"chunks-{generation}.bin",
+        "offsets": f"offsets-{generation}.npy",
+        "ids": f"ids-{generation}.npy",
+        "source_ids": f"source_ids-{generation}.npy",
+        "spans": f"spans-{generation}.npy",
+    }
+    if lexical is not None:
+        files["lexical"] = f"lexical-{generation}.npz"
+    paths = {k: os.path.join(bundle_dir, v) for k, v in files.items()}
+
+    ids, offsets, source_ids, sources, spans = store.write_blob(paths["chunks"])
+    np.save(paths["offsets"], offsets)
+    np.save(paths["ids"], ids)
+    np.save(paths["source_ids"], source_ids)
+    np.save(paths["spans"], spans)
+    faiss.write_index(index, paths["index"])
+    if lexical is not None:
+        lexical.save(paths["lexical"])
+
+    manifest = {
+        **info,
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "generation": generation,
+        "created_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "chunk_count": len(ids),
+        "next_id": store.next_id,
+        "dim": index.d,
+        "sources": sources,
+        "files": files,
+    }
+    atomic_write(os.path.join(bundle_dir, MANIFEST_FILE), json.dumps(manifest, indent=2))
+    store.rebase(paths["chunks"], ids, offsets, source_ids, sources, spans)
+    _remove_stale_files(bundle_dir, files)
+    return manifest
+
+
+def update_manifest(bundle_dir, **fields):
+    """
+    Rewrites manifest fields in place (e.g. search parameters) without touching the data files.
+    """
+    manifest = read_manifest(bundle_dir)
+    if manifest is None:
+        return None
+    manifest.update(fields)
+    atomic_write(os.path.join(bundle_dir, MANIFEST_FILE), json.dumps(manifest, indent=2))
+    return manifest
+
+
+def remove_bundle(bundle_dir):
+    """
+    Deletes a bundle, e.g. once its last document is gone. The manifest goes first, so a
+    crash midway leaves no bundle rather than a broken one.
+    """
+    path = os.path.join(bundle_dir, MANIFEST_FILE)
+    if os.path.exists(path):
+        os.remove(path)
+    if os.path.isdir(bundle_dir):
+        _remove_stale_files(bundle_dir, {})
+
+
+def load_bundle(bundle_dir, mmap=False):
+    """
+    Loads a bundle written by save_bundle without touching the source documents.
+    With mmap the index is memory-mapped and shared between processes, but read-only.
+
+    :return: (index, chunks, metadata, manifest), or None if the bundle is missing,
+             incomplete or from another format version.
+    """
+    manifest = read_manifest(bundle_dir)
+    if not manifest or manifest.get("format_version") != BUNDLE_FORMAT_VERSION:
+        return None
+    files = {k: os.path.join(bundle_dir, v) for k, v in manifest.get("files", {}).items()}
+    required = ("index", "chunks", "offsets", "ids", "source_ids", "spans")
+    if not all(k in files and os.path.exists(files[k]) for k in required):
+        return None
+
+    index = read_index(files["index"], mmap)
+    apply_search_params(index, manifest.get("index_config", {}).get("params", {}))
+    offsets = np.load(files["offsets"])
+    ids = np.load(files["ids"])
+    source_ids = np.load(files["source_ids"])
+    spans = np.load(files["spans"])
+    if (index.ntotal != len(ids) or len(offsets) != len(ids) + 1 or len(source_ids) != len(ids)
+            or len(spans) != len(ids)):
+        return None
+    store = ChunkStore.open(
+        files["chunks"], ids, offsets, source_ids, manifest.get("sources", []), manifest.get("next_id", 0), spans
+    )
+    return index, store, ChunkMetadata(store), manifest
+
+
+def load_lexical(bundle_dir, manifest=None):
+    """
+    Loads the bundle's BM25 index, or returns None if the bundle has none.
+    """
+    manifest = manifest or read_manifest(bundle_dir)
+    name = (manifest or {}).get("files", {}).get("lexical")
+    path = os.path.join(bundle_dir, name) if name else None
+    if path is None or not os.path.exists(path):
+        return None
+    try:
+        return BM25Index.load(path)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _span_array(spans, count):
+    if spans is None:
+        return np.full((count, 2), -1, dtype=np.int64)
+    return np.asarray(spans, dtype=np.int64).reshape(count, 2)
+
+
+def _map_blob(path):
+    f = open(path, "rb")
+    if os.fstat(f.fileno()).st_size == 0:
+        f.close()
+        return b"", None
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), f
+
+
+def _unmap_blob(blob, blob_file):
+    if isinstance(blob, mmap.mmap):
+        blob.close()
+    if blob_file is not None:
+        blob_file.close()
+
+
+def _remove_stale_files(bundle_dir, current_files):
+    keep = set(current_files.values()) | {MANIFEST_FILE}
+    for name in os.listdir(bundle_dir):
+        if name in keep:
+            continue
+        try:
+            os.remove(os.path.join(bundle_dir, name))
+        except OSError:
+            # Still memory-mapped by another process (Windows); cleaned up on the next save.
+            pass
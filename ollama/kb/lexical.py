@@ -0,0 +1,192 @@
+# ollama/kb/lexical.py
+import re
+import math
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"\w+(?:[+'.-]\w+)*")  # Keeps codes like "1d100", "str+2" or "x.y" together
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60  # Reciprocal-rank fusion damping constant
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 over chunk texts, keyed by the same chunk ids as the FAISS index.
+    Postings are kept compact in numpy columns sorted by term (CSR layout: term -> slice
+    of chunk ids and term frequencies), so a query touches only its own terms' postings.
+    """
+
+    def __init__(self, vocab=(), offsets=None, postings=None, tfs=None, doc_ids=None, doc_lens=None):
+        self._vocab = list(vocab)
+        self._terms = {t: i for i, t in enumerate(self._vocab)}
+        self._offsets = np.zeros(1, dtype=np.int64) if offsets is None else np.asarray(offsets, dtype=np.int64)
+        self._postings = np.zeros(0, dtype=np.int64) if postings is None else np.asarray(postings, dtype=np.int64)
+        self._tfs = np.zeros(0, dtype=np.int32) if tfs is None else np.asarray(tfs, dtype=np.int32)
+        self._doc_ids = np.zeros(0, dtype=np.int64) if doc_ids is None else np.asarray(doc_ids, dtype=np.int64)
+        self._doc_lens = np.zeros(0, dtype=np.int32) if doc_lens is None else np.asarray(doc_lens, dtype=np.int32)
+        self._pending = []  # (terms, postings, tfs, doc_ids, doc_lens) batches merged on next read
+
+    def __len__(self):
+        self._merge_pending()
+        return len(self._doc_ids)
+
+    @property
+    def vocab_size(self):
+        self._merge_pending()
+        return len(self._vocab)
+
+    def add(self, ids, texts):
+        """
+        Indexes texts under ids; ids must be larger than every id already indexed.
+        """
+        term_ids, doc_ids, tfs, lens = [], [], [], []
+        for chunk_id, text in zip(ids, texts):
+            counts = {}
+            tokens = tokenize(text)
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                term = self._terms.get(token)
+                if term is None:
+                    term = self._terms[token] = len(self._vocab)
+                    self._vocab.append(token)
+                term_ids.append(term)
+                doc_ids.append(chunk_id)
+                tfs.append(tf)
+            lens.append(len(tokens))
+        if not lens:
+            return
+        self._pending.append((
+            np.asarray(term_ids, dtype=np.int64), np.asarray(doc_ids, dtype=np.int64),
+            np.asarray(tfs, dtype=np.int32), np.asarray(list(ids), dtype=np.int64),
+            np.asarray(lens, dtype=np.int32),
+        ))
+
+    def _merge_pending(self):
+        if not self._pending:
+            return
+        terms, postings, tfs, doc_ids, doc_lens = zip(*self._pending)
+        self._pending = []
+        self._doc_ids = np.concatenate([self._doc_ids, *doc_ids])
+        self._doc_lens = np.concatenate([self._doc_lens, *doc_lens])
+        self._rebuild_postings(
+            np.concatenate([self._term_column(), *terms]),
+            np.concatenate([self._postings, *postings]),
+            np.concatenate([self._tfs, *tfs]),
+        )
+
+    def _term_column(self):
+        return np.repeat(np.arange(len(self._offsets) - 1, dtype=np.int64), np.diff(self._offsets))
+
+    def remove_range(self, start_id, end_id):
+        """
+        Drops chunks with start_id <= id < end_id, and any terms left without postings.
+        """
+        self._merge_pending()
+        keep_docs = (self._doc_ids < start_id) | (self._doc_ids >= end_id)
+        if keep_docs.all():
+            return
+        self._doc_ids = self._doc_ids[keep_docs]
+        self._doc_lens = self._doc_lens[keep_docs]
+        terms = self._term_column()
+        keep = (self._postings < start_id) | (self._postings >= end_id)
+        self._rebuild_postings(terms[keep], self._postings[keep], self._tfs[keep])
+
+    def _rebuild_postings(self, terms, postings, tfs):
+        order = np.lexsort((postings, terms))
+        terms, self._postings, self._tfs = terms[order], postings[order], tfs[order]
+        counts = np.bincount(terms, minlength=len(self._vocab))
+        used = counts > 0
+        if not used.all():
+            remap = np.cumsum(used) - 1
+            terms = remap[terms]
+            self._vocab = [t for t, u in zip(self._vocab, used) if u]
+            self._terms = {t: i for i, t in enumerate(self._vocab)}
+            counts = counts[used]
+        self._offsets = np.zeros(len(self._vocab) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self._offsets[1:])
+
+    def search(self, query, top_k=10, allowed_ids=None):
+        """
+        Scores chunks containing any query term.
+
+        :param allowed_ids: Optional sorted int64 array restricting the result to those ids.
+        :return: (ids, scores) arrays, best first, at most top_k long.
+        """
+        self._merge_pending()
+        n_docs = len(self._doc_ids)
+        if not n_docs:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        avg_len = float(self._doc_lens.mean()) or 1.0
+        cand_ids, cand_scores = [], []
+        for token in set(tokenize(query)):
+            term = self._terms.get(token)
+            if term is None:
+                continue
+            lo, hi = self._offsets[term], self._offsets[term + 1]
+            ids, tfs = self._postings[lo:hi], self._tfs[lo:hi]
+            if allowed_ids is not None:
+                mask = np.isin(ids, allowed_ids, assume_unique=True)
+                ids, tfs = ids[mask], tfs[mask]
+                if not len(ids):
+                    continue
+            df = hi - lo
+            idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            lens = self._doc_lens[np.searchsorted(self._doc_ids, ids)]
+            norm = BM25_K1 * (1.0 - BM25_B + BM25_B * lens / avg_len)
+            cand_ids.append(ids)
+            cand_scores.append(idf * tfs * (BM25_K1 + 1.0) / (tfs + norm))
+        if not cand_ids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        ids, inverse = np.unique(np.concatenate(cand_ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(cand_scores))
+        if len(ids) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+            ids, scores = ids[best], scores[best]
+        order = np.lexsort((ids, -scores))
+        return ids[order], scores[order].astype(np.float32)
+
+    def save(self, path):
+        self._merge_pending()
+        np.savez(
+            path, vocab=np.array(self._vocab, dtype=str), offsets=self._offsets, postings=self._postings,
+            tfs=self._tfs, doc_ids=self._doc_ids, doc_lens=self._doc_lens,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["vocab"].tolist(), data["offsets"], data["postings"], data["tfs"], data["doc_ids"],
+                data["doc_lens"],
+            )
+
+    @classmethod
+    def from_store(cls, store, batch_size=1024):
+        """
+        Builds the index from every chunk in a ChunkStore.
+        """
+        index = cls()
+        ids = store.ids.copy()
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            index.add(batch, [store[i] for i in batch])
+        return index
+
+
+def reciprocal_rank_fusion(rankings, top_k, k=RRF_K):
+    """
+    Fuses ranked id lists: each id scores sum(1 / (k + rank)) over the lists it appears in.
+
+    :return: Fused ids, best first, at most top_k long.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda i: (-scores[i], i))[:top_k]
@@ -0,0 +1,122 @@
+# ollama/kb/parallel.py
+import os
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ollama.kb.embedder import DEFAULT_MODEL, get_embedder
+from ollama.kb.embedding_cache import get_cache, text_digest
+from ollama.kb.ingest import iter_file_chunks, batched, INGEST_BATCH_SIZE, ENCODE_BATCH_SIZE
+
+# Each worker loads its own copy of the embedding model, so keep the pool small.
+DEFAULT_WORKERS = max(1, min(4, (os.cpu_count() or 1) // 2))
+TORCH_THREADS_PER_WORKER = 1  # Intra-op threads per worker; workers x threads should not exceed the cores
+PENDING_PER_WORKER = 2  # Jobs kept queued per worker so none idles while the parent merges results
+# Files this large are chunked here as a stream instead of on a worker, which would hold and
+# pickle all of their chunks at once; only their embedding goes to the pool.
+STREAM_MIN_BYTES = 16 << 20
+
+
+def _init_worker(torch_threads):
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+
+
+def _chunk_worker(path, chunk_size, overlap, strategy, options):
+    chunks = list(iter_file_chunks(path, chunk_size, overlap, strategy, **options))
+    return [text for text, _ in chunks], [span for _, span in chunks]
+
+
+def _encode_worker(texts, model_name, device, batch_size):
+    # Each worker process loads its own copy of the model on its first batch.
+    model = get_embedder(model_name, device)
+    return np.asarray(model.encode(texts, convert_to_numpy=True, batch_size=batch_size), dtype=np.float32)
+
+
+def _chunked_files(pool, files, window, stream_min_bytes, chunk_size, overlap, strategy, options):
+    """
+    Yields (name, iterator of (text, span)) in input order. Files below stream_min_bytes are
+    read and chunked on the pool, at most window in flight; larger ones are chunked lazily
+    in this process as the caller consumes them, so memory stays bounded by its batches.
+    """
+    pending = deque()
+
+    def ready():
+        name, future = pending.popleft()
+        texts, spans = future.result()
+        return name, zip(texts, spans)
+
+    for name, path in files:
+        if os.path.getsize(path) >= stream_min_bytes:
+            while pending:
+                yield ready()
+            yield name, iter_file_chunks(path, chunk_size, overlap, strategy, **options)
+            continue
+        pending.append((name, pool.submit(_chunk_worker, path, chunk_size, overlap, strategy, options)))
+        if len(pending) > window:
+            yield ready()
+    while pending:
+        yield ready()
+
+
+def ingest_files_parallel(files, store, writer, model_name=DEFAULT_MODEL, cache_dir=None, chunk_size=100, overlap=20,
+                          batch_size=INGEST_BATCH_SIZE, encode_batch_size=ENCODE_BATCH_SIZE, device=None,
+                          strategy="words", chunker_options=None, workers=DEFAULT_WORKERS,
+                          torch_threads=TORCH_THREADS_PER_WORKER, stream_min_bytes=STREAM_MIN_BYTES):
+    """
+    Same contract as ingest.ingest_files, but reading/chunking and embedding run on a
+    process pool. Cache lookups and writes, chunk ids and index adds stay in this process
+    and are merged strictly in input order, so the result is identical to a serial build.
+
+    :param workers: Number of worker processes, each holding its own model copy.
+    :param torch_threads: torch.set_num_threads() value inside each worker.
+    :param stream_min_bytes: Files at least this large are chunked in this process as a stream.
+    :return: Dict source_name -> {"start_id": ..., "count": ...}.
+    """
+    cache = get_cache(cache_dir, model_name) if cache_dir else None
+    records = {}
+    next_id = store.next_id
+    window = max(1, workers) * PENDING_PER_WORKER
+    pending = deque()
+
+    def merge(name, texts, spans, digests, found, missing, future):
+        if future is not None:
+            fresh = future.result()
+            if cache is not None:
+                cache.add([digests[i] for i in missing], fresh)
+            for pos, vector in zip(missing, fresh):
+                found[pos] = vector
+        vectors = np.stack([found[i] for i in range(len(texts))])
+        writer.add(vectors, store.add_chunks(name, texts, spans))
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                             initargs=(torch_threads,)) as pool:
+        chunked = _chunked_files(
+            pool, files, window, stream_min_bytes, chunk_size, overlap, strategy, chunker_options or {}
+        )
+        for name, chunks in chunked:
+            records[name] = {"start_id": next_id, "count": 0}
+            for batch in batched(chunks, batch_size):
+                texts = [text for text, _ in batch]
+                spans = [span for _, span in batch]
+                records[name]["count"] += len(batch)
+                next_id += len(batch)
+                digests = [text_digest(t) for t in texts] if cache is not None else None
+                found, missing = cache.lookup(digests) if cache is not None else ({}, list(range(len(texts))))
+                future = None
+                if missing:
+                    future = pool.submit(
+                        _encode_worker, [texts[i] for i in missing], model_name, device, encode_batch_size
+                    )
+                pending.append((name, texts, spans, digests, found, missing, future))
+                while len(pending) > window:
+                    merge(*pending.popleft())
+        while pending:
+            merge(*pending.popleft())
+    return records
@@ -10,6 +10,7 @@ import json
 from config.loader import Config
 from utils.logger import get_logger
 from codegen.json_extractor import extract_first_json
+from codegen.refiner import build_refinement_prompt, request_refinement
 from codegen.deps import load_dependencies, diff_with_lock
 from utils.file_utils import atomic_write
 
@@ -148,7 +149,8 @@ def main():
             logger.error(f"❌ Runtime error:\n{output}")
             blob = collect_code(root)
             prompt = build_refinement_prompt(blob + "\n\nError:\n" + output)
-            refined = request_refinement(prompt)
+            # A cached reply to the same code and error would just reproduce the failure.
+            refined = request_refinement(prompt, bypass_cache=True)
             sanitize_and_write(root, refined)
             auto_format(root)
             logger.info("🔄 Refined after error.")
@@ -1,24 +1,215 @@
 """
 ollama_client.py
 
-Abstraction layer over direct Ollama API calls
-for sending prompts and receiving generated responses.
+Shared HTTP client for every call to the Ollama server: one pooled keep-alive
+session per server, connect/read timeouts, retry with backoff on connection
+failures and busy responses, and per-endpoint latency metrics. Health and
+status probes use a separate client that never retries, so a server that is
+down is reported at once instead of after the backoff.
 """
 
+import threading
+import time
+from urllib.parse import urlsplit
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_BASE_URL = "http://localhost:11434"
+OLLAMA_ENDPOINT = f"{DEFAULT_BASE_URL}/api/generate"
+
+CONNECT_TIMEOUT = 5.0  # Seconds to establish a connection
+READ_TIMEOUT = 300.0  # Seconds to wait for a response; generation on CPU can be slow
+RETRIES = 3  # Connection failures and 502/503/504 responses; never a request the server may have processed
+BACKOFF_FACTOR = 0.5  # Sleeps 0.5s, 1s, 2s, ... between retries
+RETRY_STATUSES = (502, 503, 504)
+POOL_MAXSIZE = 16  # Keep-alive connections kept per server
+
+_clients = {}
+_probe_clients = {}
+_clients_lock = threading.Lock()
+
+
+def base_url_of(url):
+    """
+    Reduces an Ollama URL (possibly an endpoint like .../api/chat) to scheme://host:port.
+    """
+    parts = urlsplit(url.rstrip("/"))
+    if not parts.scheme:
+        return DEFAULT_BASE_URL
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def path_of(url):
+    return urlsplit(url).path or "/"
+
+
+class EndpointStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+
+    def record(self, seconds, ok):
+        self.calls += 1
+        self.errors += 0 if ok else 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.last_seconds = seconds
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": 1000.0 * self.total_seconds / self.calls if self.calls else 0.0,
+            "max_ms": 1000.0 * self.max_seconds,
+            "last_ms": 1000.0 * self.last_seconds,
+        }
+
+
+class OllamaHTTPClient:
+    """
+    Connection-pooled session bound to one Ollama server. Thread-safe; share it through get_client().
+    """
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 retries=RETRIES, backoff_factor=BACKOFF_FACTOR, pool_maxsize=POOL_MAXSIZE):
+        self.base_url = base_url_of(base_url)
+        self.timeout = (connect_timeout, read_timeout)
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,  # A read failure means the server may already be generating; do not resend.
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "POST", "DELETE"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def request(self, method, path, timeout=None, **kwargs):
+        """
+        Sends method to base_url + path and returns the requests.Response.
+        timeout is seconds to read, or a (connect, read) tuple; defaults to the client's.
+        """
+        if isinstance(timeout, (int, float)):
+            timeout = (self.timeout[0], timeout)
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=timeout or self.timeout, **kwargs)
+            ok = response.status_code < 400
+            return response
+        finally:
+            self._record(path, time.perf_counter() - start, ok)
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def post_json(self, path, payload, **kwargs):
+        """
+        POSTs payload and returns the decoded JSON body, raising for HTTP errors.
+        """
+        response = self.post(path, json=payload, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def tags(self, **kwargs):
+        response = self.get("/api/tags", **kwargs)
+        response.raise_for_status()
+        return response.json().get("models", [])
+
+    def generate(self, model, prompt, options=None, timeout=None, **fields):
+        payload = {"model": model, "prompt": prompt, "stream": False, **fields}
+        if options:
+            payload["options"] = options
+        return self.post_json("/api/generate", payload, timeout=timeout)
+
+    def chat(self, model, messages, options=None, timeout=None, **fields):
+        payload = {"model": model, "messages": messages, "stream": False, **fields}
+        if options:
+            payload["options"] = options
+        return self.post_json("/api/chat", payload, timeout=timeout)
+
+    def metrics(self):
+        """
+        Returns {path: {"calls", "errors", "avg_ms", "max_ms", "last_ms"}}.
+        """
+        with self._stats_lock:
+            return {path: stats.as_dict() for path, stats in self._stats.items()}
+
+    def reset_metrics(self):
+        with self._stats_lock:
+            self._stats.clear()
+
+    def close(self):
+        self.session.close()
+
+    def _record(self, path, seconds, ok):
+        with self._stats_lock:
+            stats = self._stats.get(path)
+            if stats is None:
+                stats = self._stats[path] = EndpointStats()
+            stats.record(seconds, ok)
+
+
+def get_client(url=DEFAULT_BASE_URL, **options):
+    """
+    Returns the process-wide client for the server behind url (any endpoint URL works).
+    options (timeouts, retries, ...) only apply when the client is first created.
+    """
+    key = base_url_of(url)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = OllamaHTTPClient(key, **options)
+    return client
+
+
+def get_probe_client(url=DEFAULT_BASE_URL):
+    """
+    Returns the process-wide non-retrying client for the server behind url, for health
+    and status probes (is the server up, which models does it have).
+    """
+    key = base_url_of(url)
+    with _clients_lock:
+        client = _probe_clients.get(key)
+        if client is None:
+            client = _probe_clients[key] = OllamaHTTPClient(key, retries=0)
+    return client
+
+
+def all_metrics():
+    """
+    Latency metrics of every shared client, keyed by base URL then endpoint path.
+    Probe calls are listed under their path with a " (probe)" suffix.
+    """
+    with _clients_lock:
+        clients = list(_clients.values())
+        probes = list(_probe_clients.values())
+    metrics = {client.base_url: client.metrics() for client in clients}
+    for probe in probes:
+        endpoints = metrics.setdefault(probe.base_url, {})
+        for path, stats in probe.metrics().items():
+            endpoints[f"{path} (probe)"] = stats
+    return metrics
 
-OLLAMA_ENDPOINT = "http://localhost:11434/api/generate"
 
 class OllamaClient:
     def __init__(self, model_name: str):
         self.model_name = model_name
 
     def generate(self, prompt: str) -> str:
-        payload = {
-            "model": self.model_name,
-            "prompt": prompt,
-            "stream": False
-        }
-        response = requests.post(OLLAMA_ENDPOINT, json=payload)
-        response.raise_for_status()
-        return response.json()["response"]
+        return get_client(OLLAMA_ENDPOINT).generate(self.model_name, prompt)["response"]
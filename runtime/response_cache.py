@@ -0,0 +1,210 @@
+"""
+response_cache.py
+
+Content-addressed cache of Ollama responses for deterministic requests
+(temperature 0 or a fixed seed): the key is a hash of the model, options and
+prompt/messages, so an identical request is answered from disk without
+reaching the server. Entries are kept in SQLite and evicted least recently
+used first once the cache grows past its size limit. Requests at the model's
+default temperature are never cached.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from runtime.ollama_client import get_client
+
+CONFIG_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "config"))
+DEFAULT_PATH = os.path.join(CONFIG_DIR, "response_cache.sqlite3")
+MAX_BYTES = 256 * 1024 * 1024  # Stored response size before the least recently used are evicted
+EVICT_TO = 0.9  # Eviction trims the cache to this share of MAX_BYTES, so it does not run on every put
+BYPASS_ENV = "OLLAMA_NO_CACHE"  # Set to 1 to neither read nor write the cache
+
+# Request fields that do not change the reply.
+VOLATILE_FIELDS = ("stream", "keep_alive")
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def request_key(payload):
+    """
+    sha256 of the request's content: model, options, prompt or messages, format, ...
+    """
+    content = {k: v for k, v in payload.items() if k not in VOLATILE_FIELDS}
+    canonical = json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def is_deterministic(payload):
+    options = payload.get("options") or {}
+    return options.get("temperature") == 0 or "seed" in options
+
+
+def bypassed():
+    return os.environ.get(BYPASS_ENV, "").lower() in ("1", "true", "yes")
+
+
+def reply_text(data):
+    """
+    The generated text of a /api/chat or /api/generate response body.
+    """
+    if isinstance(data, dict):
+        message = data.get("message")
+        if isinstance(message, dict):
+            return message.get("content", "")
+        return data.get("response", "")
+    return ""
+
+
+class ResponseCache:
+    """
+    Thread-safe; share it through get_cache().
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, response TEXT, size INTEGER, created REAL, used REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses (used)")
+        self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, payload):
+        """
+        The cached response body (parsed JSON) for the request, or None.
+        """
+        key = request_key(payload)
+        with self._lock:
+            row = self._db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self._db:
+                self._db.execute("UPDATE responses SET used = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, payload, response):
+        text = json.dumps(response, ensure_ascii=False)
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        key = request_key(payload)
+        now = time.time()
+        with self._lock, self._db:
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, payload.get("model"), text, size, now, now),
+            )
+            self._size += size - (old[0] if old else 0)
+            if self._size > self.max_bytes:
+                self._evict(int(self.max_bytes * EVICT_TO))
+
+    def discard(self, payload):
+        """
+        Drops the cached reply to the request, e.g. one that turned out to be unusable.
+        """
+        key = request_key(payload)
+        with self._lock, self._db:
+            row = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= row[0]
+
+    def _evict(self, target):
+        # Oldest-used first until the cache fits in target bytes.
+        freed, keys = 0, []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY used"):
+            if self._size - freed <= target:
+                break
+            keys.append((key,))
+            freed += size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", keys)
+        self._size -= freed
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM responses")
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def get_cache(path=DEFAULT_PATH, max_bytes=MAX_BYTES):
+    """
+    The shared cache for a database file, opened on first use.
+    """
+    path = os.path.abspath(path)
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = ResponseCache(path, max_bytes)
+        return cache
+
+
+def cache_from_config(cfg):
+    """
+    The shared cache configured under response_cache in config.yaml, or None if disabled.
+    """
+    if not cfg.response_cache_enabled:
+        return None
+    return get_cache(cfg.response_cache_path, int(cfg.response_cache_max_mb * 1024 * 1024))
+
+
+def post_cached(url, path, payload, timeout=None, cache=None, bypass=False, accept=None):
+    """
+    POSTs a non-streaming generate/chat request and returns the response JSON, answering
+    deterministic requests from the cache when it has them.
+
+    :param cache: ResponseCache to use; None sends every request to the server.
+    :param bypass: Skip the cache lookup (the fresh reply still replaces the cached one).
+        Retries after an unusable reply should set it.
+    :param accept: Optional fn(response) -> bool, e.g. "the reply parses". Rejected replies
+        are never stored, and a cached one that is rejected is discarded and re-requested.
+    Raises requests.HTTPError on error statuses, like raise_for_status().
+    """
+    cacheable = (cache is not None and is_deterministic(payload) and not payload.get("stream")
+                 and not bypassed())
+    if cacheable and not bypass:
+        hit = cache.get(payload)
+        if hit is not None:
+            if accept is None or accept(hit):
+                return hit
+            cache.discard(payload)
+    resp = get_client(url).post(path, json=payload, timeout=timeout)
+    resp.raise_for_status()
+    data = resp.json()
+    if cacheable:
+        if accept is None or accept(data):
+            cache.put(payload, data)
+        else:
+            cache.discard(payload)  # A bypassing retry must not leave the old reply behind either.
+    return data
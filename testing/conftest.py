@@ -0,0 +1,67 @@
+import os
+import sys
+import zlib
+
+import numpy as np
+import pytest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from ollama.kb import embedder, kb_manager
+from ollama.kb.lexical import tokenize
+
+
+class HashingEmbedder:
+    """
+    Deterministic bag-of-words vectors in place of a SentenceTransformer, so KB tests
+    run without downloading a model. Texts sharing words get similar vectors.
+    """
+
+    dim = 64
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts, convert_to_numpy=True, batch_size=32, **kwargs):
+        self.calls += 1
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in tokenize(text):
+                vectors[row, zlib.crc32(word.encode("utf-8")) % self.dim] += 1.0
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors
+
+
+def topic_text(topic, words=600):
+    """
+    A document whose every chunk carries its topic word, so results can be traced to it.
+    """
+    return " ".join(f"{topic} filler{i % 37} note{i % 11}" for i in range(words // 3))
+
+
+@pytest.fixture
+def fake_embedder(monkeypatch):
+    model = HashingEmbedder()
+    monkeypatch.setitem(embedder._models, (embedder.DEFAULT_MODEL, None), model)
+    return model
+
+
+@pytest.fixture
+def kb_dirs(tmp_path, monkeypatch, fake_embedder):
+    """
+    Points kb_manager at an empty KB folder, bundle and embedding cache under tmp_path.
+    """
+    kb_folder = tmp_path / "local_kb"
+    kb_folder.mkdir()
+    monkeypatch.setattr(kb_manager, "KB_FOLDER", str(kb_folder))
+    monkeypatch.setattr(kb_manager, "BUNDLE_DIR", str(tmp_path / "kb_bundle"))
+    monkeypatch.setattr(kb_manager, "EMBEDDING_CACHE_DIR", str(tmp_path / "kb_embeddings"))
+    monkeypatch.setattr(kb_manager, "METADATA_FILE", str(tmp_path / "kb_documents.json"))
+    return kb_folder
+
+
+def write_documents(kb_folder, topics, words=600):
+    for topic in topics:
+        (kb_folder / f"{topic}.txt").write_text(topic_text(topic, words), encoding="utf-8")
@@ -0,0 +1,68 @@
+from conftest import PROJECT_ROOT  # noqa: F401  (puts the project root on sys.path)
+from ollama.core import context_builder
+from ollama.core.context_builder import ContextBuilder, estimate_tokens
+
+WINDOW, RESERVE, SUMMARY = 1000, 100, 100
+PROMPT = "next?"
+MESSAGE_TOKENS = 101  # estimate_tokens of a 400 character message
+
+
+class Summarizer:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, previous, messages):
+        self.calls.append(len(messages))
+        return f"summary of {len(self.calls)} batches"
+
+
+def session_with(count):
+    return {"messages": [{"role": "user" if i % 2 == 0 else "assistant", "content": chr(97 + i % 26) * 400}
+                         for i in range(count)],
+            "message_count": count}
+
+
+def add_message(session):
+    session["messages"].append({"role": "user", "content": "z" * 400})
+    session["message_count"] += 1
+
+
+def test_eviction_leaves_room_for_later_turns():
+    summarize, saved = Summarizer(), []
+    builder = ContextBuilder(summarize, lambda session, summary: saved.append(dict(summary)),
+                             window=WINDOW, reserve=RESERVE, summary_tokens=SUMMARY)
+    budget = WINDOW - RESERVE - estimate_tokens(PROMPT) - SUMMARY
+    fill = int(budget * context_builder.RECENT_FILL) // MESSAGE_TOKENS
+
+    session = session_with(10)
+    full, info = builder.build(session, PROMPT)
+    assert summarize.calls == [10 - fill]
+    assert info["recent"] == fill and info["summarized"] == 10 - fill
+    assert saved == [{"text": "summary of 1 batches", "upto": 10 - fill}]
+    assert info["tokens"] <= WINDOW - RESERVE
+    assert full.endswith(f"Current message:\n{PROMPT}")
+
+    # The turns freed by RECENT_FILL go in verbatim before the summary is extended again.
+    spare = budget // MESSAGE_TOKENS - fill
+    assert spare > 0
+    for _ in range(spare):
+        add_message(session)
+        _, info = builder.build(session, PROMPT)
+        assert len(summarize.calls) == 1 and info["summarized"] == 10 - fill
+    add_message(session)
+    _, info = builder.build(session, PROMPT)
+    assert len(summarize.calls) == 2
+    assert info["recent"] == fill and info["summarized"] == session["message_count"] - fill
+    assert info["tokens"] <= WINDOW - RESERVE
+
+
+def test_tail_loaded_session_counts_from_its_offset():
+    summarize = Summarizer()
+    builder = ContextBuilder(summarize, window=WINDOW, reserve=RESERVE, summary_tokens=SUMMARY)
+    session = session_with(10)
+    session["messages"] = session["messages"][-4:]  # As loaded with tail=4
+    session["summary"] = {"text": "earlier", "upto": 6}
+    full, info = builder.build(session, PROMPT)
+    assert summarize.calls == []
+    assert info == {"recent": 4, "summarized": 6, "tokens": estimate_tokens(full)}
+    assert full.startswith("Summary of the earlier conversation:\nearlier")
@@ -0,0 +1,88 @@
+import pytest
+
+from conftest import PROJECT_ROOT  # noqa: F401  (puts the project root on sys.path)
+
+pytest.importorskip("PIL")
+pytest.importorskip("pytesseract")
+
+from ollama.core import core_manager, session  # noqa: E402
+
+
+class FakeModel:
+    """
+    Stands in for api.stream_response: records the context each turn was sent with and
+    returns a new one, or fails mid-reply once fail is set.
+    """
+
+    def __init__(self):
+        self.sent = []
+        self.fail = False
+
+    def __call__(self, url, model, prompt, num_ctx=None, context=None, result=None):
+        self.sent.append(context)
+        yield "partial"
+        if self.fail:
+            raise RuntimeError("Server error: 500")
+        result["context"] = [len(self.sent)] * 8
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(session, "get_sessions_dir", lambda: str(tmp_path / "sessions"))
+    (tmp_path / "sessions").mkdir()
+    monkeypatch.setattr(core_manager, "LOG_FILE_PATH", str(tmp_path / "log.txt"))
+    monkeypatch.setattr(core_manager, "SEARCH_CACHE_PATH", str(tmp_path / "search.sqlite3"))
+    model = FakeModel()
+    monkeypatch.setattr(core_manager.api, "stream_response", model)
+    manager = core_manager.CoreManager(prewarm=())
+    manager.local_kb_enabled = False
+    manager.current_model = "model-a"
+    manager.new_session()
+    manager.model = model
+    yield manager
+    session.close_journals()
+
+
+def turn(manager, message):
+    # As the chat window does it: the messages are stored once the reply is complete.
+    try:
+        reply = "".join(manager.stream_response(message))
+    except RuntimeError:
+        manager.store_message_in_session("user", message)
+        manager.store_message_in_session("assistant", "partial")
+        return
+    manager.store_message_in_session("user", message)
+    manager.store_message_in_session("assistant", reply)
+
+
+def test_context_is_reused_between_turns(manager):
+    turn(manager, "one")
+    turn(manager, "two")
+    assert manager.model.sent == [None, [1] * 8]
+
+
+def test_model_switch_resets_the_context(manager):
+    turn(manager, "one")
+    manager.current_model = "model-b"
+    turn(manager, "two")
+    assert manager.model.sent == [None, None]
+
+
+def test_session_switch_resets_the_context(manager):
+    turn(manager, "one")
+    first = manager.current_session["id"]
+    manager.new_session()
+    turn(manager, "two")
+    assert manager.load_session(first)
+    turn(manager, "three")
+    assert manager.model.sent == [None, None, None]
+
+
+def test_context_is_not_reused_after_an_error(manager):
+    turn(manager, "one")
+    manager.model.fail = True
+    turn(manager, "two")
+    manager.model.fail = False
+    turn(manager, "three")
+    turn(manager, "four")
+    assert manager.model.sent == [None, [1] * 8, None, [3] * 8]
@@ -0,0 +1,72 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from conftest import PROJECT_ROOT  # noqa: F401  (puts the project root on sys.path)
+from ollama.kb.embedding_cache import EmbeddingCache, text_digest
+
+DIM = 8
+
+
+def vector_for(text):
+    seed = int.from_bytes(text_digest(text)[:4], "little")
+    return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+
+
+def add_texts(cache, texts):
+    cache.add([text_digest(t) for t in texts], np.stack([vector_for(t) for t in texts]))
+
+
+def assert_vectors(cache, texts):
+    found, missing = cache.lookup([text_digest(t) for t in texts])
+    assert missing == []
+    for pos, text in enumerate(texts):
+        np.testing.assert_array_equal(found[pos], vector_for(text))
+
+
+def test_instances_sharing_a_directory_keep_rows_apart(tmp_path):
+    a = EmbeddingCache(str(tmp_path))
+    b = EmbeddingCache(str(tmp_path))
+    add_texts(a, ["a"])
+    add_texts(b, ["b"])
+    add_texts(a, ["c"])
+    assert_vectors(a, ["a", "b", "c"])
+    assert_vectors(b, ["a", "b", "c"])
+    assert_vectors(EmbeddingCache(str(tmp_path)), ["a", "b", "c"])
+
+
+def test_torn_tail_is_dropped_on_open(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    add_texts(cache, ["a", "b"])
+    with open(cache.vectors_path, "ab") as f:
+        f.write(vector_for("c").tobytes()[:5])  # Crash mid-append: half a vector, no key.
+    reopened = EmbeddingCache(str(tmp_path))
+    assert len(reopened) == 2
+    add_texts(reopened, ["c"])
+    assert_vectors(EmbeddingCache(str(tmp_path)), ["a", "b", "c"])
+
+
+def _writer(cache_dir, worker, rounds):
+    cache = EmbeddingCache(cache_dir)
+    for r in range(rounds):
+        # Each round shares one text with the other workers, the rest are its own.
+        add_texts(cache, [f"shared {r}"] + [f"w{worker} r{r} t{i}" for i in range(5)])
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_concurrent_writer_processes(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers, rounds = 4, 25
+    processes = [context.Process(target=_writer, args=(str(tmp_path), w, rounds)) for w in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+
+    texts = [f"shared {r}" for r in range(rounds)]
+    texts += [f"w{w} r{r} t{i}" for w in range(workers) for r in range(rounds) for i in range(5)]
+    cache = EmbeddingCache(str(tmp_path))
+    assert len(cache) == len(texts)
+    assert_vectors(cache, texts)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from conftest import PROJECT_ROOT  # noqa: F401  (puts the project root on sys.path)
+from ollama.kb import ann
+from ollama.kb.ingest import IndexWriter
+
+DIM = 8
+
+
+def stream(count, batch=100):
+    # Vector i carries i in its first component, so sampled vectors can be traced back.
+    rng = np.random.default_rng(0)
+    for start in range(0, count, batch):
+        ids = np.arange(start, min(start + batch, count))
+        vectors = rng.standard_normal((len(ids), DIM)).astype(np.float32)
+        vectors[:, 0] = ids
+        yield vectors, ids
+
+
+@pytest.mark.parametrize("kind", ("ivf_flat", "ivf_pq"))
+def test_training_sample_spans_the_whole_stream(kind, monkeypatch):
+    count = 6000
+    params = {"nlist": 16, "nbits": 4} if kind == "ivf_pq" else {"nlist": 16}  # A sample of 1024
+    writer = IndexWriter(kind=kind, params=params, expected_count=count)
+    trained_on = []
+    train_index = ann.train_index
+    monkeypatch.setattr(ann, "train_index", lambda index, vectors, params: (
+        trained_on.append(vectors[:, 0].copy()), train_index(index, vectors, params)))
+    for vectors, ids in stream(count):
+        writer.add(vectors, ids)
+    index, _, params = writer.finish()
+
+    sample = trained_on[0]
+    assert len(sample) == ann.training_size(params) < count
+    # The stream's last quarter is as well represented as its first.
+    first, last = np.sum(sample < count / 4), np.sum(sample >= 3 * count / 4)
+    assert last > 0.6 * first and first > 0.6 * last
+    assert index.ntotal == count
+    if kind == "ivf_flat":
+        ann.apply_search_params(index, {"nprobe": params["nlist"]})
+        vectors = np.concatenate([v for v, _ in stream(count)])
+        _, found = index.search(vectors[[10, 4321, 5999]], 1)
+        assert found[:, 0].tolist() == [10, 4321, 5999]
+
+
+def test_small_streams_shrink_the_quantizer():
+    writer = IndexWriter(kind="ivf_flat", expected_count=100_000)
+    for vectors, ids in stream(300):
+        writer.add(vectors, ids)
+    index, _, params = writer.finish()
+    assert index.is_trained and index.ntotal == 300
+    assert params["nlist"] <= 300
@@ -0,0 +1,103 @@
+import os
+
+import faiss
+import pytest
+
+from conftest import topic_text, write_documents
+from ollama.kb import ann, kb_manager
+
+
+def indexed_ids(index):
+    return sorted(faiss.vector_to_array(index.id_map).tolist())
+
+
+def documents():
+    return kb_manager.read_manifest(kb_manager.BUNDLE_DIR)["documents"]
+
+
+@pytest.mark.parametrize("kind", ann.INDEX_KINDS)
+def test_update_index_only_touches_changed_documents(kb_dirs, monkeypatch, kind):
+    monkeypatch.setattr(kb_manager, "INDEX_KIND", kind)
+    write_documents(kb_dirs, ("alpha", "bravo", "charlie"))
+    index, store, _ = kb_manager.update_index()
+    assert indexed_ids(index) == sorted(store.ids.tolist())
+    before = documents()
+
+    hashed, ingested = [], []
+    file_hash, ingest_files = kb_manager.file_hash, kb_manager.ingest_files
+
+    def recording_hash(path, *args, **kwargs):
+        hashed.append(os.path.basename(path))
+        return file_hash(path, *args, **kwargs)
+
+    def recording_ingest(files, *args, **kwargs):
+        files = list(files)
+        ingested.extend(name for name, _ in files)
+        return ingest_files(files, *args, **kwargs)
+
+    monkeypatch.setattr(kb_manager, "file_hash", recording_hash)
+    monkeypatch.setattr(kb_manager, "ingest_files", recording_ingest)
+
+    (kb_dirs / "bravo.txt").write_text(topic_text("golf"), encoding="utf-8")
+    (kb_dirs / "charlie.txt").unlink()
+    write_documents(kb_dirs, ("delta",))
+    alpha = kb_dirs / "alpha.txt"
+    os.utime(alpha, (alpha.stat().st_atime, alpha.stat().st_mtime + 10))  # Touched, not changed
+
+    index, store, _ = kb_manager.update_index()
+    assert sorted(hashed) == ["alpha.txt", "bravo.txt", "delta.txt"]
+    assert ingested == ["bravo.txt", "delta.txt"]
+    assert indexed_ids(index) == sorted(store.ids.tolist())
+    assert sorted(store.sources) == ["alpha.txt", "bravo.txt", "delta.txt"]
+    texts = list(store)
+    assert not any("charlie" in t for t in texts)
+    assert any("golf" in t for t in texts) and not any("bravo" in t for t in texts)
+
+    after = documents()
+    assert set(after) == {"alpha.txt", "bravo.txt", "delta.txt"}
+    assert after["alpha.txt"]["start_id"] == before["alpha.txt"]["start_id"]
+    assert after["alpha.txt"]["mtime"] == alpha.stat().st_mtime
+    for record in after.values():
+        ids = range(record["start_id"], record["start_id"] + record["count"])
+        assert all(chunk_id in store for chunk_id in ids)
+
+    hashed.clear()
+    ingested.clear()
+    index, store, _ = kb_manager.update_index()
+    assert hashed == [] and ingested == []
+    assert indexed_ids(index) == sorted(store.ids.tolist())
+
+
+@pytest.mark.parametrize("kind", ann.INDEX_KINDS)
+def test_removing_every_document_empties_the_bundle(kb_dirs, monkeypatch, kind):
+    monkeypatch.setattr(kb_manager, "INDEX_KIND", kind)
+    write_documents(kb_dirs, ("alpha", "bravo"))
+    kb_manager.update_index()
+    for path in kb_dirs.iterdir():
+        path.unlink()
+
+    kb_manager.update_index()
+    manifest = kb_manager.read_manifest(kb_manager.BUNDLE_DIR)
+    assert manifest is None or manifest["documents"] == {}
+    assert not kb_manager._documents_changed(manifest["documents"] if manifest else {})
+
+    write_documents(kb_dirs, ("charlie",))
+    index, store, _ = kb_manager.update_index()
+    assert store.sources == ["charlie.txt"] and index.ntotal == len(store)
+
+
+@pytest.mark.parametrize("setting, value", (("INDEX_KIND", "hnsw"), ("INDEX_STORAGE", "float16")))
+def test_changed_index_settings_rebuild_the_bundle(kb_dirs, monkeypatch, setting, value):
+    monkeypatch.setattr(kb_manager, "INDEX_KIND", "flat")
+    write_documents(kb_dirs, ("alpha", "bravo"))
+    kb_manager.update_index()
+    kb_manager.update_index()
+    generation = kb_manager.read_manifest(kb_manager.BUNDLE_DIR)["generation"]
+
+    monkeypatch.setattr(kb_manager, setting, value)
+    index, store, _ = kb_manager.update_index()
+    manifest = kb_manager.read_manifest(kb_manager.BUNDLE_DIR)
+    assert manifest["generation"] == generation + 1
+    config = manifest["index_config"]
+    assert (config["kind"] if setting == "INDEX_KIND" else config["storage"]) == value
+    assert index.ntotal == len(store)
@@ -0,0 +1,43 @@
+import faiss
+import numpy as np
+import pytest
+
+from conftest import write_documents
+from ollama.core.kb_helper import KnowledgeBaseHelper
+from ollama.kb import ann, kb_manager
+
+TOPICS = ("alpha", "bravo", "charlie", "delta", "echo", "foxtrot")
+
+
+@pytest.mark.parametrize("kind", ann.INDEX_KINDS)
+@pytest.mark.parametrize("mode", ("vector", "hybrid", "narrowed"))
+def test_filtered_search_on_each_index_kind(kb_dirs, monkeypatch, kind, mode):
+    monkeypatch.setattr(kb_manager, "INDEX_KIND", kind)
+    write_documents(kb_dirs, TOPICS)
+    helper = KnowledgeBaseHelper()
+    assert kb_manager.read_manifest(kb_manager.BUNDLE_DIR)["index_config"]["kind"] == kind
+
+    helper.set_file_filter(["bravo.txt", "delta.txt"])
+    chunks, _ = helper.search_kb("alpha filler3 note4", top_k=5, mode=mode)
+    assert chunks
+    assert all(("bravo" in c) != ("delta" in c) for c in chunks)
+
+    helper.set_file_filter(None)
+    chunks, _ = helper.search_kb("charlie filler3", top_k=3, mode=mode)
+    assert chunks and all("charlie" in c for c in chunks)
+
+
+@pytest.mark.parametrize("kind", ("ivf_flat", "ivf_pq", "hnsw"))
+def test_search_parameters_keep_index_tuning(kind):
+    vectors = np.random.default_rng(0).standard_normal((2000, 16)).astype(np.float32)
+    index, kind, params = ann.build_index(vectors, np.arange(len(vectors)), kind)
+    ann.apply_search_params(index, {"nprobe": 5, "ef_search": 77})
+    allowed = np.arange(0, len(vectors), 3, dtype=np.int64)
+
+    search_params = ann.search_parameters(index, faiss.IDSelectorBatch(allowed))
+    if kind == "hnsw":
+        assert isinstance(search_params, faiss.SearchParametersHNSW) and search_params.efSearch == 77
+    else:
+        assert isinstance(search_params, faiss.SearchParametersIVF) and search_params.nprobe == 5
+    _, found = index.search(vectors[:4], 5, params=search_params)
+    assert set(found[found >= 0].tolist()) <= set(allowed.tolist())
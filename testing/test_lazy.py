@@ -0,0 +1,54 @@
+import threading
+import time
+
+from conftest import PROJECT_ROOT  # noqa: F401  (puts the project root on sys.path)
+from ollama.core.lazy import LazyComponent
+
+
+def slow_factory(seconds, calls):
+    def factory():
+        calls.append(1)
+        time.sleep(seconds)
+        return "built"
+    return factory
+
+
+def test_when_ready_does_not_wait_for_build():
+    calls = []
+    component = LazyComponent("slow", slow_factory(1.0, calls))
+    component.prewarm()
+    time.sleep(0.1)
+    assert component.state == LazyComponent.LOADING
+
+    fired = threading.Event()
+    start = time.time()
+    component.when_ready(lambda c: fired.set())
+    assert time.time() - start < 0.1
+    assert not fired.is_set()
+
+    assert fired.wait(3)
+    assert component.get() == "built"
+    assert calls == [1]
+
+
+def test_concurrent_get_builds_once():
+    calls = []
+    component = LazyComponent("slow", slow_factory(0.3, calls))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(component.get())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["built"] * 4
+    assert calls == [1]
+
+
+def test_when_ready_after_failure_fires_immediately():
+    def broken():
+        raise ValueError("no model")
+    component = LazyComponent("broken", broken)
+    component.prewarm().join()
+    seen = []
+    component.when_ready(seen.append)
+    assert seen == [component] and component.state == LazyComponent.FAILED
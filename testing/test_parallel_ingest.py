@@ -0,0 +1,64 @@
+import numpy as np
+
+from conftest import topic_text, write_documents
+from ollama.kb import kb_manager
+from ollama.kb.embedder import DEFAULT_MODEL
+from ollama.kb.ingest import IndexWriter, ingest_files
+from ollama.kb.kb_store import ChunkStore
+from ollama.kb.parallel import ingest_files_parallel
+
+TOPICS = ["alpha", "bravo", "charlie", "delta"]
+
+
+def build(ingest, files, cache_dir, **options):
+    store = ChunkStore()
+    writer = IndexWriter(kind="flat")
+    records = ingest(files, store, writer, DEFAULT_MODEL, cache_dir=str(cache_dir), chunk_size=40, overlap=8,
+                     batch_size=7, **options)
+    return store, writer.finish()[0], records
+
+
+def test_parallel_ingest_matches_serial(tmp_path, fake_embedder):
+    files = []
+    for pos, topic in enumerate(TOPICS):
+        path = tmp_path / f"{topic}.txt"
+        path.write_text(topic_text(topic, 150 + 300 * pos), encoding="utf-8")
+        files.append((path.name, str(path)))
+    cache_dir = tmp_path / "cache"
+
+    # The serial build fills the embedding cache, so the spawned workers (which cannot see
+    # the fake embedder) only chunk; the two larger files are chunked here as streams.
+    serial_store, serial_index, serial_records = build(ingest_files, files, cache_dir)
+    parallel_store, parallel_index, parallel_records = build(
+        ingest_files_parallel, files, cache_dir, workers=2, stream_min_bytes=4000
+    )
+
+    assert parallel_records == serial_records
+    assert list(parallel_store.ids) == list(serial_store.ids)
+    for chunk_id in serial_store.ids:
+        assert parallel_store[chunk_id] == serial_store[chunk_id]
+        assert parallel_store.span_of(chunk_id) == serial_store.span_of(chunk_id)
+        assert parallel_store.source_of(chunk_id) == serial_store.source_of(chunk_id)
+        np.testing.assert_array_equal(parallel_index.reconstruct(int(chunk_id)),
+                                      serial_index.reconstruct(int(chunk_id)))
+
+
+def test_update_index_with_workers(kb_dirs, monkeypatch):
+    write_documents(kb_dirs, TOPICS, words=900)
+    _, serial_store, _ = kb_manager.update_index()
+    serial = [(serial_store.source_of(i), serial_store[i]) for i in serial_store.ids]
+
+    calls = []
+
+    def recording_parallel(files, *args, **kwargs):
+        calls.append(kwargs["workers"])
+        return ingest_files_parallel(files, *args, **kwargs)
+
+    # The embedding cache already holds every vector, so the workers only chunk.
+    monkeypatch.setattr(kb_manager, "INGEST_WORKERS", 2)
+    monkeypatch.setattr(kb_manager, "PARALLEL_MIN_BYTES", 0)
+    monkeypatch.setattr(kb_manager, "ingest_files_parallel", recording_parallel)
+    index, store, _ = kb_manager.rebuild_index()
+    assert calls == [2]
+    assert [(store.source_of(i), store[i]) for i in store.ids] == serial
+    assert index.ntotal == len(store)
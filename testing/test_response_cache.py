@@ -0,0 +1,150 @@
+import pytest
+
+from conftest import PROJECT_ROOT  # noqa: F401  (puts the project root on sys.path)
+from runtime import response_cache
+from runtime.response_cache import ResponseCache, post_cached, request_key
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self._data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+
+class FakeServer:
+    """
+    Stands in for the pooled client: replies with the queued texts, counting requests.
+    """
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.requests = []
+
+    def post(self, path, json=None, timeout=None):
+        self.requests.append(json)
+        return FakeResponse({"message": {"role": "assistant", "content": self.replies.pop(0)}})
+
+
+@pytest.fixture
+def server(monkeypatch):
+    fake = FakeServer()
+    monkeypatch.setattr(response_cache, "get_client", lambda url: fake)
+    monkeypatch.delenv(response_cache.BYPASS_ENV, raising=False)
+    return fake
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"))
+    yield cache
+    cache.close()
+
+
+def chat(prompt, **options):
+    payload = {"model": "m", "messages": [{"role": "user", "content": prompt}], "stream": False}
+    if options:
+        payload["options"] = options
+    return payload
+
+
+def test_key_covers_model_options_and_prompt_only():
+    base = chat("hello", temperature=0)
+    assert request_key(base) == request_key({**base, "stream": True, "keep_alive": "5m"})
+    assert request_key(base) == request_key(dict(reversed(list(base.items()))))
+    assert request_key(base) != request_key(chat("hello!", temperature=0))
+    assert request_key(base) != request_key(chat("hello", temperature=0, num_ctx=4096))
+    assert request_key(base) != request_key({**base, "model": "other"})
+
+
+def test_deterministic_requests_are_served_from_cache(server, cache):
+    server.replies = ["first"]
+    for _ in range(3):
+        data = post_cached("http://x", "/api/chat", chat("q", temperature=0), cache=cache)
+        assert data["message"]["content"] == "first"
+    assert len(server.requests) == 1
+    assert cache.stats()["hits"] == 2
+
+
+def test_default_temperature_is_never_cached(server, cache):
+    server.replies = ["a", "b"]
+    replies = [post_cached("http://x", "/api/chat", chat("q"), cache=cache)["message"]["content"]
+               for _ in range(2)]
+    assert replies == ["a", "b"]
+    assert cache.stats()["entries"] == 0
+
+
+@pytest.mark.parametrize("options", [{"temperature": 0.7}, {"temperature": 1e-3, "top_k": 1}])
+def test_sampled_requests_bypass_cache(server, cache, options):
+    server.replies = ["a", "b"]
+    replies = [post_cached("http://x", "/api/chat", chat("q", **options), cache=cache)["message"]["content"]
+               for _ in range(2)]
+    assert replies == ["a", "b"] and len(server.requests) == 2
+    assert cache.stats()["entries"] == 0 and cache.get(chat("q", **options)) is None
+
+
+def test_seeded_requests_are_cached_at_any_temperature(server, cache):
+    server.replies = ["seeded"]
+    for _ in range(2):
+        post_cached("http://x", "/api/chat", chat("q", temperature=0.7, seed=42), cache=cache)
+    assert len(server.requests) == 1
+
+
+def test_bypass_skips_lookup_and_refreshes_entry(server, cache):
+    server.replies = ["old", "new"]
+    post_cached("http://x", "/api/chat", chat("q", temperature=0), cache=cache)
+    data = post_cached("http://x", "/api/chat", chat("q", temperature=0), cache=cache, bypass=True)
+    assert data["message"]["content"] == "new" and len(server.requests) == 2
+    assert cache.get(chat("q", temperature=0))["message"]["content"] == "new"
+
+
+def test_bypass_env_disables_cache(server, cache, monkeypatch):
+    monkeypatch.setenv(response_cache.BYPASS_ENV, "1")
+    server.replies = ["a", "b"]
+    for _ in range(2):
+        post_cached("http://x", "/api/chat", chat("q", temperature=0), cache=cache)
+    assert len(server.requests) == 2 and cache.stats()["entries"] == 0
+
+
+def test_rejected_replies_are_not_cached(server, cache):
+    accept = lambda data: data["message"]["content"].startswith("{")
+    server.replies = ["not json", '{"ok": 1}']
+    post_cached("http://x", "/api/chat", chat("q", temperature=0), cache=cache, accept=accept)
+    assert cache.stats()["entries"] == 0
+    data = post_cached("http://x", "/api/chat", chat("q", temperature=0), cache=cache, accept=accept)
+    assert data["message"]["content"] == '{"ok": 1}' and len(server.requests) == 2
+
+
+def test_cached_reply_rejected_later_is_discarded(server, cache):
+    server.replies = ["bad", "good"]
+    post_cached("http://x", "/api/chat", chat("q", temperature=0), cache=cache)
+    data = post_cached("http://x", "/api/chat", chat("q", temperature=0), cache=cache,
+                       accept=lambda d: d["message"]["content"] == "good")
+    assert data["message"]["content"] == "good" and len(server.requests) == 2
+    assert cache.get(chat("q", temperature=0))["message"]["content"] == "good"
+
+
+def test_size_bound_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path / "small.sqlite3"), max_bytes=600)
+    for prompt in "abcd":
+        cache.put(chat(prompt, temperature=0), {"message": {"content": prompt * 150}})
+        cache.get(chat("a", temperature=0))  # Keep "a" recently used.
+    assert cache.stats()["bytes"] <= 600
+    assert cache.get(chat("a", temperature=0)) is not None
+    assert cache.get(chat("b", temperature=0)) is None
+    cache.close()
+
+    reopened = ResponseCache(str(tmp_path / "small.sqlite3"), max_bytes=600)
+    assert reopened.get(chat("a", temperature=0)) is not None
+    reopened.close()
+
+
+def test_config_anchors_cache_in_config_dir():
+    from config.loader import Config
+    cfg = Config()
+    assert cfg.temperature is None and cfg.generation_options() == {}
+    assert cfg.response_cache_path == response_cache.DEFAULT_PATH
@@ -0,0 +1,70 @@
+from conftest import PROJECT_ROOT  # noqa: F401  (puts the project root on sys.path)
+from ollama.core.result_parser import extract_results
+
+DDG_PAGE = """
+<html><body><div id="links" class="results">
+<div class="result results_links web-result"><div class="result__body">
+  <h2 class="result__title">
+    <a rel="nofollow" class="result__a" href="https://example.com/a?x=1&amp;y=2">Fish &amp; Chips</a>
+  </h2>
+  <div class="result__extras"><div class="result__extras__url">
+    <a class="result__url" href="https://example.com/a">example.com/a</a>
+  </div></div>
+  <a class="result__snippet" href="https://example.com/a">It&#39;s <b>crispy</b> and   hot</a>
+</div></div>
+<div class="result results_links web-result"><div class="result__body">
+  <h2 class="result__title"><a class="result__a" href="https://example.org/b">No snippet here</a></h2>
+  <div class="result__extras"></div>
+</div></div>
+<div class="result results_links web-result"><div class="result__body">
+  <h2 class="result__title"><a class="result__a" href="https://example.net/c">Third</a></h2>
+  <a class="result__snippet" href="https://example.net/c">Third snippet</a>
+</div></div>
+</div></body></html>
+"""
+
+GOOGLE_PAGE = """
+<html><body><div id="search"><div id="rso">
+<div class="g"><div class="tF2Cxc"><div class="yuRUbf">
+  <a href="/url?q=tracking"><span>ignored</span></a>
+  <a href="https://example.com/one"><h3 class="LC20lb">Tom &amp; Jerry</h3></a>
+</div>
+<div class="VwiC3b"><span class="aCOpRe">Cat &lt;and&gt; <em>mouse</em></span>
+  <span class="later">not the snippet</span></div>
+</div></div>
+<div class="g"><div><a href="https://example.com/two"><h3>Only a title</h3></a></div></div>
+</div></div></body></html>
+"""
+
+
+def test_duckduckgo_results():
+    results, containers = extract_results(DDG_PAGE, "DuckDuckGo", max_results=5)
+    assert containers == 3
+    assert results[0] == {
+        "url": "https://example.com/a?x=1&y=2",
+        "title": "Fish & Chips",
+        "snippet": "It's crispy and hot",
+    }
+    assert results[1] == {"url": "https://example.org/b", "title": "No snippet here"}
+    assert results[2]["title"] == "Third" and results[2]["snippet"] == "Third snippet"
+
+
+def test_google_results():
+    results, containers = extract_results(GOOGLE_PAGE, "Google", max_results=5)
+    assert containers == 2
+    assert results[0] == {
+        "url": "https://example.com/one",
+        "title": "Tom & Jerry",
+        "snippet": "Cat <and> mouse",
+    }
+    assert results[1] == {"url": "https://example.com/two", "title": "Only a title"}
+
+
+def test_parsing_stops_at_max_results():
+    results, containers = extract_results(DDG_PAGE, "DuckDuckGo", max_results=2)
+    assert [r["title"] for r in results] == ["Fish & Chips", "No snippet here"]
+    assert containers == 2
+
+
+def test_page_without_results():
+    assert extract_results("<html><body><div>nothing</div></body></html>", "Google") == ([], 0)
@@ -0,0 +1,97 @@
+import pytest
+import requests
+
+from conftest import PROJECT_ROOT  # noqa: F401  (puts the project root on sys.path)
+from ollama.core import search, search_cache
+from ollama.core.search_cache import SearchCache
+
+PAGE = (
+    '<html><body><div class="result results_links"><div class="result__body">'
+    '<h2><a class="result__a" href="https://example.com/1">First result</a></h2>'
+    '<a class="result__snippet" href="https://example.com/1">About the first</a>'
+    "</div></div></body></html>"
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(search_cache.time, "time", clock.time)
+    return clock
+
+
+def value(n):
+    return {"results": f"results {n}", "debug": f"debug {n}"}
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = SearchCache(ttl=60)
+    cache.put("DuckDuckGo", "Some  Query", 3, value(1))
+    clock.now += 59
+    assert cache.get("DuckDuckGo", "some query", 3) == value(1)
+    clock.now += 2
+    assert cache.get("DuckDuckGo", "some query", 3) is None
+    assert cache.stats()["expired"] == 1 and len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = SearchCache(max_entries=2)
+    cache.put("Google", "a", 3, value("a"))
+    cache.put("Google", "b", 3, value("b"))
+    assert cache.get("Google", "a", 3) is not None  # "b" is now the least recently used
+    cache.put("Google", "c", 3, value("c"))
+    assert len(cache) == 2 and cache.stats()["evictions"] == 1
+    assert cache.get("Google", "b", 3) is None
+    assert cache.get("Google", "a", 3) == value("a") and cache.get("Google", "c", 3) == value("c")
+
+
+def test_sqlite_copy_survives_a_restart_but_not_the_ttl(tmp_path, clock):
+    path = str(tmp_path / "search.sqlite3")
+    cache = SearchCache(ttl=60, path=path)
+    cache.put("DuckDuckGo", "old", 3, value("old"))
+    clock.now += 30
+    cache.put("DuckDuckGo", "new", 3, value("new"))
+    cache.close()
+
+    clock.now += 40
+    reopened = SearchCache(ttl=60, path=path)
+    assert reopened.get("DuckDuckGo", "new", 3) == value("new")
+    assert reopened.get("DuckDuckGo", "old", 3) is None
+    reopened.close()
+
+
+class FakeResponse:
+    status_code = 200
+    text = PAGE
+
+
+def test_only_successful_searches_are_cached(monkeypatch):
+    calls = []
+
+    def failing_get(url, **kwargs):
+        calls.append(url)
+        raise requests.ConnectionError("offline")
+
+    cache = SearchCache()
+    monkeypatch.setattr(requests, "get", failing_get)
+    failed = search.perform_web_search("first result", cache=cache)
+    assert failed["results"].startswith("Error performing web search")
+    assert len(cache) == 0
+
+    monkeypatch.setattr(requests, "get", lambda url, **kwargs: (calls.append(url), FakeResponse())[1])
+    fresh = search.perform_web_search("first result", cache=cache)
+    assert "Title: First result" in fresh["results"] and "URL: https://example.com/1" in fresh["results"]
+    assert "cacheable" not in fresh
+
+    cached = search.perform_web_search("First  Result", cache=cache)
+    assert cached["results"] == fresh["results"]
+    assert cached["debug"].startswith("Served from search cache")
+    assert len(calls) == 2
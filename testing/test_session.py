@@ -0,0 +1,113 @@
+import time
+
+import pytest
+
+from conftest import PROJECT_ROOT  # noqa: F401  (puts the project root on sys.path)
+from ollama.core import session
+
+
+@pytest.fixture
+def sessions_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(session, "get_sessions_dir", lambda: str(tmp_path))
+    monkeypatch.setattr(session, "COMPACT_EVERY", 10)
+    monkeypatch.setattr(session, "JOURNAL_KEEP", 4)
+    yield tmp_path
+    session.close_journals()
+
+
+def add_messages(data, first, last):
+    for n in range(first, last):
+        session.store_message_in_session(data, "user" if n % 2 == 0 else "assistant", f"message {n}")
+
+
+def contents(data):
+    return [m["content"] for m in data["messages"]]
+
+
+def forbid_snapshot(monkeypatch):
+    def read_session(*paths):
+        raise AssertionError("the snapshot was parsed")
+    monkeypatch.setattr(session, "_read_session", read_session)
+
+
+def test_journal_replays_over_snapshot(sessions_dir):
+    session_id, data = session.new_session("model")
+    add_messages(data, 0, 25)  # Compacted at 10 and 20; 21..25 only in the journal
+    session.store_session_summary(data, {"text": "so far", "upto": 12})
+    session.close_journals()
+    with open(sessions_dir / f"{session_id}.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"seq": 25, "role": "us')  # A crash mid-write
+
+    loaded = session.load_session(session_id)
+    assert contents(loaded) == [f"message {n}" for n in range(25)]
+    assert loaded["message_count"] == 25
+    assert loaded["summary"] == {"text": "so far", "upto": 12}
+
+    add_messages(loaded, 25, 26)
+    session.close_journals()
+    assert contents(session.load_session(session_id))[-2:] == ["message 24", "message 25"]
+
+
+def test_tail_is_read_from_the_journal(sessions_dir, monkeypatch):
+    session_id, data = session.new_session("model")
+    add_messages(data, 0, 22)
+    session.store_session_summary(data, {"text": "early turns", "upto": 8})
+    add_messages(data, 22, 23)
+    session.close_journals()
+
+    forbid_snapshot(monkeypatch)
+    # Messages 20..22 were written after the last compaction, 16..19 are its copies.
+    for tail in (0, 3, 7):
+        loaded = session.load_session(session_id, tail=tail)
+        assert contents(loaded) == [f"message {n}" for n in range(23 - tail, 23)]
+        assert loaded["message_count"] == 23
+        assert loaded["summary"] == {"text": "early turns", "upto": 8}
+        assert loaded["model"] == "model"
+
+
+def test_tail_past_the_journal_reads_the_snapshot(sessions_dir):
+    session_id, data = session.new_session("model")
+    add_messages(data, 0, 20)
+    session.close_journals()
+
+    loaded = session.load_session(session_id, tail=6)
+    assert contents(loaded) == [f"message {n}" for n in range(14, 20)]
+    assert loaded["message_count"] == 20
+
+
+def test_tail_loaded_session_keeps_its_history(sessions_dir):
+    session_id, data = session.new_session("model")
+    add_messages(data, 0, 12)
+    session.close_journals()
+
+    tail = session.load_session(session_id, tail=2)
+    add_messages(tail, 12, 20)  # Compacts with only the tail in memory
+    session.close_journals()
+    assert contents(session.load_session(session_id)) == [f"message {n}" for n in range(20)]
+
+
+def test_idle_journal_is_fsynced_within_the_interval(sessions_dir, monkeypatch):
+    monkeypatch.setattr(session, "FSYNC_INTERVAL", 0.05)
+    synced = []
+    fsync = session.os.fsync
+    monkeypatch.setattr(session.os, "fsync", lambda fd: (synced.append(fd), fsync(fd)))
+    session_id, data = session.new_session("model")
+    add_messages(data, 0, 2)
+    journal = session._journals[session_id][0]
+    synced.clear()
+
+    time.sleep(0.3)
+    assert journal.fileno() in synced
+
+    session.close_journal(session_id)
+    assert session_id not in session._journals
+
+
+def test_summary_keeps_the_catalogue_current(sessions_dir):
+    session_id, data = session.new_session("model")
+    add_messages(data, 0, 3)
+    session.store_session_summary(data, {"text": "so far", "upto": 2})
+    session.close_journals()
+
+    reread = session.get_catalogue().sync(lambda sid: session._read_session(*session._session_paths(sid)))
+    assert reread == 0
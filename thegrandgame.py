@@ -9,6 +9,7 @@ import time
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 from ollama.core.core_manager import CoreManager
+from ollama.gui.text_stream import TextStream
 
 class EndlessAdventureApp:
     def __init__(self, root):
@@ -132,17 +133,26 @@ class EndlessAdventureApp:
             "'" + user_input + "'."
         )
         with_search = True  # Enable web search if required by CoreManager.
-        response_data = self.core_manager.generate_response(
-            prompt,
-            with_search=with_search,
-            with_local_kb=self.core_manager.local_kb_enabled
-        )
-        if response_data.get("success"):
-            response = response_data.get("ai_response", "")
-            self.root.after(0, lambda: self.append_log("📜 " + response))
+        # The narration is shown as it is generated; the session log gets the finished text.
+        stream = TextStream(self.adventure_log, header="📜 ")
+        try:
+            for piece in self.core_manager.stream_response(
+                prompt,
+                with_search=with_search,
+                with_local_kb=self.core_manager.local_kb_enabled
+            ):
+                stream.write(piece)
+            response = stream.close()
+            self.root.after(0, lambda: self.session_log.append("📜 " + response))
+            # The player's command (not the narrator instructions) is what the adventure's history keeps.
+            self.core_manager.store_message_in_session("user", user_input)
             self.core_manager.store_message_in_session("assistant", response)
-        else:
-            error = response_data.get("error", "Unknown error")
+        except Exception as e:
+            partial = stream.close()
+            self.core_manager.store_message_in_session("user", user_input)
+            if partial:
+                self.root.after(0, lambda: self.session_log.append("📜 " + partial))
+            error = str(e) or "Unknown error"
             self.root.after(0, lambda: self.append_log("⚠️ Error: " + error))
         # Hide the progress indicator.
         self.root.after(0, lambda: self.progress_label.config(text=""))
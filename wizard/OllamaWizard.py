@@ -14,6 +14,11 @@ from ttkbootstrap import Style
 from PIL import Image, ImageTk
 from io import BytesIO
 
+# Ensure project root is on sys.path when launched as a script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from runtime.ollama_client import get_client, get_probe_client
+
 
 class OllamaSetupWizard:
     def __init__(self, parent):
@@ -139,7 +144,7 @@ class OllamaSetupWizard:
         self.model_vars = {}
         self.model_checkbuttons = {}
         try:
-            response = requests.get("http://localhost:11434/api/tags", timeout=2)
+            response = get_probe_client().get("/api/tags", timeout=2)
             if response.status_code == 200:
                 downloaded_models = [model["name"] for model in response.json().get("models", [])]
             else:
@@ -308,7 +313,7 @@ class OllamaSetupWizard:
 
     def check_ollama_running(self):
         try:
-            response = requests.get("http://localhost:11434/api/tags", timeout=2)
+            response = get_probe_client().get("/api/tags", timeout=2)
             self.ollama_running = (response.status_code == 200)
             if self.ollama_running:
                 self.log_prereq("✅ Ollama service is running")
@@ -480,8 +485,8 @@ class OllamaSetupWizard:
             try:
                 self.model_step_label.config(text=f"Downloading {model}...")
                 self.append_model_log(f"Downloading {model}...\n")
-                response = requests.post(
-                    "http://localhost:11434/api/pull",
+                response = get_client().post(
+                    "/api/pull",
                     json={"name": model},
                     stream=True
                 )